@@ -0,0 +1,133 @@
+"""Произведение с первыми страницами отзывов и комментариев.
+
+?include=reviews добавляет к произведению первую страницу отзывов,
+?include=reviews.comments — и первые комментарии каждого отзыва.
+Число запросов не зависит от числа отзывов: страница отзывов и ее
+число — по запросу, первые комментарии всех отзывов — один запрос
+с ROW_NUMBER() по отзыву и, если у части отзывов оперативных
+комментариев не хватило, такой же запрос к архиву.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, Max, OuterRef, Subquery, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+from reviews.models import Comment, CommentArchive
+
+from .pagination import ReviewPagination
+from .serializers import CommentSerializer, ReviewSerializer
+
+REVIEWS = 'reviews'
+COMMENTS = 'reviews.comments'
+# Сколько первых комментариев показывать у каждого отзыва.
+COMMENTS_PER_REVIEW = 3
+
+
+def annotate_comment_stats(reviews):
+    """Число комментариев и дата последнего, с учетом архива."""
+    archived = CommentArchive.objects.filter(
+        review=OuterRef('pk')
+    ).order_by().values('review')
+    return reviews.annotate(
+        comment_count=Count('comments') + Coalesce(
+            Subquery(archived.annotate(count=Count('pk')).values(
+                'count'
+            )), 0
+        ),
+        # Архивные комментарии старше оставшихся.
+        last_comment_at=Coalesce(
+            Max('comments__pub_date'),
+            Subquery(archived.annotate(last=Max('pub_date')).values(
+                'last'
+            ))
+        )
+    )
+
+
+def first_comments(model, review_ids, limit):
+    """Первые limit комментариев каждого отзыва: {id отзыва: список}."""
+    by_review = defaultdict(list)
+    if not review_ids:
+        return by_review
+    ranked = model.objects.filter(review_id__in=review_ids).annotate(
+        rank_in_review=Window(
+            RowNumber(),
+            partition_by=[F('review_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        )
+    ).values('id', 'rank_in_review')
+    # В Django 3.2 нельзя фильтровать по оконной функции в том же
+    # запросе, поэтому ранжирование — подзапрос.
+    sql, params = ranked.query.sql_with_params()
+    comments = model.objects.filter(pk__in=RawSQL(
+        f'SELECT id FROM ({sql}) ranked WHERE rank_in_review <= %s',
+        (*params, limit)
+    )).select_related('author').order_by('-pub_date', '-id')
+    for comment in comments:
+        by_review[comment.review_id].append(comment)
+    return by_review
+
+
+def page_link(request, url_name, kwargs, limit, count):
+    """Ссылка на следующую страницу списка или None."""
+    if count <= limit:
+        return None
+    url = request.build_absolute_uri(reverse(url_name, kwargs=kwargs))
+    url = replace_query_param(url, 'limit', limit)
+    return replace_query_param(url, 'offset', limit)
+
+
+def included_reviews(request, title, with_comments):
+    """Первая страница отзывов произведения в виде ответа списка."""
+    limit = ReviewPagination.default_limit
+    queryset = annotate_comment_stats(
+        title.reviews.select_related('author')
+    ).order_by('-pub_date', '-id')
+    reviews = list(queryset[:limit])
+    count = len(reviews)
+    if count == limit:
+        count = queryset.count()
+    context = {'request': request}
+    results = ReviewSerializer(reviews, many=True, context=context).data
+    if with_comments:
+        comments = comments_of(reviews)
+        for review, data in zip(reviews, results):
+            data['comments'] = {
+                'count': review.comment_count,
+                'next': page_link(
+                    request, 'api:comments-list',
+                    {'title_id': title.pk, 'review_id': review.pk},
+                    COMMENTS_PER_REVIEW, review.comment_count
+                ),
+                'results': CommentSerializer(
+                    comments[review.pk], many=True, context=context
+                ).data,
+            }
+    return {
+        'count': count,
+        'next': page_link(
+            request, 'api:reviews-list', {'title_id': title.pk},
+            limit, count
+        ),
+        'results': results,
+    }
+
+
+def comments_of(reviews):
+    """Первые комментарии отзывов, с архивными — как в CommentPagination."""
+    comments = first_comments(
+        Comment, [review.pk for review in reviews], COMMENTS_PER_REVIEW
+    )
+    short = [
+        review.pk for review in reviews
+        if len(comments[review.pk]) < min(
+            COMMENTS_PER_REVIEW, review.comment_count
+        )
+    ]
+    if short:
+        archived = first_comments(CommentArchive, short, COMMENTS_PER_REVIEW)
+        for pk in short:
+            comments[pk] = (comments[pk] + archived[pk])[:COMMENTS_PER_REVIEW]
+    return comments
@@ -0,0 +1,75 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_read_database = ContextVar('read_database', default=None)
+# alias -> (время проверки, отставание в секундах)
+_replica_lag = {}
+
+
+def set_read_database(alias):
+    """Задает базу для чтения в текущем запросе, возвращает токен."""
+    return _read_database.set(alias)
+
+
+def reset_read_database(token):
+    _read_database.reset(token)
+
+
+def get_replica_lag(alias):
+    """Отставание реплики в секундах, проверяется не чаще интервала."""
+    checked_at, lag = _replica_lag.get(alias, (None, None))
+    now = time.monotonic()
+    if checked_at is not None and (
+        now - checked_at < settings.DB_REPLICA_LAG_CHECK_INTERVAL
+    ):
+        return lag
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        lag = 0
+    else:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = cursor.fetchone()[0] or 0
+        except DatabaseError:
+            lag = float('inf')
+    _replica_lag[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    """Случайная реплика с допустимым отставанием или None."""
+    replicas = [
+        alias for alias in settings.DB_REPLICAS
+        if get_replica_lag(alias) <= settings.DB_REPLICA_MAX_LAG
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """Направляет чтение на реплику, выбранную для текущего запроса.
+
+    Реплику выбирает ReplicaRoutingMiddleware. Вне запроса, а также для
+    небезопасных методов чтение и запись идут в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
@@ -1,16 +1,23 @@
 from django_filters import rest_framework
+from reviews.cache import category_cache, genre_cache
 from reviews.models import Title
 
 
+def slug_contains(reference_cache, value):
+    """id объектов справочника, slug которых содержит value.
+
+    Возвращает None, если справочник не помещается в кэш.
+    """
+    objects = reference_cache.all()
+    if objects is None:
+        return None
+    value = value.lower()
+    return [obj.pk for obj in objects if value in obj.slug.lower()]
+
+
 class TitleFilter(rest_framework.FilterSet):
-    category = rest_framework.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    genre = rest_framework.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
-    )
+    category = rest_framework.CharFilter(method='filter_category')
+    genre = rest_framework.CharFilter(method='filter_genre')
     name = rest_framework.CharFilter(
         field_name='name',
         lookup_expr='icontains'
@@ -23,3 +30,17 @@ class TitleFilter(rest_framework.FilterSet):
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year')
+
+    def filter_category(self, queryset, name, value):
+        ids = slug_contains(category_cache, value)
+        if ids is None:
+            return queryset.filter(category__slug__icontains=value)
+        return queryset.filter(category_id__in=ids)
+
+    def filter_genre(self, queryset, name, value):
+        ids = slug_contains(genre_cache, value)
+        if ids is None:
+            return queryset.filter(genre__slug__icontains=value)
+        return queryset.filter(pk__in=Title.genre.through.objects.filter(
+            genre_id__in=ids
+        ).values('title_id'))
@@ -0,0 +1,174 @@
+import hashlib
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api_yamdb import metrics
+
+from . import db_routers, profiling
+from .slow_queries import SlowQueryLogger
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет чтение безопасных запросов на реплики.
+
+    После успешной записи клиент на DB_REPLICA_STICKY_SECONDS читает
+    из основной базы, чтобы сразу видеть свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DB_REPLICAS:
+            return self.get_response(request)
+
+        sticky_key = self.get_sticky_key(request)
+        alias = None
+        if request.method in SAFE_METHODS and not cache.get(sticky_key):
+            alias = db_routers.choose_replica()
+        token = db_routers.set_read_database(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_routers.reset_read_database(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            cache.set(sticky_key, True, settings.DB_REPLICA_STICKY_SECONDS)
+        return response
+
+    def get_sticky_key(self, request):
+        client = request.META.get('HTTP_AUTHORIZATION') or (
+            request.META.get('HTTP_X_FORWARDED_FOR')
+            or request.META.get('REMOTE_ADDR', '')
+        )
+        return 'replica_sticky_' + hashlib.md5(client.encode()).hexdigest()
+
+
+class MetricsMiddleware:
+    """Собирает метрики запроса: маршрут, статус, время, запросы к БД.
+
+    Запросы к БД считаются в памяти и записываются в метрики один раз
+    в конце запроса, чтобы не замедлять каждый запрос к БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unmatched'
+        metrics.REQUESTS.labels(
+            route, request.method, response.status_code
+        ).inc()
+        metrics.REQUEST_LATENCY.labels(route, request.method).observe(
+            duration
+        )
+        metrics.DB_QUERIES_PER_REQUEST.observe(queries.count)
+        if queries.count:
+            metrics.DB_QUERIES.labels(route).inc(queries.count)
+            metrics.DB_QUERY_SECONDS.labels(route).inc(queries.duration)
+        return response
+
+
+class QueryCounter:
+    """execute_wrapper, считающий запросы к БД и их суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class SlowQueryMiddleware:
+    """Подключает журнал медленных запросов с меткой представления."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.slow_query_loggers = [
+            SlowQueryLogger(connection) for connection in connections.all()
+        ]
+        with ExitStack() as stack:
+            for logger in request.slow_query_loggers:
+                stack.enter_context(
+                    logger.connection.execute_wrapper(logger)
+                )
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = get_view_label(request, view_func)
+        for logger in request.slow_query_loggers:
+            logger.view = view
+
+
+def get_view_label(request, view_func):
+    """Метка вида api.views.TitleViewSet.list для журнала запросов."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__qualname__}'
+    action = getattr(view_func, 'actions', {}).get(request.method.lower())
+    label = f'{view_class.__module__}.{view_class.__qualname__}'
+    return f'{label}.{action}' if action else label
+
+
+class ProfilerMiddleware:
+    """Профилирует запросы администраторов с заголовком X-Profile.
+
+    Запросы без заголовка проходят без проверок пользователя и
+    без профилировщика.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if 'HTTP_X_PROFILE' not in request.META or not is_admin(request):
+            return self.get_response(request)
+        if not profiling.take_slot():
+            response = self.get_response(request)
+            response['X-Profile-Error'] = 'rate limit exceeded'
+            return response
+        profile = profiling.RequestProfile(request)
+        response = profile.run(self.get_response, request)
+        profile.save()
+        response['X-Profile-Id'] = profile.id
+        response['Server-Timing'] = profile.server_timing()
+        return response
+
+
+def is_admin(request):
+    """Администратор ли автор запроса: по сессии или по JWT.
+
+    Без AuthenticationMiddleware (профиль settings_api) у запроса нет
+    user, и пользователь определяется только по JWT.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            user, _ = JWTAuthentication().authenticate(request) or (None, None)
+        except AuthenticationFailed:
+            return False
+    return user is not None and (user.is_admin or user.is_superuser)
@@ -0,0 +1,212 @@
+import base64
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from reviews.utils import estimate_count
+
+
+class MergedCursorPagination(pagination.BasePagination):
+    """Курсорная пагинация по нескольким потокам объектов.
+
+    Каждый поток — queryset одного вида объектов с полями pub_date и id.
+    Потоки читаются по ключу (pub_date, вид, id) от новых к старым,
+    из каждого берется не больше страницы плюс один объект, затем
+    потоки сливаются (k-way merge). Курсор — ключ последнего объекта.
+    """
+    page_size = 10
+    max_page_size = 50
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    # Наибольшее значение bigint: больший id не сравнить с колонкой.
+    max_pk = 2 ** 63 - 1
+
+    def paginate_streams(self, streams, request):
+        """Возвращает страницу пар (вид, объект)."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if cursor is not None and cursor[1] not in streams:
+            raise NotFound(self.invalid_cursor_message)
+        iterables = []
+        for kind, queryset in streams.items():
+            if cursor is not None:
+                queryset = queryset.filter(self.before_cursor(kind, cursor))
+            queryset = queryset.order_by('-pub_date', '-id')
+            iterables.append([
+                ((obj.pub_date, kind, obj.id), obj)
+                for obj in queryset[:self.page_size + 1]
+            ])
+        items = list(islice(
+            heapq.merge(*iterables, key=lambda item: item[0], reverse=True),
+            self.page_size + 1
+        ))
+        self.has_next = len(items) > self.page_size
+        page = items[:self.page_size]
+        self.last_key = page[-1][0] if page else None
+        return [(key[1], obj) for key, obj in page]
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, kind, pk = self.last_key
+        cursor = base64.urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{kind}|{pk}'.encode()
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            pub_date, kind, pk = (
+                base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            )
+            pub_date, pk = datetime.fromisoformat(pub_date), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        # Курсоры выдаются только с часовым поясом и настоящим id.
+        if pub_date.tzinfo is None or not 0 < pk <= self.max_pk:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, kind, pk
+
+    @staticmethod
+    def before_cursor(kind, cursor):
+        """Условие «ключ объекта меньше ключа курсора» для потока kind."""
+        pub_date, cursor_kind, pk = cursor
+        condition = Q(pub_date__lt=pub_date)
+        if kind < cursor_kind:
+            condition |= Q(pub_date=pub_date)
+        elif kind == cursor_kind:
+            condition |= Q(pub_date=pub_date, id__lt=pk)
+        return condition
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """LimitOffsetPagination с потолком limit и выбором способа подсчета.
+
+    Способ подсчета задается count_mode и параметром запроса ?count=:
+    exact — COUNT(*); estimate — для запроса без фильтров оценка из
+    статистики PostgreSQL, если в таблице больше estimate_threshold строк,
+    иначе COUNT(*); none — без подсчета, count в ответе null.
+    Наличие следующей страницы всегда определяется по лишнему объекту,
+    поэтому неточная оценка не ломает ссылку next.
+    """
+    max_limit = 100
+    count_mode = 'exact'
+    count_query_param = 'count'
+    count_modes = ('exact', 'estimate', 'none')
+    estimate_threshold = 10000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = self.get_count(queryset)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param)
+        return mode if mode in self.count_modes else self.count_mode
+
+    def get_count(self, queryset):
+        mode = self.get_count_mode(self.request)
+        if mode == 'none':
+            return None
+        if mode == 'estimate' and not (
+            queryset.query.where or queryset.query.distinct
+        ):
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().get_count(queryset)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.limit_query_param,
+            self.limit
+        )
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+
+class TitlePagination(LimitOffsetPagination):
+    default_limit = 10
+    count_mode = 'estimate'
+
+
+class ReviewPagination(LimitOffsetPagination):
+    default_limit = 10
+
+
+class CommentPagination(LimitOffsetPagination):
+    """Комментарии отзыва: сначала из Comment, затем из архива.
+
+    Архивные комментарии старше оставшихся, поэтому архив продолжает
+    список: страница, дошедшая до конца Comment, добирается из
+    view.get_archive_queryset() со смещением offset минус число
+    комментариев в Comment. Страницы, целиком лежащие в Comment,
+    архив не читают.
+    """
+    default_limit = 20
+
+    def paginate_queryset(self, queryset, request, view=None):
+        get_archive = getattr(view, 'get_archive_queryset', None)
+        self.archive = get_archive() if get_archive else None
+        results = super().paginate_queryset(queryset, request, view)
+        if results is None or self.has_next or self.archive is None:
+            return results
+        if results:
+            start = 0
+        else:
+            start = max(self.offset - queryset.count(), 0)
+        need = self.limit - len(results)
+        archived = list(self.archive[start:start + need + 1])
+        self.has_next = len(archived) > need
+        return results + archived[:need]
+
+    def get_count(self, queryset):
+        count = super().get_count(queryset)
+        if count is None or self.archive is None:
+            return count
+        return count + self.archive.count()
+
+
+class UserPagination(LimitOffsetPagination):
+    default_limit = 20
+    count_mode = 'estimate'
+
+
+class ReferencePagination(LimitOffsetPagination):
+    """Категории и жанры: небольшие справочники."""
+    default_limit = 50
+    max_limit = 500
@@ -1,33 +1,54 @@
 from rest_framework import permissions
 
 
+class RoleContext:
+    """Роли пользователя, вычисленные один раз за запрос."""
+
+    def __init__(self, user):
+        self.is_authenticated = user.is_authenticated
+        self.user_id = user.pk if self.is_authenticated else None
+        self.is_superuser = self.is_authenticated and user.is_superuser
+        self.is_admin = self.is_authenticated and user.is_admin
+        self.is_moderator = self.is_authenticated and user.is_moderator
+
+
+def get_role_context(request):
+    """Возвращает RoleContext, сохраненный в запросе."""
+    context = getattr(request, '_role_context', None)
+    if context is None:
+        context = RoleContext(request.user)
+        request._role_context = context
+    return context
+
+
 class IsAdminSuperuserOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
-        return (
-            request.method in permissions.SAFE_METHODS
-            or (request.user.is_authenticated
-                and (request.user.is_admin or request.user.is_superuser))
-        )
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        roles = get_role_context(request)
+        return roles.is_admin or roles.is_superuser
 
 
 class IsAuthorAdminModerSuperuserOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         return (
             request.method in permissions.SAFE_METHODS
-            or request.user.is_authenticated
+            or get_role_context(request).is_authenticated
         )
 
     def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        roles = get_role_context(request)
+        # author_id не требует загрузки автора из БД.
         return (
-            request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
-            or request.user.is_moderator
-            or request.user.is_admin
+            obj.author_id == roles.user_id
+            or roles.is_moderator
+            or roles.is_admin
         )
 
 
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_admin or request.user.is_superuser
-        )
+        roles = get_role_context(request)
+        return roles.is_admin or roles.is_superuser
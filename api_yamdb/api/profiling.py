@@ -0,0 +1,207 @@
+"""Профилирование отдельного запроса по заголовку X-Profile.
+
+Запрос администратора с заголовком X-Profile выполняется под cProfile,
+запросы к БД записываются в хронологию. Профиль сохраняется в
+PROFILER_DIR: <id>.prof (pstats, открывается snakeviz или pstats) и
+<id>.json (лучшие функции и хронология SQL). В ответ добавляются
+X-Profile-Id и Server-Timing: общее время, время SQL и функции с
+наибольшим собственным временем. Хранятся последние PROFILER_KEEP
+профилей, профилировать можно не больше PROFILER_RATE_LIMIT запросов
+в минуту на все воркеры.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .slow_queries import MAX_SQL_LENGTH, normalize
+
+PROFILE_ID = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{8}$')
+RATE_KEY = 'profiler_rate_{}'
+# Поля записи pstats: (примитивные вызовы, вызовы, собственное время,
+# общее время, вызывающие).
+OWN_TIME = 2
+CUMULATIVE_TIME = 3
+# Сколько функций с наибольшим собственным временем попадает в
+# Server-Timing.
+SERVER_TIMING_FUNCTIONS = 3
+
+
+def take_slot():
+    """Учитывает запрос в лимите текущей минуты, False — лимит исчерпан."""
+    key = RATE_KEY.format(int(time.time() // 60))
+    cache.add(key, 0, 120)
+    try:
+        return cache.incr(key) <= settings.PROFILER_RATE_LIMIT
+    except ValueError:
+        # Ключ истек между add и incr.
+        return False
+
+
+class QueryTimeline:
+    """execute_wrapper, записывающий начало, длительность и SQL запросов."""
+
+    def __init__(self, alias, started):
+        self.alias = alias
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': self.alias,
+                'start_ms': round((started - self.started) * 1000, 3),
+                'duration_ms': round(
+                    (time.perf_counter() - started) * 1000, 3
+                ),
+                'sql': normalize(sql)[:MAX_SQL_LENGTH],
+            })
+
+
+class RequestProfile:
+    """Профиль одного запроса: cProfile и хронология запросов к БД."""
+
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.id = '{:%Y%m%d-%H%M%S}-{}'.format(
+            timezone.now(), uuid.uuid4().hex[:8]
+        )
+
+    def run(self, get_response, request):
+        self.started = time.perf_counter()
+        timelines = [
+            QueryTimeline(connection.alias, self.started)
+            for connection in connections.all()
+        ]
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for timeline in timelines:
+                stack.enter_context(
+                    connections[timeline.alias].execute_wrapper(timeline)
+                )
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.stats = pstats.Stats(profiler)
+        self.queries = sorted(
+            (query for timeline in timelines for query in timeline.queries),
+            key=lambda query: query['start_ms']
+        )
+        self.status = response.status_code
+        return response
+
+    @property
+    def sql_ms(self):
+        return sum(query['duration_ms'] for query in self.queries)
+
+    def hottest(self, key, count):
+        """count функций с наибольшим значением поля key записи pstats."""
+        return sorted(
+            self.stats.stats.items(),
+            key=lambda item: item[1][key], reverse=True
+        )[:count]
+
+    def top_functions(self, key, count):
+        return [
+            {
+                'function': pstats.func_std_string(function),
+                'calls': calls,
+                'own_ms': round(own * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3),
+            }
+            for function, (_, calls, own, cumulative, _) in self.hottest(
+                key, count
+            )
+        ]
+
+    def summary(self):
+        count = settings.PROFILER_TOP_FUNCTIONS
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'duration_ms': round(self.duration * 1000, 3),
+            'sql_ms': round(self.sql_ms, 3),
+            'sql_count': len(self.queries),
+            'top_own': self.top_functions(OWN_TIME, count),
+            'top_cumulative': self.top_functions(CUMULATIVE_TIME, count),
+            'sql': self.queries,
+        }
+
+    def server_timing(self):
+        entries = [
+            f'total;dur={self.duration * 1000:.1f}',
+            f'sql;dur={self.sql_ms:.1f};desc="{len(self.queries)} queries"',
+        ]
+        hottest = self.hottest(OWN_TIME, SERVER_TIMING_FUNCTIONS)
+        for number, ((file, line, name), row) in enumerate(hottest, 1):
+            label = f'{os.path.basename(file)}:{line}({name})'
+            # Значение заголовка: только ASCII и без кавычек.
+            label = label.encode('ascii', 'replace').decode()
+            label = label.replace('\\', '').replace('"', '')
+            entries.append(
+                f'fn{number};dur={row[OWN_TIME] * 1000:.1f};desc="{label}"'
+            )
+        return ', '.join(entries)
+
+    def save(self):
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        self.stats.dump_stats(profile_path(self.id, 'prof'))
+        with open(profile_path(self.id, 'json'), 'w') as file:
+            json.dump(self.summary(), file, ensure_ascii=False)
+        remove_old_profiles()
+
+
+def profile_path(profile_id, extension):
+    return os.path.join(settings.PROFILER_DIR, f'{profile_id}.{extension}')
+
+
+def list_profiles():
+    """id сохраненных профилей, от новых к старым."""
+    try:
+        names = os.listdir(settings.PROFILER_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        (name[:-5] for name in names if (
+            name.endswith('.json') and PROFILE_ID.match(name[:-5])
+        )),
+        reverse=True
+    )
+
+
+def read_summary(profile_id):
+    """Сводка профиля или None, если профиля нет."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id, 'json')) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def remove_old_profiles():
+    for profile_id in list_profiles()[settings.PROFILER_KEEP:]:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
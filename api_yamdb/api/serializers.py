@@ -1,5 +1,23 @@
 from rest_framework import serializers
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.cache import category_cache, genre_cache
+from reviews.models import (Category, Comment, CommentArchive, Genre, Review,
+                            SimilarTitle, Title, User)
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который ищет объект в ReferenceCache."""
+
+    def __init__(self, reference_cache, **kwargs):
+        self.reference_cache = reference_cache
+        super().__init__(slug_field='slug', **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        obj = self.reference_cache.get_by_slug(data)
+        if obj is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+        return obj
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -15,9 +33,11 @@ class GenreSerializer(serializers.ModelSerializer):
 
 
 class TitleGetSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)
+    category = serializers.SerializerMethodField()
     genre = GenreSerializer(read_only=True, many=True)
     rating = serializers.IntegerField(read_only=True)
+    my_review_id = serializers.IntegerField(read_only=True)
+    my_score = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
@@ -28,18 +48,34 @@ class TitleGetSerializer(serializers.ModelSerializer):
             'year',
             'category',
             'genre',
-            'description'
+            'description',
+            'my_review_id',
+            'my_score'
         )
 
+    def get_fields(self):
+        # Свой отзыв — только по ?include=my_review от пользователя.
+        fields = super().get_fields()
+        if not self.context.get('include_my_review'):
+            del fields['my_review_id']
+            del fields['my_score']
+        return fields
+
+    def get_category(self, title):
+        if title.category_id is None:
+            return None
+        category = category_cache.get_by_id(title.category_id)
+        return CategorySerializer(category).data if category else None
+
 
 class TitlePostSerializer(serializers.ModelSerializer):
-    category = serializers.SlugRelatedField(
-        queryset=Category.objects.all(),
-        slug_field='slug'
+    category = CachedSlugRelatedField(
+        category_cache,
+        queryset=Category.objects.all()
     )
-    genre = serializers.SlugRelatedField(
+    genre = CachedSlugRelatedField(
+        genre_cache,
         queryset=Genre.objects.all(),
-        slug_field='slug',
         many=True
     )
 
@@ -54,10 +90,20 @@ class ReviewSerializer(serializers.ModelSerializer):
         slug_field='username'
     )
     score = serializers.IntegerField(min_value=1, max_value=10)
+    comment_count = serializers.IntegerField(read_only=True)
+    last_comment_at = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Review
-        fields = ('id', 'text', 'score', 'pub_date', 'author')
+        fields = (
+            'id',
+            'text',
+            'score',
+            'pub_date',
+            'author',
+            'comment_count',
+            'last_comment_at'
+        )
 
     def validate(self, data):
         if self.context.get('request').method == 'POST':
@@ -86,10 +132,63 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
-class SignUpSerializer(serializers.ModelSerializer):
+class TitleShortSerializer(serializers.ModelSerializer):
     class Meta:
-        model = User
-        fields = ('email', 'username')
+        model = Title
+        fields = ('id', 'name')
+
+
+class SimilarTitleSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='similar_id')
+    name = serializers.CharField(source='similar.name')
+    rating = serializers.FloatField(read_only=True)
+    score = serializers.FloatField()
+
+    class Meta:
+        model = SimilarTitle
+        fields = ('id', 'name', 'rating', 'score')
+
+
+class ReviewShortSerializer(serializers.ModelSerializer):
+    title = TitleShortSerializer(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'title')
+
+
+class ActivityReviewSerializer(serializers.ModelSerializer):
+    title = TitleShortSerializer(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'text', 'score', 'pub_date', 'title')
+
+
+class ActivityCommentSerializer(serializers.ModelSerializer):
+    review = ReviewShortSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'text', 'pub_date', 'review')
+
+
+class ActivityArchivedCommentSerializer(ActivityCommentSerializer):
+
+    class Meta(ActivityCommentSerializer.Meta):
+        model = CommentArchive
+
+
+class SignUpSerializer(serializers.Serializer):
+    # Уникальность username и email не проверяется отдельными запросами:
+    # ее обеспечивают ограничения БД в User.objects.signup.
+    email = serializers.EmailField(
+        max_length=User._meta.get_field('email').max_length
+    )
+    username = serializers.CharField(
+        max_length=User._meta.get_field('username').max_length,
+        validators=User._meta.get_field('username').validators
+    )
 
     def validate_username(self, username):
         if username == 'me':
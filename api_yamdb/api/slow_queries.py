@@ -0,0 +1,156 @@
+"""Журнал медленных запросов к БД.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_MS с вероятностью
+SLOW_QUERY_SAMPLE_RATE попадают в кольцевой буфер на SLOW_QUERY_LOG_SIZE
+записей в общем кэше Django, чтобы журнал всех воркеров читался командой
+slow_queries. Запросы группируются по отпечатку — тексту SQL без
+значений. Для каждого нового отпечатка сохраняется план EXPLAIN.
+Параметры запросов не сохраняются: в них могут быть личные данные.
+"""
+import hashlib
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+SEQUENCE_KEY = 'slow_query_seq'
+ENTRY_KEY = 'slow_query_{}'
+PLAN_KEY = 'slow_query_plan_{}'
+PLAN_TIMEOUT = 7 * 24 * 3600
+MAX_SQL_LENGTH = 4000
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN (ANALYZE off) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    # IN (?, ?, ?) с любым числом значений — один отпечаток.
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def normalize(sql):
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()[:16]
+
+
+class SlowQueryLogger:
+    """execute_wrapper, записывающий медленные запросы одного HTTP-запроса.
+
+    view — метка представления, в котором выполняется запрос.
+    """
+
+    def __init__(self, connection, view=None):
+        self.connection = connection
+        self.view = view
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        except Exception:
+            # Прерванные по statement_timeout запросы тоже пишутся,
+            # но без EXPLAIN: транзакция после ошибки недоступна.
+            self.finish(sql, params, True, started, failed=True)
+            raise
+        self.finish(sql, params, many, started)
+        return result
+
+    def finish(self, sql, params, skip_plan, started, failed=False):
+        duration = (time.perf_counter() - started) * 1000
+        if (
+            duration >= settings.SLOW_QUERY_THRESHOLD_MS
+            and random.random() < settings.SLOW_QUERY_SAMPLE_RATE
+        ):
+            self.record(sql, params, skip_plan, duration, failed)
+
+    def record(self, sql, params, skip_plan, duration, failed=False):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        if not skip_plan and cache.add(PLAN_KEY.format(key), '', PLAN_TIMEOUT):
+            cache.set(
+                PLAN_KEY.format(key), self.explain(sql, params), PLAN_TIMEOUT
+            )
+        cache.add(SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(
+            ENTRY_KEY.format(sequence % settings.SLOW_QUERY_LOG_SIZE),
+            {
+                'seq': sequence,
+                'time': time.time(),
+                'view': self.view,
+                'fingerprint': key,
+                'duration_ms': round(duration, 2),
+                'sql': normalized[:MAX_SQL_LENGTH],
+                'vendor': self.connection.vendor,
+                'failed': failed,
+            },
+            None
+        )
+
+    def explain(self, sql, params):
+        """План запроса без выполнения (EXPLAIN без ANALYZE)."""
+        if not sql.lstrip().lower().startswith(EXPLAINABLE):
+            return ''
+        prefix = EXPLAIN_PREFIXES.get(self.connection.vendor, 'EXPLAIN ')
+        self.explaining = True
+        try:
+            # Савепоинт: ошибка EXPLAIN не должна ломать транзакцию запроса.
+            with transaction.atomic(using=self.connection.alias):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(prefix + sql, params)
+                    rows = cursor.fetchall()
+            return '\n'.join(
+                ' '.join(str(value) for value in row) for row in rows
+            )
+        except DatabaseError as error:
+            return f'EXPLAIN не выполнен: {error}'
+        finally:
+            self.explaining = False
+
+
+def read_log():
+    """Записи журнала от новых к старым, с планами."""
+    last = cache.get(SEQUENCE_KEY) or 0
+    size = settings.SLOW_QUERY_LOG_SIZE
+    keys = [
+        ENTRY_KEY.format(sequence % size)
+        for sequence in range(max(last - size + 1, 1), last + 1)
+    ]
+    entries = sorted(
+        cache.get_many(keys).values(),
+        key=lambda entry: entry['seq'],
+        reverse=True
+    )
+    plans = cache.get_many(
+        {PLAN_KEY.format(entry['fingerprint']) for entry in entries}
+    )
+    for entry in entries:
+        entry['plan'] = plans.get(PLAN_KEY.format(entry['fingerprint']), '')
+    return entries
+
+
+def clear_log():
+    plan_keys = [
+        PLAN_KEY.format(entry['fingerprint']) for entry in read_log()
+    ]
+    entry_keys = [
+        ENTRY_KEY.format(slot) for slot in range(settings.SLOW_QUERY_LOG_SIZE)
+    ]
+    cache.delete_many(entry_keys + plan_keys)
@@ -0,0 +1,110 @@
+"""Поток Server-Sent Events с новыми отзывами и комментариями.
+
+GET /api/v1/titles/{title_id}/events/ обслуживается напрямую в ASGI,
+минуя Django: открытое соединение ждет событий в event loop и не
+занимает поток воркера. События приходят из reviews.events.
+"""
+import asyncio
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from reviews.events import broker
+
+PATH = re.compile(r'^/api/v1/titles/(?P<title_id>\d+)/events/$')
+HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    # nginx не должен буферизовать поток.
+    (b'x-accel-buffering', b'no'),
+]
+# Через сколько миллисекунд браузер переподключится после обрыва.
+RETRY_MS = 3000
+
+
+def match(scope):
+    """title_id, если запрос — подписка на поток, иначе None."""
+    if scope['type'] != 'http' or scope['method'] != 'GET':
+        return None
+    found = PATH.match(scope['path'])
+    return int(found.group('title_id')) if found else None
+
+
+@sync_to_async
+def title_exists(title_id):
+    from reviews.models import Title
+
+    close_old_connections()
+    try:
+        return Title.objects.filter(pk=title_id).exists()
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return (
+        f"id: {event['type']}-{event['id']}\n"
+        f"event: {event['type']}\n"
+        f'data: {data}\n\n'
+    ).encode()
+
+
+async def stream_events(scope, receive, send, title_id):
+    if not await title_exists(title_id):
+        await send_not_found(send)
+        return
+    subscriber = broker.subscribe(title_id)
+    _, queue = subscriber
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start', 'status': 200, 'headers': HEADERS
+        })
+        await send_body(send, f'retry: {RETRY_MS}\n\n'.encode())
+        while True:
+            next_event = asyncio.ensure_future(queue.get())
+            await asyncio.wait(
+                {next_event, disconnect},
+                timeout=settings.EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect.done():
+                next_event.cancel()
+                return
+            if not next_event.done():
+                next_event.cancel()
+                await send_body(send, b': ping\n\n')
+                continue
+            event = next_event.result()
+            if event is None:
+                # Клиент не успевает читать: закрываем, он переподключится.
+                break
+            await send_body(send, format_event(event))
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(title_id, subscriber)
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def send_body(send, body):
+    await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+
+async def send_not_found(send):
+    body = json.dumps({'detail': 'Страница не найдена.'}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 404,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
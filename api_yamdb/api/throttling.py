@@ -0,0 +1,111 @@
+import hashlib
+
+from rest_framework import throttling
+
+
+class SlidingWindowThrottle(throttling.SimpleRateThrottle):
+    """Ограничение частоты запросов по скользящему окну.
+
+    В кэше хранятся только два счетчика: текущего и предыдущего окна.
+    Оценка числа запросов — счетчик текущего окна плюс доля счетчика
+    предыдущего окна, пропорциональная непрошедшей части окна.
+    Запрос сначала учитывается через cache.incr, и решение принимается
+    по возвращенному значению: одновременные запросы получают разные
+    значения счетчика и не могут пройти лимит вместе. Отклоненный
+    запрос снимается со счетчика. При общем кэше (memcached) лимит
+    соблюдается для всех воркеров gunicorn.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}_{window}'
+        # Счетчик прошедшего окна больше не меняется.
+        self.previous = self.cache.get(f'{self.key}_{window - 1}', 0)
+        self.elapsed = self.now % self.duration / self.duration
+        # Запросы текущего окна до этого.
+        self.current = self.increment(current_key) - 1
+        if self.previous * (1 - self.elapsed) + self.current >= (
+            self.num_requests
+        ):
+            self.release(current_key)
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def increment(self, key):
+        """Атомарно увеличивает счетчик окна и возвращает новое значение."""
+        self.cache.add(key, 0, self.duration * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Ключ истек между add и incr.
+            self.cache.set(key, 1, self.duration * 2)
+            return 1
+
+    def release(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Время до момента, когда оценка опустится ниже лимита."""
+        if self.current >= self.num_requests or not self.previous:
+            return (1 - self.elapsed) * self.duration
+        share = (self.num_requests - self.current) / self.previous
+        return max((1 - share - self.elapsed) * self.duration, 0)
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """Лимит запросов с одного IP-адреса."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+class FieldThrottle(SlidingWindowThrottle):
+    """Лимит запросов с одним значением поля в теле запроса."""
+    field = None
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        value = data.get(self.field) if hasattr(data, 'get') else None
+        if not isinstance(value, str) or not value:
+            return None
+        ident = hashlib.md5(value.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class SignUpIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class SignUpUsernameThrottle(FieldThrottle):
+    scope = 'signup_username'
+    field = 'username'
+
+
+class SignUpEmailThrottle(FieldThrottle):
+    scope = 'signup_email'
+    field = 'email'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token_ip'
+
+
+class TokenUsernameThrottle(FieldThrottle):
+    scope = 'token_username'
+    field = 'username'
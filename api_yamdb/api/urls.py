@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet, get_token,
+                    ReviewViewSet, TitleViewSet, UserViewSet, autocomplete,
+                    get_token, profile_detail, profile_download, profiles,
                     signup)
 
 app_name = 'api'
@@ -26,6 +27,12 @@ router_v1.register('users', UserViewSet, basename='user')
 
 urlpatterns = [
     path('v1/', include(router_v1.urls)),
+    path('v1/autocomplete/', autocomplete, name='autocomplete'),
     path('v1/auth/signup/', signup, name='signup'),
     path('v1/auth/token/', get_token, name='token'),
+    path('v1/profiles/', profiles, name='profiles'),
+    path('v1/profiles/<str:profile_id>/', profile_detail,
+         name='profile_detail'),
+    path('v1/profiles/<str:profile_id>/download/', profile_download,
+         name='profile_download'),
 ]
@@ -1,24 +1,44 @@
+from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db.models import F, OuterRef, Subquery
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import (action, api_view,
+                                       authentication_classes,
+                                       permission_classes, throttle_classes)
 from rest_framework.filters import SearchFilter
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.autocomplete import MAX_LIMIT, autocomplete_index
+from reviews.models import (Category, Comment, CommentArchive, Genre, Review,
+                            SimilarTitle, Title, User)
 
+from api_yamdb import metrics
+
+from . import compound, profiling
 from .filters import TitleFilter
 from .mixins import ListCreateDestroyViewSet
+from .pagination import (CommentPagination, MergedCursorPagination,
+                         ReferencePagination, ReviewPagination,
+                         TitlePagination, UserPagination)
 from .permissions import (IsAdminSuperuserOrReadOnly, IsAdminUser,
                           IsAuthorAdminModerSuperuserOrReadOnly)
-from .serializers import (CategorySerializer, CommentSerializer,
+from .serializers import (ActivityArchivedCommentSerializer,
+                          ActivityCommentSerializer, ActivityReviewSerializer,
+                          CategorySerializer, CommentSerializer,
                           GenreSerializer, ReviewSerializer, SignUpSerializer,
-                          TitleGetSerializer, TitlePostSerializer,
-                          TokenSerializer, UserSerializer)
+                          SimilarTitleSerializer, TitleGetSerializer,
+                          TitlePostSerializer, TokenSerializer, UserSerializer)
+from .throttling import (SignUpEmailThrottle, SignUpIPThrottle,
+                         SignUpUsernameThrottle, TokenIPThrottle,
+                         TokenUsernameThrottle)
+
+AUTOCOMPLETE_LIMIT = 5
 
 
 class CategoryViewSet(ListCreateDestroyViewSet):
@@ -29,6 +49,7 @@ class CategoryViewSet(ListCreateDestroyViewSet):
     search_fields = ('name',)
     lookup_field = 'slug'
     permission_classes = [IsAdminSuperuserOrReadOnly]
+    pagination_class = ReferencePagination
 
 
 class GenreViewSet(ListCreateDestroyViewSet):
@@ -39,36 +60,141 @@ class GenreViewSet(ListCreateDestroyViewSet):
     search_fields = ('name',)
     lookup_field = 'slug'
     permission_classes = [IsAdminSuperuserOrReadOnly]
+    pagination_class = ReferencePagination
 
 
 class TitleViewSet(viewsets.ModelViewSet):
     """Viewset для произведений."""
     queryset = (
         Title.objects.all()
-        .annotate(rating=Avg('reviews__score'))
+        .prefetch_related('genre')
+        # Рейтинг пересчитывается в фоне (reviews.jobs), а не по отзывам
+        # при каждом запросе.
+        .annotate(rating=F('stats__rating'))
         .order_by('-year', 'name')
     )
     serializer_class = TitlePostSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     permission_classes = [IsAdminSuperuserOrReadOnly]
+    pagination_class = TitlePagination
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'batch'):
             return TitleGetSerializer
         return TitlePostSerializer
 
+    def get_includes(self):
+        """Дополнительные поля из ?include=, через запятую."""
+        return set(self.request.query_params.get('include', '').split(','))
+
+    def include_my_review(self):
+        return (
+            'my_review' in self.get_includes()
+            and self.request.user.is_authenticated
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.include_my_review():
+            return queryset
+        # Не больше одного отзыва: уникальность (title, author).
+        my_review = Review.objects.filter(
+            title=OuterRef('pk'), author=self.request.user
+        )
+        return queryset.annotate(
+            my_review_id=Subquery(my_review.values('pk')),
+            my_score=Subquery(my_review.values('score'))
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_my_review'] = self.include_my_review()
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        """Произведение, с ?include=reviews,reviews.comments — с отзывами.
+
+        Первые страницы отзывов и комментариев читаются в api.compound
+        за постоянное число запросов.
+        """
+        title = self.get_object()
+        data = self.get_serializer(title).data
+        includes = self.get_includes()
+        if {compound.REVIEWS, compound.COMMENTS} & includes:
+            data['reviews'] = compound.included_reviews(
+                request, title, compound.COMMENTS in includes
+            )
+        return Response(data)
+
+    @action(methods=['GET'], detail=False)
+    def batch(self, request):
+        """Произведения по списку id (?ids=1,2,3) в порядке запроса."""
+        raw_ids = request.query_params.get('ids', '').split(',')
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in raw_ids))
+        except ValueError:
+            raise serializers.ValidationError(
+                {'ids': 'Укажите id произведений через запятую.'}
+            )
+        if len(ids) > settings.TITLES_BATCH_MAX_SIZE:
+            raise serializers.ValidationError({'ids': (
+                'Можно запросить не больше '
+                f'{settings.TITLES_BATCH_MAX_SIZE} произведений.'
+            )})
+        titles = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [titles[pk] for pk in ids if pk in titles], many=True
+        )
+        return Response(serializer.data)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """Произведения, которые оценивали те же пользователи."""
+        similar = list(
+            SimilarTitle.objects.filter(title_id=pk)
+            .select_related('similar')
+            # У соседа может не быть TitleStats: тогда рейтинг None.
+            .annotate(rating=F('similar__stats__rating'))
+            .only('similar_id', 'score', 'similar__name')
+            .order_by('-score')
+        )
+        if not similar:
+            get_object_or_404(Title.objects.only('pk'), pk=pk)
+        return Response(SimilarTitleSerializer(similar, many=True).data)
+
 
 class CommentViewSet(viewsets.ModelViewSet):
     """Viewset для комментариев."""
     serializer_class = CommentSerializer
     permission_classes = [IsAuthorAdminModerSuperuserOrReadOnly]
+    pagination_class = CommentPagination
 
     def get_queryset(self):
         review_id = self.kwargs.get('review_id')
         title_id = self.kwargs.get('title_id')
         review = get_object_or_404(Review, id=review_id, title=title_id)
-        return review.comments.all()
+        return review.comments.order_by('-pub_date', '-id')
+
+    def get_archive_queryset(self):
+        """Архивные комментарии отзыва, продолжение списка."""
+        return CommentArchive.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author').order_by('-pub_date', '-id')
+
+    def get_object(self):
+        # Архивный комментарий можно прочитать и удалить, но не изменить.
+        try:
+            return super().get_object()
+        except Http404:
+            if self.request.method not in (*SAFE_METHODS, 'DELETE'):
+                raise
+        comment = get_object_or_404(
+            self.get_archive_queryset(), pk=self.kwargs.get('pk')
+        )
+        self.check_object_permissions(self.request, comment)
+        return comment
 
     def perform_create(self, serializer):
         review_id = self.kwargs.get('review_id')
@@ -81,21 +207,25 @@ class ReviewViewSet(viewsets.ModelViewSet):
     """Viewset для отзывов."""
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthorAdminModerSuperuserOrReadOnly]
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
         title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        return compound.annotate_comment_stats(
+            title.reviews.select_related('author')
+        ).order_by('-pub_date', '-id')
 
     def perform_create(self, serializer):
         title_id = self.kwargs.get('title_id')
         title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        review = serializer.save(author=self.request.user, title=title)
+        review.comment_count = 0
+        review.last_comment_at = None
 
 
-def send_confirmation_code(username):
+def send_confirmation_code(user):
     """Функция для отправки email на почту."""
-    user = get_object_or_404(User, username=username)
     confirmation_code = default_token_generator.make_token(user)
     yamdb_email = 'yamdb@gmail.com'
     send_mail(
@@ -105,52 +235,125 @@ def send_confirmation_code(username):
         [user.email],
         fail_silently=False,
     )
-    user.save()
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def autocomplete(request):
+    """ApiView-функция для автодополнения названий.
+
+    Ищет по началу слов названий в индексе в памяти воркера, без
+    запросов к БД.
+    """
+    try:
+        limit = min(
+            int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)),
+            MAX_LIMIT
+        )
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    query = request.query_params.get('q', '')
+    return Response(autocomplete_index.search(query, max(limit, 1)))
 
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes(
+    [SignUpIPThrottle, SignUpUsernameThrottle, SignUpEmailThrottle]
+)
 def signup(request):
-    """ApiView-функция для регистрации."""
-    username = request.data.get('username')
-    email = request.data.get('email')
-    if User.objects.filter(username=username, email=email).exists():
-        user = get_object_or_404(User, username=username)
-        serializer = SignUpSerializer(user, data=request.data)
-        if serializer.is_valid():
-            send_confirmation_code(username)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
-            return Response(serializer.errors,
-                            status=status.HTTP_400_BAD_REQUEST)
+    """ApiView-функция для регистрации.
+
+    Новый пользователь создается, уже зарегистрированному с теми же
+    username и email код отправляется повторно.
+    """
     serializer = SignUpSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save()
-        send_confirmation_code(username)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    else:
-        return Response(serializer.errors,
+    if not serializer.is_valid():
+        metrics.SIGNUPS.labels('invalid').inc()
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        user, created = User.objects.signup(**serializer.validated_data)
+    except DjangoValidationError as error:
+        metrics.SIGNUPS.labels('taken').inc()
+        return Response(error.message_dict,
                         status=status.HTTP_400_BAD_REQUEST)
+    metrics.SIGNUPS.labels('created' if created else 'resent').inc()
+    send_confirmation_code(user)
+    return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes([TokenIPThrottle, TokenUsernameThrottle])
 def get_token(request):
     """ApiView-функция для получения токена."""
     serializer = TokenSerializer(data=request.data)
     if not serializer.is_valid():
+        metrics.TOKENS.labels('invalid').inc()
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     username = serializer.validated_data.get('username')
     confirmation_code = serializer.validated_data.get('confirmation_code')
-    user = get_object_or_404(User, username=username)
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        metrics.TOKENS.labels('unknown_user').inc()
+        raise Http404
     if default_token_generator.check_token(user, str(confirmation_code)):
+        metrics.TOKENS.labels('issued').inc()
         token_data = {'token': str(AccessToken.for_user(user))}
         return Response(token_data,
                         status=status.HTTP_200_OK)
+    metrics.TOKENS.labels('wrong_code').inc()
     return Response('Код подтверждения неверный',
                     status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profiles(request):
+    """Сохраненные профили запросов, от новых к старым."""
+    fields = ('id', 'method', 'path', 'status', 'duration_ms', 'sql_count')
+    summaries = [
+        profiling.read_summary(profile_id)
+        for profile_id in profiling.list_profiles()
+    ]
+    return Response([
+        {field: summary[field] for field in fields}
+        for summary in summaries if summary is not None
+    ])
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    """Лучшие функции и хронология SQL профиля."""
+    summary = profiling.read_summary(profile_id)
+    if summary is None:
+        raise Http404
+    return Response(summary)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_download(request, profile_id):
+    """Полный профиль в формате pstats."""
+    if profiling.read_summary(profile_id) is None:
+        raise Http404
+    return FileResponse(
+        open(profiling.profile_path(profile_id, 'prof'), 'rb'),
+        as_attachment=True,
+        filename=f'{profile_id}.prof'
+    )
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus для всех воркеров."""
+    content, content_type = metrics.render()
+    return HttpResponse(content, content_type=content_type)
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """Viewset для пользователей и Get, Patch запросов на эндпоин 'me'."""
     queryset = User.objects.all()
@@ -160,6 +363,7 @@ class UserViewSet(viewsets.ModelViewSet):
     search_fields = ('username',)
     http_method_names = ('get', 'post', 'delete', 'patch')
     permission_classes = (IsAdminUser,)
+    pagination_class = UserPagination
 
     @action(
         methods=['GET', 'PATCH'],
@@ -183,3 +387,59 @@ class UserViewSet(viewsets.ModelViewSet):
             else:
                 return Response(serializer.errors,
                                 status=status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        methods=['GET'],
+        detail=True,
+        permission_classes=[AllowAny]
+    )
+    def activity(self, request, username=None):
+        """Отзывы и комментарии пользователя, новые сначала."""
+        user = get_object_or_404(User, username=username)
+        return self.get_activity_response(request, user)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='me/activity',
+        permission_classes=[IsAuthenticated]
+    )
+    def me_activity(self, request):
+        return self.get_activity_response(request, request.user)
+
+    def get_activity_response(self, request, user):
+        streams = {
+            'review': (
+                Review.objects.filter(author=user)
+                .select_related('title')
+                .only('id', 'text', 'score', 'pub_date',
+                      'title__id', 'title__name')
+            ),
+            'comment': (
+                Comment.objects.filter(author=user)
+                .select_related('review__title')
+                .only('id', 'text', 'pub_date', 'review__id',
+                      'review__title__id', 'review__title__name')
+            ),
+            # Архивные комментарии в ленте не отличаются от остальных,
+            # но читаются отдельным потоком из своей таблицы.
+            'archived_comment': (
+                CommentArchive.objects.filter(author=user)
+                .select_related('review__title')
+                .only('id', 'text', 'pub_date', 'review__id',
+                      'review__title__id', 'review__title__name')
+            ),
+        }
+        serializers = {
+            'review': ('review', ActivityReviewSerializer),
+            'comment': ('comment', ActivityCommentSerializer),
+            'archived_comment': (
+                'comment', ActivityArchivedCommentSerializer
+            ),
+        }
+        paginator = MergedCursorPagination()
+        page = paginator.paginate_streams(streams, request)
+        return paginator.get_paginated_response([
+            {'type': serializers[kind][0], **serializers[kind][1](obj).data}
+            for kind, obj in page
+        ])
@@ -2,6 +2,8 @@
 ASGI config for YaMDb project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Server-Sent Events streams (api.sse) are served without Django's request
+handling so that idle connections do not occupy worker threads.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -13,4 +15,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Модули проекта загружаются только после настройки Django.
+from api import sse  # noqa: E402 isort:skip
+
+
+async def application(scope, receive, send):
+    title_id = sse.match(scope)
+    if title_id is not None:
+        await sse.stream_events(scope, receive, send, title_id)
+        return
+    await django_application(scope, receive, send)
@@ -0,0 +1,98 @@
+"""Метрики Prometheus.
+
+Под gunicorn каждый воркер пишет значения в свои mmap-файлы в каталоге
+PROMETHEUS_MULTIPROC_DIR, а /metrics суммирует файлы всех воркеров.
+Без этой переменной (runserver, тесты) метрики хранятся в памяти
+процесса.
+"""
+import os
+
+from django.db import DatabaseError
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+from reviews.jobs import queue_stats
+
+REQUESTS = Counter(
+    'yamdb_http_requests_total',
+    'HTTP-запросы по маршруту, методу и статусу.',
+    ['route', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'yamdb_http_request_duration_seconds',
+    'Время обработки запроса.',
+    ['route', 'method']
+)
+DB_QUERIES = Counter(
+    'yamdb_db_queries_total',
+    'Запросы к БД по маршруту.',
+    ['route']
+)
+DB_QUERY_SECONDS = Counter(
+    'yamdb_db_query_duration_seconds_total',
+    'Суммарное время запросов к БД по маршруту.',
+    ['route']
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'yamdb_db_queries_per_request',
+    'Число запросов к БД за HTTP-запрос.',
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float('inf'))
+)
+CACHE_REQUESTS = Counter(
+    'yamdb_cache_requests_total',
+    'Обращения к кэшам справочников: hit или miss.',
+    ['cache', 'result']
+)
+SIGNUPS = Counter(
+    'yamdb_signup_total',
+    'Результаты регистрации.',
+    ['outcome']
+)
+TOKENS = Counter(
+    'yamdb_token_total',
+    'Результаты получения токена.',
+    ['outcome']
+)
+
+
+class JobQueueCollector:
+    """Глубина и отставание очереди фоновых задач на момент сбора."""
+
+    def collect(self):
+        try:
+            stats = queue_stats()
+        except DatabaseError:
+            return
+        depth = GaugeMetricFamily(
+            'yamdb_jobs_queue_depth', 'Задачи в очереди.', labels=['kind']
+        )
+        lag = GaugeMetricFamily(
+            'yamdb_jobs_queue_lag_seconds',
+            'Возраст самой старой задачи в очереди.',
+            labels=['kind']
+        )
+        for kind, values in stats.items():
+            depth.add_metric([kind], values['depth'])
+            lag.add_metric([kind], values['lag'])
+        yield depth
+        yield lag
+
+
+def render():
+    """Текст метрик и его content type."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(ProcessCollector())
+    registry.register(JobQueueCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class ProcessCollector:
+    """Метрики текущего процесса из глобального реестра."""
+
+    def collect(self):
+        return REGISTRY.collect()
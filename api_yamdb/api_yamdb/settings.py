@@ -35,13 +35,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.ReplicaRoutingMiddleware",
+    "api.middleware.SlowQueryMiddleware",
 ]
 
 ROOT_URLCONF = "api_yamdb.urls"
@@ -77,6 +81,25 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: хосты (для sqlite — файлы БД) через запятую.
+REPLICA_HOSTS = [
+    host.strip() for host in os.getenv('DB_REPLICAS', '').split(',')
+    if host.strip()
+]
+DB_REPLICAS = [f'replica_{number}' for number in range(1, len(REPLICA_HOSTS) + 1)]
+for alias, host in zip(DB_REPLICAS, REPLICA_HOSTS):
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+# Реплика с большим отставанием (в секундах) не используется.
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 5))
+# Сколько секунд после записи клиент читает из основной базы.
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,8 +147,75 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 5,
+    # Запросы проходят через nginx, реальный IP клиента — последний
+    # адрес в X-Forwarded-For.
+    "NUM_PROXIES": int(os.getenv('NUM_PROXIES', 1)),
+    "DEFAULT_THROTTLE_RATES": {
+        "signup_ip": os.getenv('THROTTLE_SIGNUP_IP', '20/hour'),
+        "signup_username": os.getenv('THROTTLE_SIGNUP_USERNAME', '5/hour'),
+        "signup_email": os.getenv('THROTTLE_SIGNUP_EMAIL', '5/hour'),
+        "token_ip": os.getenv('THROTTLE_TOKEN_IP', '60/hour'),
+        "token_username": os.getenv('THROTTLE_TOKEN_USERNAME', '10/hour'),
+    },
 }
 
+# Кэш должен быть общим для всех воркеров gunicorn (memcached),
+# иначе лимиты запросов считаются отдельно в каждом процессе.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кэш категорий и жанров в памяти воркера: максимум объектов и
+# интервал проверки версии в общем кэше (в секундах).
+REFERENCE_CACHE_MAX_SIZE = int(os.getenv('REFERENCE_CACHE_MAX_SIZE', 1000))
+REFERENCE_CACHE_CHECK_INTERVAL = float(os.getenv('REFERENCE_CACHE_CHECK_INTERVAL', 1))
+
+# Индекс автодополнения (reviews.autocomplete): сколько самых популярных
+# произведений держать в памяти воркера.
+AUTOCOMPLETE_MAX_TITLES = int(os.getenv('AUTOCOMPLETE_MAX_TITLES', 100000))
+
+# Сколько похожих произведений хранить для каждого (reviews.similarity).
+SIMILAR_TITLES_COUNT = int(os.getenv('SIMILAR_TITLES_COUNT', 10))
+
+# Максимум произведений в запросе /api/v1/titles/batch/?ids=...
+TITLES_BATCH_MAX_SIZE = int(os.getenv('TITLES_BATCH_MAX_SIZE', 50))
+
+# Фоновый пересчет производных данных (reviews.jobs): размер пакета задач,
+# пауза воркера при пустой очереди и базовая задержка повтора после ошибки
+# (в секундах). JOBS_RUN_INLINE выполняет задачи сразу, без очереди.
+JOBS_BATCH_SIZE = int(os.getenv('JOBS_BATCH_SIZE', 100))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+JOBS_RUN_INLINE = os.getenv('JOBS_RUN_INLINE', 'false').lower() == 'true'
+
+# Журнал медленных запросов (api.slow_queries): порог в миллисекундах,
+# доля записываемых медленных запросов и размер кольцевого буфера.
+# Журнал хранится в CACHES, для чтения из другого процесса нужен общий кэш.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', 1))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', 200))
+
+# Поток SSE (api.sse): интервал комментария-пинга в секундах, чтобы
+# прокси не закрывали простаивающее соединение, и размер очереди
+# событий одного клиента.
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', 15))
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+
+# Профилирование запросов администраторов по заголовку X-Profile
+# (api.profiling): каталог профилей, сколько профилей хранить, сколько
+# запросов в минуту профилировать на все воркеры и сколько функций
+# попадает в сводку. Профили хранятся вне каталога приложения, как и
+# файлы метрик воркеров.
+PROFILER_DIR = os.getenv('PROFILER_DIR', '/tmp/profiles')
+PROFILER_KEEP = int(os.getenv('PROFILER_KEEP', 50))
+PROFILER_RATE_LIMIT = int(os.getenv('PROFILER_RATE_LIMIT', 10))
+PROFILER_TOP_FUNCTIONS = int(os.getenv('PROFILER_TOP_FUNCTIONS', 30))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=14),
     "AUTH_HEADER_TYPES": ("Bearer",),
@@ -0,0 +1,45 @@
+"""Профиль настроек для сервиса, который отдает только API.
+
+Отключены админка, сессии, сообщения, staticfiles и CSRF: клиенты API
+авторизуются по JWT. ProfilerMiddleware остается: без
+AuthenticationMiddleware администратора он определяет по JWT.
+Включается переменной окружения
+DJANGO_SETTINGS_MODULE=api_yamdb.settings_api.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+API_EXCLUDED_APPS = (
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+)
+
+API_EXCLUDED_MIDDLEWARE = (
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+)
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in API_EXCLUDED_MIDDLEWARE
+]
+
+ROOT_URLCONF = "api_yamdb.urls_api"
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    "OPTIONS": {
+        "context_processors": [
+            "django.template.context_processors.debug",
+            "django.template.context_processors.request",
+        ],
+    },
+}]
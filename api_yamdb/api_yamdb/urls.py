@@ -1,11 +1,8 @@
 from django.contrib import admin
-from django.urls import include, path
-from django.views.generic import TemplateView
+from django.urls import path
+
+from .urls_api import urlpatterns as api_urlpatterns
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/", include("api.urls")),
-    path("redoc/", TemplateView.as_view(
-        template_name="redoc.html"),
-        name="redoc"),
-]
+] + api_urlpatterns
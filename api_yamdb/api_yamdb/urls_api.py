@@ -0,0 +1,11 @@
+from api.views import metrics_view
+from django.urls import include, path
+from django.views.generic import TemplateView
+
+urlpatterns = [
+    path("api/", include("api.urls")),
+    path("redoc/", TemplateView.as_view(
+        template_name="redoc.html"),
+        name="redoc"),
+    path("metrics", metrics_view, name="metrics"),
+]
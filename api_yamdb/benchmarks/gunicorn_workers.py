@@ -0,0 +1,157 @@
+"""Сравнение конфигураций воркеров gunicorn.
+
+Для каждой конфигурации скрипт запускает gunicorn с gunicorn.conf.py,
+переопределяя параметры переменными окружения, и нагружает два
+эндпоинта: список произведений (GET) и создание отзыва (POST).
+Созданные отзывы после замера удаляются.
+
+Запуск из каталога api_yamdb (нужна рабочая БД и JWT-токен):
+
+    python benchmarks/gunicorn_workers.py --token <jwt> \\
+        --configs sync:1:1 sync:4:1 gthread:4:4 gevent:4:0
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TITLES_URL = '/api/v1/titles/'
+REVIEWS_URL = '/api/v1/titles/{title_id}/reviews/'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--configs', nargs='+', default=['sync:1:1', 'gthread:4:4'],
+        help='Конфигурации вида worker_class:workers:threads.'
+    )
+    parser.add_argument('--bind', default='127.0.0.1:8765')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument(
+        '--token', help='JWT для создания отзывов. Без него замер '
+                        'создания отзывов пропускается.'
+    )
+    parser.add_argument(
+        '--title-ids', default='1-50',
+        help='Диапазон id произведений для создания отзывов.'
+    )
+    return parser.parse_args()
+
+
+def start_server(config, bind):
+    worker_class, workers, threads = config.split(':')
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=bind,
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=workers,
+        GUNICORN_THREADS=threads,
+        GUNICORN_ACCESSLOG='',
+        GUNICORN_LOGLEVEL='warning',
+    )
+    return subprocess.Popen(
+        ['gunicorn', 'api_yamdb.wsgi:application', '-c', 'gunicorn.conf.py'],
+        cwd=BASE_DIR, env=env
+    )
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + TITLES_URL, timeout=1)
+        except requests.ConnectionError:
+            time.sleep(0.2)
+        else:
+            return
+    raise RuntimeError(f'Сервер {base_url} не запустился за {timeout} с')
+
+
+def run_load(calls, concurrency):
+    """Выполняет вызовы параллельно, возвращает время и ответы."""
+    def timed(call):
+        started = time.perf_counter()
+        response = call()
+        return time.perf_counter() - started, response
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, calls))
+    return time.perf_counter() - started, results
+
+
+def report(config, endpoint, elapsed, results, ok_status):
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(
+        1 for _, response in results if response.status_code != ok_status
+    )
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f'{config:<16}{endpoint:<16}{len(results) / elapsed:>10.1f}'
+        f'{statistics.median(latencies) * 1000:>10.1f}'
+        f'{p95 * 1000:>10.1f}{errors:>8}'
+    )
+
+
+def bench_titles(session, base_url, args, config):
+    calls = [
+        lambda: session.get(base_url + TITLES_URL)
+        for _ in range(args.requests)
+    ]
+    elapsed, results = run_load(calls, args.concurrency)
+    report(config, 'titles list', elapsed, results, 200)
+
+
+def bench_reviews(session, base_url, args, config):
+    first, last = map(int, args.title_ids.split('-'))
+    headers = {'Authorization': f'Bearer {args.token}'}
+
+    def create(title_id):
+        return lambda: session.post(
+            base_url + REVIEWS_URL.format(title_id=title_id),
+            json={'text': 'benchmark', 'score': 5},
+            headers=headers
+        )
+
+    calls = [create(title_id) for title_id in range(first, last + 1)]
+    elapsed, results = run_load(calls, args.concurrency)
+    report(config, 'review create', elapsed, results, 201)
+    for _, response in results:
+        if response.status_code == 201:
+            session.delete(
+                response.url + f'{response.json()["id"]}/', headers=headers
+            )
+
+
+def main():
+    args = parse_args()
+    base_url = f'http://{args.bind}'
+    print(f'{"config":<16}{"endpoint":<16}{"rps":>10}'
+          f'{"p50 ms":>10}{"p95 ms":>10}{"errors":>8}')
+    for config in args.configs:
+        server = start_server(config, args.bind)
+        try:
+            wait_ready(base_url)
+            with requests.Session() as session:
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=args.concurrency
+                )
+                session.mount('http://', adapter)
+                bench_titles(session, base_url, args, config)
+                if args.token:
+                    bench_reviews(session, base_url, args, config)
+        finally:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Настройки gunicorn для контейнера web.
+
+Все значения можно переопределить переменными окружения из .env,
+например GUNICORN_WORKERS=4 или GUNICORN_WORKER_CLASS=sync.
+"""
+import multiprocessing
+import os
+import shutil
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Воркеры: 2 * CPU + 1 — стандартная рекомендация gunicorn.
+workers = env_int('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+
+# gthread: каждый воркер обслуживает несколько запросов в потоках,
+# поэтому медленный запрос не блокирует весь процесс. Для gevent
+# нужно дополнительно установить пакет gevent.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = env_int('GUNICORN_THREADS', 4)
+worker_connections = env_int('GUNICORN_WORKER_CONNECTIONS', 1000)
+
+# Перезапуск воркера после N запросов защищает от утечек памяти,
+# jitter не дает всем воркерам перезапуститься одновременно.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Приложение импортируется в мастер-процессе до fork, воркеры
+# разделяют память (copy-on-write) и стартуют быстрее.
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+# Метрики Prometheus: воркеры пишут значения в файлы этого каталога,
+# /metrics суммирует их. Каталог готовится здесь, а не в on_starting:
+# при preload_app приложение импортируется раньше этого хука.
+# Метрики прошлого запуска удаляются.
+prometheus_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus'
+)
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,52 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
 from .models import Category, Comment, Genre, Review, Title, User
+from .utils import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списков больших таблиц.
+
+    Для списка без фильтров число строк берется из статистики PostgreSQL
+    вместо COUNT(*) по всей таблице, если строк больше threshold.
+    """
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список большой таблицы: без полного подсчета строк."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ScoreFilter(admin.SimpleListFilter):
+    """Фильтр по оценке с фиксированным списком значений.
+
+    Стандартный фильтр поля собирает значения запросом
+    SELECT DISTINCT по всей таблице.
+    """
+    title = 'Оценка'
+    parameter_name = 'score'
+
+    def lookups(self, request, model_admin):
+        return [(str(score), str(score)) for score in range(1, 11)]
+
+    def queryset(self, request, queryset):
+        # Значение не из списка (например, ?score=abc) не фильтрует.
+        if self.value() not in dict(self.lookup_choices):
+            return queryset
+        return queryset.filter(score=self.value())
 
 
 @admin.register(Category)
@@ -30,11 +76,13 @@ class TitleAdmin(admin.ModelAdmin):
         'year',
         'category'
     )
+    list_select_related = ('category',)
+    search_fields = ('name',)
     filter_horizontal = ('genre',)
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = (
         'username',
         'role',
@@ -43,10 +91,11 @@ class UserAdmin(admin.ModelAdmin):
         'last_name',
         'bio',
     )
+    search_fields = ('username', 'email')
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     list_display = (
         'id',
         'text',
@@ -55,10 +104,14 @@ class ReviewAdmin(admin.ModelAdmin):
         'score',
         'pub_date'
     )
+    list_select_related = ('title', 'author')
+    list_filter = (('pub_date', admin.DateFieldListFilter), ScoreFilter)
+    autocomplete_fields = ('title', 'author')
+    ordering = ('-pub_date', '-id')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'id',
         'text',
@@ -66,3 +119,8 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'pub_date'
     )
+    list_select_related = ('review', 'author')
+    list_filter = (('pub_date', admin.DateFieldListFilter),)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('review',)
+    ordering = ('-pub_date', '-id')
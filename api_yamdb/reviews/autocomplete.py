@@ -0,0 +1,361 @@
+"""Префиксный индекс названий для автодополнения.
+
+Каждый воркер держит в памяти отсортированные ключи — нормализованное
+название и его хвосты с начала каждого слова. Совпадения с префиксом
+образуют непрерывный отрезок, его границы ищутся через bisect, лучшие
+по популярности совпадения выбирает heapq. Изменения объектов
+записываются в журнал в общем кэше Django; воркеры раз в
+check_interval секунд перечитывают из БД только измененные объекты.
+Если журнал отстал или потерян, индекс строится заново.
+"""
+import heapq
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F
+
+from .models import Category, Genre, Title
+
+TITLE = 'title'
+GENRE = 'genre'
+CATEGORY = 'category'
+KINDS = (TITLE, GENRE, CATEGORY)
+
+VERSION_KEY = 'autocomplete_version'
+CHANGE_KEY = 'autocomplete_change_{}'
+CHANGE_TIMEOUT = 3600
+# Если воркер отстал больше чем на столько изменений, индекс
+# перестраивается целиком.
+MAX_PENDING_CHANGES = 500
+# Ключи строятся с начала первых MAX_WORDS слов названия и обрезаются
+# до MAX_KEY_LENGTH символов, это ограничивает память на произведение.
+MAX_WORDS = 3
+MAX_KEY_LENGTH = 32
+MEMO_SIZE = 1024
+# Больше MAX_LIMIT совпадений одного типа не возвращается.
+MAX_LIMIT = 20
+# Под короткие префиксы попадает слишком много ключей, для них лучшие
+# MAX_LIMIT объектов хранятся заранее.
+SHORT_PREFIX = 2
+# Байт 0xff не встречается в UTF-8: все ключи, начинающиеся с префикса,
+# меньше префикс + 0xff.
+PREFIX_END = b'\xff'
+
+NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    return NON_WORD.sub(' ', text.casefold().replace('ё', 'е')).strip()
+
+
+def key_strings(name):
+    words = normalize(name).split()
+    return {
+        ' '.join(words[start:])[:MAX_KEY_LENGTH]
+        for start in range(min(len(words), MAX_WORDS))
+    }
+
+
+def name_keys(name):
+    return {key.encode() for key in key_strings(name)}
+
+
+def short_prefixes(name):
+    return {
+        key[:length].encode()
+        for key in key_strings(name)
+        for length in range(1, SHORT_PREFIX + 1)
+    }
+
+
+def notify(kind, object_ids):
+    """Сообщает индексам всех воркеров об изменении объектов.
+
+    Запись в журнал — после фиксации транзакции, чтобы воркеры
+    перечитали уже сохраненные данные.
+    """
+    transaction.on_commit(partial(write_change, kind, sorted(object_ids)))
+
+
+def write_change(kind, object_ids):
+    cache.add(VERSION_KEY, 0, None)
+    version = cache.incr(VERSION_KEY)
+    cache.set(CHANGE_KEY.format(version), (kind, object_ids), CHANGE_TIMEOUT)
+
+
+class Item:
+    __slots__ = ('pk', 'name', 'slug', 'score', 'rating')
+
+    def __init__(self, pk, name, slug, popularity, rating=None):
+        self.pk = pk
+        self.name = name
+        self.slug = slug
+        self.rating = rating
+        # Популярность, при равенстве — рейтинг (не больше 10).
+        self.score = (popularity or 0) + (rating or 0) / 100
+
+    def as_dict(self):
+        if self.slug is None:
+            return {'id': self.pk, 'name': self.name, 'rating': self.rating}
+        return {'slug': self.slug, 'name': self.name}
+
+
+class PrefixIndex:
+    """Ключи объектов одного типа, отсортированные по ключу.
+
+    keys, ids и scores — параллельные массивы: у ключа keys[i]
+    объект ids[i] с популярностью scores[i]. Для префиксов до
+    SHORT_PREFIX символов top хранит лучшие пары (score, pk). Если из
+    такого списка ушел объект, префикс помечается в stale и список
+    пересчитывается при следующем поиске.
+    """
+
+    def __init__(self, items=()):
+        self.items = {item.pk: item for item in items}
+        entries = sorted(
+            (key, item.pk, item.score)
+            for item in self.items.values() for key in name_keys(item.name)
+        )
+        self.keys = [key for key, _, _ in entries]
+        self.ids = array('q', (pk for _, pk, _ in entries))
+        self.scores = array('d', (score for _, _, score in entries))
+        heaps = defaultdict(list)
+        for item in self.items.values():
+            for prefix in short_prefixes(item.name):
+                push_bounded(heaps[prefix], (item.score, item.pk))
+        self.top = {
+            prefix: sorted(heap, reverse=True)
+            for prefix, heap in heaps.items()
+        }
+        self.stale = set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, prefix, limit):
+        if len(prefix) > SHORT_PREFIX:
+            best = self.scan(prefix.encode(), limit)
+        else:
+            prefix = prefix.encode()
+            if prefix in self.stale:
+                self.top[prefix] = self.scan(prefix, MAX_LIMIT)
+                self.stale.discard(prefix)
+            best = self.top.get(prefix, [])
+        return [self.items[pk] for _, pk in best[:limit]]
+
+    def scan(self, prefix, limit):
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + PREFIX_END, start)
+        # Объект может совпасть несколькими ключами: берем с запасом.
+        candidates = heapq.nlargest(limit * MAX_WORDS, zip(
+            self.scores[start:end], self.ids[start:end]
+        ))
+        best = OrderedDict()
+        for score, pk in candidates:
+            best.setdefault(pk, score)
+        return [(score, pk) for pk, score in best.items()][:limit]
+
+    def position(self, key, pk):
+        position = bisect_left(self.keys, key)
+        while self.ids[position] != pk:
+            position += 1
+        return position
+
+    def add(self, item):
+        self.items[item.pk] = item
+        for key in name_keys(item.name):
+            position = bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.ids.insert(position, item.pk)
+            self.scores.insert(position, item.score)
+        for prefix in short_prefixes(item.name):
+            self.offer(prefix, item)
+
+    def update(self, item):
+        old = self.items.get(item.pk)
+        if old is None or old.name != item.name:
+            self.remove(item.pk)
+            self.add(item)
+            return
+        self.items[item.pk] = item
+        for key in name_keys(item.name):
+            self.scores[self.position(key, item.pk)] = item.score
+        for prefix in short_prefixes(item.name):
+            if item.score < old.score:
+                self.forget(prefix, item.pk)
+            self.offer(prefix, item)
+
+    def remove(self, pk):
+        item = self.items.pop(pk, None)
+        if item is None:
+            return
+        for key in name_keys(item.name):
+            position = self.position(key, pk)
+            del self.keys[position]
+            del self.ids[position]
+            del self.scores[position]
+        for prefix in short_prefixes(item.name):
+            self.forget(prefix, pk)
+
+    def offer(self, prefix, item):
+        if prefix in self.stale:
+            return
+        best = [entry for entry in self.top.get(prefix, ()) if (
+            entry[1] != item.pk
+        )]
+        best.append((item.score, item.pk))
+        best.sort(reverse=True)
+        self.top[prefix] = best[:MAX_LIMIT]
+
+    def forget(self, prefix, pk):
+        if any(entry[1] == pk for entry in self.top.get(prefix, ())):
+            self.stale.add(prefix)
+
+
+def push_bounded(heap, entry):
+    if len(heap) < MAX_LIMIT:
+        heapq.heappush(heap, entry)
+    else:
+        heapq.heappushpop(heap, entry)
+
+
+class AutocompleteIndex:
+    """Индекс названий произведений, жанров и категорий.
+
+    Произведений индексируется не больше max_titles — самые
+    популярные по числу отзывов. Популярность жанров и категорий
+    (число произведений) обновляется при полной перестройке.
+    """
+
+    def __init__(self, max_titles=None, check_interval=None):
+        self.max_titles = max_titles or settings.AUTOCOMPLETE_MAX_TITLES
+        self.check_interval = (
+            check_interval or settings.REFERENCE_CACHE_CHECK_INTERVAL
+        )
+        self.lock = threading.RLock()
+        self.version = None
+        self.checked_at = 0
+        self.indexes = {kind: PrefixIndex() for kind in KINDS}
+        self.memo = OrderedDict()
+
+    def search(self, query, limit):
+        """Лучшие по популярности совпадения каждого типа."""
+        prefix = normalize(query)[:MAX_KEY_LENGTH]
+        if not prefix:
+            return {kind: [] for kind in KINDS}
+        with self.lock:
+            self.check_version()
+            key = (prefix, limit)
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                return self.memo[key]
+            result = {
+                kind: [
+                    item.as_dict()
+                    for item in self.indexes[kind].search(prefix, limit)
+                ]
+                for kind in KINDS
+            }
+            self.memo[key] = result
+            if len(self.memo) > MEMO_SIZE:
+                self.memo.popitem(last=False)
+            return result
+
+    def check_version(self):
+        if self.version is not None and (
+            time.monotonic() - self.checked_at < self.check_interval
+        ):
+            return
+        self.checked_at = time.monotonic()
+        version = cache.get(VERSION_KEY) or 0
+        if version == self.version:
+            return
+        if self.version is None or not self.apply_changes(version):
+            self.rebuild(version)
+
+    def apply_changes(self, version):
+        """Перечитывает объекты из журнала, False — нужна перестройка."""
+        if not 0 < version - self.version <= MAX_PENDING_CHANGES:
+            return False
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(self.version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        object_ids = defaultdict(set)
+        for kind, ids in changes.values():
+            object_ids[kind].update(ids)
+        for kind, ids in object_ids.items():
+            self.reload(kind, ids)
+        self.version = version
+        return len(self.indexes[TITLE]) <= self.max_titles * 1.1
+
+    def rebuild(self, version):
+        titles = self.queryset(TITLE).order_by(
+            F('stats__review_count').desc(nulls_last=True), 'pk'
+        )[:self.max_titles]
+        self.indexes = {
+            TITLE: PrefixIndex(make_item(TITLE, row) for row in titles),
+            GENRE: PrefixIndex(
+                make_item(GENRE, row) for row in self.queryset(GENRE)
+            ),
+            CATEGORY: PrefixIndex(
+                make_item(CATEGORY, row) for row in self.queryset(CATEGORY)
+            ),
+        }
+        self.memo.clear()
+        self.version = version
+
+    def reload(self, kind, object_ids):
+        index = self.indexes[kind]
+        rows = {row[0]: row for row in self.queryset(kind).filter(
+            pk__in=object_ids
+        )}
+        changed_keys = set()
+        for pk in object_ids:
+            if pk in index.items:
+                changed_keys.update(key_strings(index.items[pk].name))
+            if pk in rows:
+                item = make_item(kind, rows[pk])
+                changed_keys.update(key_strings(item.name))
+                index.update(item)
+            else:
+                index.remove(pk)
+        self.invalidate_memo(changed_keys)
+
+    def invalidate_memo(self, changed_keys):
+        """Удаляет из memo только префиксы измененных ключей."""
+        for prefix, limit in list(self.memo):
+            if any(key.startswith(prefix) for key in changed_keys):
+                del self.memo[prefix, limit]
+
+    def queryset(self, kind):
+        # Читаем из основной базы, как и справочники в ReferenceCache.
+        if kind == TITLE:
+            return Title.objects.using(DEFAULT_DB_ALIAS).values_list(
+                'pk', 'name', 'stats__review_count', 'stats__rating'
+            )
+        model = Genre if kind == GENRE else Category
+        return model.objects.using(DEFAULT_DB_ALIAS).annotate(
+            popularity=Count('titles')
+        ).values_list('pk', 'name', 'slug', 'popularity').order_by()
+
+
+def make_item(kind, row):
+    if kind == TITLE:
+        pk, name, review_count, rating = row
+        return Item(pk, name, None, review_count, rating)
+    return Item(*row)
+
+
+autocomplete_index = AutocompleteIndex()
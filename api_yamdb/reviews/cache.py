@@ -0,0 +1,126 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from api_yamdb.metrics import CACHE_REQUESTS
+
+from .models import Category, Genre
+
+
+class ReferenceCache:
+    """Кэш небольшого справочника (категорий, жанров) в памяти процесса.
+
+    Если в таблице не больше max_size строк, она загружается целиком
+    одним запросом, и промах по ключу означает, что объекта нет.
+    Иначе кэш работает как LRU на max_size объектов и при промахе
+    обращается к БД.
+
+    Версия справочника хранится в общем кэше Django. Изменение
+    справочника в любом воркере меняет версию, остальные воркеры
+    сбрасывают свою копию при следующей проверке версии — не чаще
+    раза в check_interval секунд.
+    """
+
+    def __init__(self, model, max_size=None, check_interval=None):
+        self.model = model
+        self.max_size = max_size or settings.REFERENCE_CACHE_MAX_SIZE
+        self.check_interval = (
+            check_interval or settings.REFERENCE_CACHE_CHECK_INTERVAL
+        )
+        self.version_key = f'reference_cache_{model._meta.label_lower}'
+        self.hits = CACHE_REQUESTS.labels(model._meta.label_lower, 'hit')
+        self.misses = CACHE_REQUESTS.labels(model._meta.label_lower, 'miss')
+        self.lock = threading.RLock()
+        self.reset()
+
+    def __deepcopy__(self, memo):
+        # Кэш общий для процесса: поля сериализаторов копируются
+        # при каждом создании сериализатора, кэш — нет.
+        return self
+
+    def reset(self, version=None):
+        with self.lock:
+            self.version = version
+            self.checked_at = time.monotonic()
+            self.by_id = OrderedDict()
+            self.by_slug = OrderedDict()
+            self.loaded = False
+            self.complete = False
+
+    def invalidate(self):
+        """Сбрасывает кэш во всех процессах."""
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+        self.reset()
+
+    def check_version(self):
+        if self.version is not None and (
+            time.monotonic() - self.checked_at < self.check_interval
+        ):
+            return
+        version = cache.get_or_set(self.version_key, uuid.uuid4().hex, None)
+        if version != self.version:
+            self.reset(version)
+        else:
+            self.checked_at = time.monotonic()
+
+    @property
+    def queryset(self):
+        # Читаем из основной базы: на отстающей реплике кэш мог бы
+        # запомнить устаревший справочник до следующего изменения.
+        return self.model.objects.using(DEFAULT_DB_ALIAS)
+
+    def load(self):
+        objects = list(self.queryset.order_by('pk')[:self.max_size + 1])
+        self.complete = len(objects) <= self.max_size
+        if self.complete:
+            for obj in objects:
+                self.remember(obj)
+        self.loaded = True
+
+    def remember(self, obj):
+        self.by_id[obj.pk] = obj
+        self.by_slug[obj.slug] = obj
+        while len(self.by_id) > self.max_size:
+            _, evicted = self.by_id.popitem(last=False)
+            self.by_slug.pop(evicted.slug, None)
+
+    def get(self, index, lookup, value):
+        with self.lock:
+            self.check_version()
+            hit = self.loaded
+            if not self.loaded:
+                self.load()
+            obj = getattr(self, index).get(value)
+            if obj is not None or self.complete:
+                (self.hits if hit else self.misses).inc()
+                if obj is not None:
+                    self.by_id.move_to_end(obj.pk)
+                return obj
+            self.misses.inc()
+            obj = self.queryset.filter(**{lookup: value}).first()
+            if obj is not None:
+                self.remember(obj)
+            return obj
+
+    def get_by_id(self, pk):
+        return self.get('by_id', 'pk', pk)
+
+    def get_by_slug(self, slug):
+        return self.get('by_slug', 'slug', slug)
+
+    def all(self):
+        """Все объекты справочника или None, если он не помещается в кэш."""
+        with self.lock:
+            self.check_version()
+            if not self.loaded:
+                self.load()
+            return list(self.by_id.values()) if self.complete else None
+
+
+category_cache = ReferenceCache(Category)
+genre_cache = ReferenceCache(Genre)
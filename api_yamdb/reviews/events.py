@@ -0,0 +1,181 @@
+"""События о новых отзывах и комментариях для потока SSE.
+
+На PostgreSQL событие отправляется через pg_notify в транзакции записи:
+NOTIFY доставляется только после COMMIT и пропадает при откате. Каждый
+процесс держит одно соединение LISTEN и раздает события подписчикам
+своего event loop. На других СУБД события раздаются внутри процесса
+после коммита (для разработки и тестов).
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'yamdb_events'
+# Предел NOTIFY — 8000 байт, длинный текст в событие не попадает.
+MAX_PAYLOAD = 7900
+LISTEN_TIMEOUT = 5
+RECONNECT_DELAY = 3
+
+
+def review_event(review):
+    return {
+        'type': 'review',
+        'title_id': review.title_id,
+        'id': review.pk,
+        'text': review.text,
+        'score': review.score,
+        'author': review.author.username,
+        'pub_date': review.pub_date.isoformat(),
+    }
+
+
+def comment_event(comment, title_id):
+    return {
+        'type': 'comment',
+        'title_id': title_id,
+        'review_id': comment.review_id,
+        'id': comment.pk,
+        'text': comment.text,
+        'author': comment.author.username,
+        'pub_date': comment.pub_date.isoformat(),
+    }
+
+
+def publish(event, using='default'):
+    """Отправляет событие подписчикам после коммита транзакции."""
+    payload = json.dumps(event, ensure_ascii=False)
+    if len(payload.encode()) > MAX_PAYLOAD:
+        event = dict(event, text=None, truncated=True)
+        payload = json.dumps(event, ensure_ascii=False)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        transaction.on_commit(partial(broker.dispatch, event), using=using)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+
+class EventBroker:
+    """Раздача событий подписчикам процесса по title_id.
+
+    Подписчик — asyncio.Queue в своем event loop. Поток LISTEN
+    запускается при первой подписке, один на процесс.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+        self.listener = None
+        # Установлен, когда LISTEN выполнен и события не потеряются.
+        self.ready = threading.Event()
+        self.stopping = False
+        self.wakeup = None
+
+    def subscribe(self, title_id):
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        subscriber = (asyncio.get_event_loop(), queue)
+        with self.lock:
+            self.subscribers[title_id].add(subscriber)
+            self.start_listener()
+        return subscriber
+
+    def unsubscribe(self, title_id, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(title_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self.subscribers.pop(title_id, None)
+
+    def dispatch(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(event['title_id'], ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(deliver, queue, event)
+
+    def start_listener(self):
+        if self.listener is not None:
+            return
+        if connections['default'].vendor != 'postgresql':
+            self.ready.set()
+            return
+        self.stopping = False
+        self.wakeup = os.pipe()
+        self.listener = threading.Thread(
+            target=self.listen, name='yamdb-events', daemon=True
+        )
+        self.listener.start()
+
+    def stop(self):
+        """Останавливает поток LISTEN и закрывает его соединение."""
+        with self.lock:
+            listener, self.listener = self.listener, None
+        self.ready.clear()
+        if listener is None or self.wakeup is None:
+            return
+        self.stopping = True
+        os.write(self.wakeup[1], b'x')
+        listener.join()
+        for descriptor in self.wakeup:
+            os.close(descriptor)
+        self.wakeup = None
+
+    def listen(self):
+        while not self.stopping:
+            try:
+                self.listen_once()
+            except Exception:
+                logger.exception('Соединение LISTEN %s потеряно', CHANNEL)
+            self.ready.clear()
+            if not self.stopping:
+                time.sleep(RECONNECT_DELAY)
+
+    def listen_once(self):
+        database = connections['default']
+        connection = database.Database.connect(
+            **database.get_connection_params()
+        )
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            self.ready.set()
+            while not self.stopping:
+                readable = select.select(
+                    [connection, self.wakeup[0]], [], [], LISTEN_TIMEOUT
+                )[0]
+                if connection not in readable:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    self.dispatch(json.loads(notify.payload))
+        finally:
+            connection.close()
+
+
+def deliver(queue, event):
+    """Кладет событие в очередь, переполнение закрывает поток клиента.
+
+    None в очереди означает конец потока: браузер переподключится
+    и перечитает список, вместо того чтобы молча пропустить события.
+    """
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+        return
+    queue.put_nowait(event)
+
+
+broker = EventBroker()
@@ -0,0 +1,193 @@
+"""Фоновый пересчет производных данных без внешнего брокера.
+
+Задачи хранятся в таблице RecomputeJob и выполняются командой run_jobs.
+Обработчик задачи получает пакет id объектов одного типа.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Min, Q
+from django.utils import timezone
+
+from . import autocomplete
+from .models import (Comment, CommentArchive, RecomputeJob, Review, Title,
+                     TitleStats)
+
+logger = logging.getLogger(__name__)
+
+TITLE_STATS = 'title_stats'
+SIMILAR_TITLES = 'similar_titles'
+# Задержка повтора растет вдвое после каждой ошибки, но не дольше часа.
+MAX_RETRY_DELAY = 3600
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Регистрирует обработчик задач типа kind."""
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, object_ids):
+    """Ставит пересчет объектов в очередь.
+
+    Повторный запрос для объекта, задача которого еще ждет выполнения,
+    не создает новую задачу. При JOBS_RUN_INLINE задача выполняется без
+    очереди после фиксации текущей транзакции: при каскадном удалении
+    произведения обработчик не должен видеть его недоудаленным.
+    """
+    object_ids = sorted(set(object_ids))
+    if not object_ids:
+        return
+    if settings.JOBS_RUN_INLINE:
+        transaction.on_commit(partial(HANDLERS[kind], object_ids))
+        return
+    RecomputeJob.objects.bulk_create(
+        [RecomputeJob(kind=kind, object_id=pk) for pk in object_ids],
+        ignore_conflicts=True
+    )
+
+
+def run_pending(batch_size=None):
+    """Выполняет пакет готовых задач, возвращает их количество.
+
+    Задачи удаляются в той же транзакции, в которой выполняются: новый
+    запрос пересчета, пришедший во время выполнения, дождется ее
+    завершения и создаст новую задачу, а не потеряется. Заблокированные
+    другим воркером задачи пропускаются.
+    """
+    batch_size = batch_size or settings.JOBS_BATCH_SIZE
+    with transaction.atomic():
+        jobs = list(
+            RecomputeJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(run_after__lte=timezone.now())
+            .order_by('run_after')[:batch_size]
+        )
+        if not jobs:
+            return 0
+        RecomputeJob.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+        try:
+            with transaction.atomic():
+                run_jobs(jobs)
+        except Exception:
+            logger.exception('Ошибка пакета задач, повтор позже')
+            reschedule(jobs)
+    return len(jobs)
+
+
+def run_jobs(jobs):
+    object_ids = defaultdict(list)
+    for job in jobs:
+        object_ids[job.kind].append(job.object_id)
+    for kind, ids in object_ids.items():
+        if kind not in HANDLERS:
+            logger.error('Неизвестный тип задачи %s, задачи удалены', kind)
+            continue
+        HANDLERS[kind](ids)
+
+
+def reschedule(jobs):
+    now = timezone.now()
+    RecomputeJob.objects.bulk_create(
+        [
+            RecomputeJob(
+                kind=job.kind,
+                object_id=job.object_id,
+                created_at=job.created_at,
+                attempts=job.attempts + 1,
+                run_after=now + timedelta(seconds=min(
+                    settings.JOBS_RETRY_DELAY * 2 ** job.attempts,
+                    MAX_RETRY_DELAY
+                ))
+            )
+            for job in jobs
+        ],
+        ignore_conflicts=True
+    )
+
+
+def queue_stats():
+    """Глубина очереди и отставание по типам задач.
+
+    Отставание — возраст самой старой ожидающей задачи в секундах.
+    """
+    now = timezone.now()
+    rows = (
+        RecomputeJob.objects
+        .values('kind')
+        .annotate(
+            depth=Count('pk'),
+            failing=Count('pk', filter=Q(attempts__gt=0)),
+            oldest=Min('created_at')
+        )
+        .order_by('kind')
+    )
+    return {
+        row['kind']: {
+            'depth': row['depth'],
+            'failing': row['failing'],
+            'lag': (now - row['oldest']).total_seconds(),
+        }
+        for row in rows
+    }
+
+
+@handler(TITLE_STATS)
+def recompute_title_stats(title_ids):
+    """Пересчитывает рейтинг и счетчики произведений."""
+    now = timezone.now()
+    stats = {
+        pk: TitleStats(title_id=pk, updated_at=now)
+        for pk in Title.objects.filter(
+            pk__in=title_ids
+        ).values_list('pk', flat=True)
+    }
+    for row in (
+        Review.objects.filter(title_id__in=list(stats))
+        .values('title_id')
+        .annotate(rating=Avg('score'), count=Count('pk'))
+        .order_by()
+    ):
+        stats[row['title_id']].rating = row['rating']
+        stats[row['title_id']].review_count = row['count']
+    for model in (Comment, CommentArchive):
+        for row in (
+            model.objects.filter(review__title_id__in=list(stats))
+            .values('review__title_id')
+            .annotate(count=Count('pk'))
+            .order_by()
+        ):
+            stats[row['review__title_id']].comment_count += row['count']
+
+    existing = set(TitleStats.objects.filter(
+        title_id__in=list(stats)
+    ).values_list('title_id', flat=True))
+    TitleStats.objects.bulk_update(
+        [item for pk, item in stats.items() if pk in existing],
+        ['rating', 'review_count', 'comment_count', 'updated_at']
+    )
+    TitleStats.objects.bulk_create(
+        [item for pk, item in stats.items() if pk not in existing],
+        ignore_conflicts=True
+    )
+    # Популярность в индексе автодополнения зависит от числа отзывов.
+    autocomplete.notify(autocomplete.TITLE, list(stats))
+
+
+@handler(SIMILAR_TITLES)
+def refresh_similar_titles(title_ids):
+    """Пересчитывает похожие произведения (reviews.similarity).
+
+    NumPy и SciPy импортируются только в воркере задач.
+    """
+    from .similarity import refresh
+
+    refresh(title_ids)
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from reviews import partitions
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Перенести комментарии старше даты в архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', type=date.fromisoformat, required=True,
+            help='Дата в формате ГГГГ-ММ-ДД: более ранние комментарии '
+                 'переносятся в архив.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько комментариев переносить за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        moved = partitions.archive(options['before'], options['batch_size'])
+        self.stdout.write(f'Перенесено в архив комментариев: {moved}')
@@ -1,85 +1,224 @@
 import csv
+import hashlib
+import os
+from datetime import datetime
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
-from reviews.models import Category, Comment, Genre, Review, Title
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from reviews import jobs
+from reviews.cache import category_cache, genre_cache
+from reviews.models import (Category, Comment, CommentArchive, Genre,
+                            ImportState, Review, Title)
 
 User = get_user_model()
 
+# Файл, модель и соответствие полей модели колонкам CSV.
+SOURCES = (
+    ('category.csv', Category, {'id': 'id', 'name': 'name', 'slug': 'slug'}),
+    ('genre.csv', Genre, {'id': 'id', 'name': 'name', 'slug': 'slug'}),
+    ('users.csv', User, {
+        'id': 'id',
+        'username': 'username',
+        'email': 'email',
+        'role': 'role',
+        'bio': 'bio',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+    }),
+    ('titles.csv', Title, {
+        'id': 'id',
+        'name': 'name',
+        'year': 'year',
+        'category_id': 'category',
+    }),
+    ('review.csv', Review, {
+        'id': 'id',
+        'title_id': 'title_id',
+        'text': 'text',
+        'author_id': 'author',
+        'score': 'score',
+        'pub_date': 'pub_date',
+    }),
+    ('comments.csv', Comment, {
+        'id': 'id',
+        'review_id': 'review_id',
+        'text': 'text',
+        'author_id': 'author',
+        'pub_date': 'pub_date',
+    }),
+)
+BATCH_SIZE = 1000
+# Таблицы, куда строки переносятся из модели: такие строки уже загружены
+# и не должны вставляться в модель повторно.
+ARCHIVES = {Comment: CommentArchive}
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize(value):
+    if not isinstance(value, datetime):
+        return str(value)
+    # Дату без часового пояса Django записывает в БД в поясе TIME_ZONE
+    # (UTC), а astimezone() считал бы ее временем в поясе системы.
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def row_hash(values):
+    """Хэш значений строки, одинаковый для данных из CSV и из БД."""
+    normalized = [normalize(value) for value in values]
+    return hashlib.sha1('\x1f'.join(normalized).encode()).hexdigest()
+
 
 class Command(BaseCommand):
-    def handle(self, *args, **kwargs):
-
-        with open(f'{settings.BASE_DIR}/static/data/category.csv') as cvs_file:
-            file_reader = csv.DictReader(cvs_file)
-            for row in file_reader:
-                db = Category(
-                    id=row['id'],
-                    name=row['name'],
-                    slug=row['slug']
-                )
-                db.save()
-
-        with open(f'{settings.BASE_DIR}/static/data/genre.csv') as cvs_file:
-            file_reader = csv.DictReader(cvs_file)
-            for row in file_reader:
-                db = Genre(
-                    id=row['id'],
-                    name=row['name'],
-                    slug=row['slug']
-                )
-                db.save()
-
-        with open(f'{settings.BASE_DIR}/static/data/users.csv') as cvs_file:
-            file_reader = csv.DictReader(cvs_file)
-            for row in file_reader:
-                db = User(
-                    id=row['id'],
-                    username=row['username'],
-                    email=row['email'],
-                    role=row['role'],
-                    bio=row['bio'],
-                    first_name=row['first_name'],
-                    last_name=row['last_name']
-                )
-                db.save()
-
-        with open(f'{settings.BASE_DIR}/static/data/titles.csv') as cvs_file:
-            file_reader = csv.DictReader(cvs_file)
-            for row in file_reader:
-                db = Title(
-                    id=row['id'],
-                    name=row['name'],
-                    year=row['year'],
-                    category_id=row['category']
-                )
-                db.save()
-
-        with open(f'{settings.BASE_DIR}/static/data/review.csv') as cvs_file:
-            file_reader = csv.DictReader(cvs_file)
-            for row in file_reader:
-                db = Review(
-                    id=row['id'],
-                    title_id=row['title_id'],
-                    text=row['text'],
-                    author_id=row['author'],
-                    score=row['score'],
-                    pub_date=row['pub_date']
-
-                )
-                db.save()
-
-        with open(f'{settings.BASE_DIR}/static/data/comments.csv') as cvs_file:
-            file_reader = csv.DictReader(cvs_file)
-            for row in file_reader:
-                db = Comment(
-                    id=row['id'],
-                    review_id=row['review_id'],
-                    text=row['text'],
-                    author_id=row['author'],
-                    pub_date=row['pub_date']
-                )
-                db.save()
+    help = 'Загружает тестовые данные из CSV-файлов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sync', action='store_true',
+            help='Инкрементальная загрузка: пропускает неизмененные файлы, '
+                 'добавляет новые и обновляет измененные строки.'
+        )
+        parser.add_argument(
+            '--data-dir', default=os.path.join(settings.BASE_DIR, 'static',
+                                               'data'),
+            help='Каталог с CSV-файлами.'
+        )
 
+    def handle(self, *args, **options):
+        changed = {}
+        for file_name, model, columns in SOURCES:
+            path = os.path.join(options['data_dir'], file_name)
+            with transaction.atomic():
+                if options['sync']:
+                    changed[model] = self.sync_file(
+                        path, file_name, model, columns
+                    )
+                else:
+                    self.load_file(path, model, columns)
+                self.reset_sequence(model)
+        category_cache.invalidate()
+        genre_cache.invalidate()
+        # Пакетная загрузка не отправляет сигналы моделей: при синхронизации
+        # пересчитываем только произведения измененных отзывов
+        # и комментариев.
+        if options['sync']:
+            title_ids = self.changed_titles(changed)
+        else:
+            title_ids = Title.objects.values_list('pk', flat=True)
+        jobs.enqueue(jobs.TITLE_STATS, title_ids)
         print('База данных скачана')
+
+    def changed_titles(self, changed):
+        """Произведения добавленных и измененных отзывов и комментариев."""
+        title_ids = {values['title_id'] for values in changed[Review]}
+        review_ids = {values['review_id'] for values in changed[Comment]}
+        if review_ids:
+            title_ids.update(Review.objects.filter(
+                pk__in=review_ids
+            ).values_list('title_id', flat=True))
+        return title_ids
+
+    def read_rows(self, path, model, columns):
+        """Строки CSV как словари значений полей модели."""
+        fields = {
+            name: model._meta.get_field(name) for name in columns
+        }
+        with open(path, encoding='utf-8') as cvs_file:
+            for row in csv.DictReader(cvs_file):
+                yield {
+                    name: field.to_python(
+                        None if row[columns[name]] == '' and field.null
+                        else row[columns[name]]
+                    )
+                    for name, field in fields.items()
+                }
+
+    def load_file(self, path, model, columns):
+        for values in self.read_rows(path, model, columns):
+            model(**values).save()
+
+    def sync_file(self, path, file_name, model, columns):
+        """Загружает измененные строки файла.
+
+        Возвращает значения добавленных строк, а для измененных - новые
+        и прежние значения.
+        """
+        checksum = file_checksum(path)
+        if ImportState.objects.filter(
+            file_name=file_name, checksum=checksum
+        ).exists():
+            self.stdout.write(f'{file_name}: без изменений')
+            return []
+
+        rows = {values['id']: values for values in
+                self.read_rows(path, model, columns)}
+        names = list(columns)
+        stored = {}
+        archived = set()
+        ids = list(rows)
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            for values in model.objects.filter(
+                pk__in=batch
+            ).values_list(*names):
+                stored[values[0]] = values
+            if model in ARCHIVES:
+                archived.update(ARCHIVES[model].objects.filter(
+                    pk__in=batch
+                ).values_list('pk', flat=True))
+
+        created = [
+            model(**values) for pk, values in rows.items()
+            if pk not in stored and pk not in archived
+        ]
+        updated = [
+            model(**values) for pk, values in rows.items()
+            if pk in stored and row_hash(stored[pk]) != row_hash(
+                values[name] for name in names
+            )
+        ]
+        self.stdout.write(
+            f'{file_name}: добавлено {len(created)}, '
+            f'обновлено {len(updated)}, в архиве {len(archived)}'
+        )
+        model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        # bulk_create заменяет значения полей auto_now_add текущим
+        # временем, дату из CSV восстанавливаем отдельно.
+        auto_now_fields = [
+            name for name in names
+            if getattr(model._meta.get_field(name), 'auto_now_add', False)
+        ]
+        rewritten = updated
+        if auto_now_fields:
+            for obj in created:
+                for name in auto_now_fields:
+                    setattr(obj, name, rows[obj.pk][name])
+            rewritten = updated + created
+        model.objects.bulk_update(
+            rewritten, names[1:], batch_size=BATCH_SIZE
+        )
+        ImportState.objects.update_or_create(
+            file_name=file_name, defaults={'checksum': checksum}
+        )
+        return [rows[obj.pk] for obj in created + updated] + [
+            dict(zip(names, stored[obj.pk])) for obj in updated
+        ]
+
+    def reset_sequence(self, model):
+        """Сдвигает счетчик id после вставки строк с явными id."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,266 @@
+import json
+import re
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from reviews import jobs
+from reviews.cache import category_cache, genre_cache
+from reviews.models import Title
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 1 << 16
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_fixture(file, chunk_size=CHUNK_SIZE):
+    """Объекты JSON-массива фикстуры по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Фикстура должна быть JSON-массивом.')
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer[position:position + 1] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('Фикстура повреждена или обрывается.')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield obj
+        position = end
+
+
+def sort_by_foreign_keys(models):
+    """Модели в порядке внешних ключей: связанные модели раньше.
+
+    serializers.sort_dependencies учитывает только зависимости
+    натуральных ключей, поэтому порядок строится по полям ForeignKey,
+    OneToOneField и ManyToManyField. Модели из цикла ссылок идут в
+    исходном порядке: проверки ключей на время загрузки отключены.
+    """
+    pending = list(models)
+    ordered = []
+    while pending:
+        ready = [
+            model for model in pending
+            if not (related_models(model) & set(pending)) - {model}
+        ] or pending[:1]
+        ordered.extend(ready)
+        pending = [model for model in pending if model not in ready]
+    return ordered
+
+
+def related_models(model):
+    return {
+        field.related_model for field in model._meta.get_fields()
+        # Обратные связи создаются автоматически, прямые — нет.
+        if field.is_relation and not field.auto_created
+        and field.related_model is not None
+    }
+
+
+def is_excluded(label, exclude):
+    app_label = label.split('.')[0]
+    return label in exclude or app_label in exclude
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстрая загрузка большой JSON-фикстуры: потоковый разбор, '
+        'пакетная вставка по моделям в порядке внешних ключей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='Путь к JSON-фикстуре.')
+        parser.add_argument(
+            '-e', '--exclude', action='append', default=[],
+            help='Не загружать приложение (app_label) или модель '
+                 '(app_label.ModelName). Можно указать несколько раз.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных для загрузки.'
+        )
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Сначала замерить loaddata на той же фикстуре '
+                 '(в откатываемой транзакции).'
+        )
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        exclude = {label.lower() for label in options['exclude']}
+        if options['compare']:
+            self.report('loaddata', *self.measure(
+                self.run_loaddata, options['fixture'], options['exclude']
+            ))
+        self.report('load_fixture', *self.measure(
+            self.load, options['fixture'], exclude
+        ))
+        # Сигналы моделей не отправлялись: сбрасываем кэши справочников
+        # и ставим пересчет статистики произведений.
+        category_cache.invalidate()
+        genre_cache.invalidate()
+        jobs.enqueue(
+            jobs.TITLE_STATS, Title.objects.values_list('pk', flat=True)
+        )
+
+    def measure(self, function, *args):
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            count = function(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return count, time.perf_counter() - started, peak
+
+    def report(self, name, count, seconds, peak):
+        self.stdout.write(
+            f'{name}: {count} объектов за {seconds:.2f} с '
+            f'({count / seconds:.0f} объектов/с), '
+            f'пик памяти {peak / 2 ** 20:.1f} МБ'
+        )
+
+    def run_loaddata(self, path, exclude):
+        with transaction.atomic(using=self.using):
+            call_command(
+                'loaddata', path, exclude=exclude, database=self.using,
+                verbosity=0
+            )
+            transaction.set_rollback(True, using=self.using)
+        with open(path, encoding='utf-8') as file:
+            return sum(
+                1 for obj in iter_fixture(file)
+                if not is_excluded(obj['model'].lower(), exclude)
+            )
+
+    def load(self, path, exclude):
+        spools = self.spool(path, exclude)
+        models = sort_by_foreign_keys(list(spools))
+        connection = connections[self.using]
+        count = 0
+        with transaction.atomic(using=self.using):
+            with connection.constraint_checks_disabled():
+                for model in models:
+                    with spools[model] as spool:
+                        spool.seek(0)
+                        count += self.insert_model(model, spool)
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in models]
+            )
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), models
+                ):
+                    cursor.execute(sql)
+        return count
+
+    def spool(self, path, exclude):
+        """Раскладывает объекты фикстуры по временным файлам моделей."""
+        spools = {}
+        with open(path, encoding='utf-8') as file:
+            for obj in iter_fixture(file):
+                label = obj['model'].lower()
+                if is_excluded(label, exclude):
+                    continue
+                try:
+                    model = apps.get_model(label)
+                except (LookupError, ValueError):
+                    raise CommandError(
+                        f'Модель {label} не найдена, исключите ее '
+                        f'опцией --exclude.'
+                    )
+                if model not in spools:
+                    spools[model] = tempfile.TemporaryFile('w+')
+                spools[model].write(json.dumps(obj) + '\n')
+        return spools
+
+    def insert_model(self, model, spool):
+        if model._meta.parents:
+            raise CommandError(
+                f'Модели с наследованием таблиц ({model._meta.label}) '
+                f'не поддерживаются, загрузите их через loaddata.'
+            )
+        count = 0
+        lines = (json.loads(line) for line in spool)
+        while True:
+            batch = list(islice(lines, BATCH_SIZE))
+            if not batch:
+                return count
+            self.insert_batch(model, list(serializers.deserialize(
+                'python', batch, using=self.using
+            )))
+            count += len(batch)
+
+    def insert_batch(self, model, deserialized):
+        """Вставляет новые объекты и перезаписывает существующие, как loaddata.
+
+        bulk_create заменяет значения полей auto_now и auto_now_add
+        текущим временем, поэтому даты из фикстуры восстанавливаются
+        следующим bulk_update.
+        """
+        objs = [item.object for item in deserialized]
+        manager = model._base_manager.db_manager(self.using)
+        existing = set(manager.filter(
+            pk__in=[obj.pk for obj in objs]
+        ).values_list('pk', flat=True))
+        created = [obj for obj in objs if obj.pk not in existing]
+        updated = [obj for obj in objs if obj.pk in existing]
+        fields = model._meta.local_concrete_fields
+        auto_dates = [
+            field for field in fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)
+        ]
+        dates = [
+            [getattr(obj, field.attname) for field in auto_dates]
+            for obj in created
+        ]
+        manager.bulk_create(created, batch_size=BATCH_SIZE)
+        if auto_dates and created:
+            for obj, values in zip(created, dates):
+                for field, value in zip(auto_dates, values):
+                    setattr(obj, field.attname, value)
+            manager.bulk_update(
+                created, [field.name for field in auto_dates],
+                batch_size=BATCH_SIZE
+            )
+        if updated:
+            manager.bulk_update(updated, [
+                field.name for field in fields if not field.primary_key
+            ], batch_size=BATCH_SIZE)
+        self.insert_m2m(model, deserialized, existing)
+
+    def insert_m2m(self, model, deserialized, existing):
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                continue
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            through._base_manager.db_manager(self.using).filter(**{
+                source + '__in': existing
+            }).delete()
+            through._base_manager.db_manager(self.using).bulk_create(
+                [
+                    through(**{source: item.object.pk, target: pk})
+                    for item in deserialized
+                    for pk in item.m2m_data.get(field.name, ())
+                ],
+                batch_size=BATCH_SIZE
+            )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from reviews import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционировать таблицу комментариев по месяцам (PostgreSQL) '
+        'и создать секции на следующие месяцы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help='На сколько месяцев вперед создавать секции.'
+        )
+        parser.add_argument(
+            '--revert', action='store_true',
+            help='Вернуть обычную таблицу, например перед миграцией.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL.')
+        if options['revert']:
+            if partitions.is_partitioned():
+                partitions.revert()
+            self.stdout.write('Таблица комментариев не секционирована.')
+            return
+        if not partitions.is_partitioned():
+            partitions.convert(options['months_ahead'])
+            self.stdout.write('Таблица комментариев секционирована.')
+        created = partitions.ensure_partitions(options['months_ahead'])
+        self.stdout.write(f'Создано секций: {len(created)}')
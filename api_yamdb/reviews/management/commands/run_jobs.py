@@ -0,0 +1,49 @@
+import json
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from reviews import jobs
+
+
+class Command(BaseCommand):
+    help = 'Воркер фонового пересчета производных данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.JOBS_BATCH_SIZE,
+            help='Сколько задач выполнять за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать глубину очереди и отставание и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(jobs.queue_stats(), indent=2))
+            return
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        processed = 0
+        while not self.stopping:
+            close_old_connections()
+            count = jobs.run_pending(options['batch_size'])
+            processed += count
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+        self.stdout.write(f'Выполнено задач: {processed}')
+
+    def stop(self, signum, frame):
+        """Завершает работу после текущего пакета."""
+        self.stopping = True
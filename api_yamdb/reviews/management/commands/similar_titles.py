@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reviews import similarity
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать похожие произведения по совместным оценкам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles', type=int, nargs='+',
+            help='Пересчитать только эти произведения и их соседей.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=similarity.CHUNK_SIZE,
+            help='Сколько строк сходства считать за один блок.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['titles']:
+            similarity.refresh(options['titles'])
+            count = len(options['titles'])
+        else:
+            count = similarity.rebuild_all(options['chunk_size'])
+        self.stdout.write(
+            f'Пересчитано произведений: {count} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+from api import slow_queries
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Показать журнал медленных запросов с планами EXPLAIN.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько последних записей показать.'
+        )
+        parser.add_argument(
+            '--summary', action='store_true',
+            help='Сгруппировать записи по отпечатку запроса.'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Выводить планы EXPLAIN.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Очистить журнал и сохраненные планы.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            slow_queries.clear_log()
+            self.stdout.write('Журнал медленных запросов очищен.')
+            return
+        entries = slow_queries.read_log()
+        if options['summary']:
+            entries = self.summarize(entries)
+        for entry in entries[:options['limit']]:
+            self.stdout.write(
+                f"{entry['fingerprint']} {entry['duration_ms']} мс "
+                f"x{entry.get('count', 1)} {entry['view'] or '-'}"
+            )
+            self.stdout.write(f"    {entry['sql']}")
+            if options['plans'] and entry['plan']:
+                for line in entry['plan'].splitlines():
+                    self.stdout.write(f'    | {line}')
+
+    def summarize(self, entries):
+        """Отпечатки по убыванию суммарного времени, с максимумом."""
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[entry['fingerprint']].append(entry)
+        summary = []
+        for group in groups.values():
+            slowest = dict(max(group, key=lambda entry: entry['duration_ms']))
+            slowest['count'] = len(group)
+            slowest['total_ms'] = sum(entry['duration_ms'] for entry in group)
+            summary.append(slowest)
+        summary.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return summary
@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Выполняется в отдельном процессе, чтобы замер начинался с холодного
+# старта: импорт каждого приложения, его моделей и ready() засекаются
+# через обертку над AppConfig.create.
+PROFILE_SCRIPT = '''
+import json
+import time
+from collections import defaultdict
+from importlib import import_module
+
+timings = defaultdict(lambda: defaultdict(float))
+started = time.perf_counter()
+
+import django
+from django.apps.config import AppConfig
+
+
+def timed(name, phase, func):
+    def wrapper(*args, **kwargs):
+        phase_started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[name][phase] += time.perf_counter() - phase_started
+    return wrapper
+
+
+create = AppConfig.create.__func__
+
+
+def create_config(cls, entry):
+    create_started = time.perf_counter()
+    app_config = create(cls, entry)
+    name = app_config.name
+    timings[name]['import'] += time.perf_counter() - create_started
+    app_config.import_models = timed(name, 'models', app_config.import_models)
+    app_config.ready = timed(name, 'ready', app_config.ready)
+    return app_config
+
+
+AppConfig.create = classmethod(create_config)
+django.setup()
+setup = time.perf_counter() - started
+
+from django.conf import settings
+
+urls_started = time.perf_counter()
+import_module(settings.ROOT_URLCONF)
+urls = time.perf_counter() - urls_started
+print(json.dumps({'setup': setup, 'urls': urls, 'apps': timings}))
+'''
+
+PHASES = ('import', 'models', 'ready')
+
+
+class Command(BaseCommand):
+    help = (
+        'Время холодного старта: импорт каждого приложения, его моделей, '
+        'ready(), django.setup() и URLconf.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--compare', nargs='*', default=[], metavar='SETTINGS_MODULE',
+            help='Другие модули настроек для сравнения, например '
+                 'api_yamdb.settings_api.'
+        )
+
+    def handle(self, *args, **options):
+        modules = [os.environ['DJANGO_SETTINGS_MODULE'], *options['compare']]
+        for settings_module in modules:
+            self.report(settings_module, self.profile(settings_module))
+
+    def profile(self, settings_module):
+        result = subprocess.run(
+            [sys.executable, '-c', PROFILE_SCRIPT],
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module),
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        return json.loads(result.stdout.decode().splitlines()[-1])
+
+    def report(self, settings_module, timings):
+        self.stdout.write(self.style.MIGRATE_HEADING(settings_module))
+        self.stdout.write(
+            f'{"app":<40}' + ''.join(f'{phase:>10}' for phase in PHASES)
+            + f'{"total":>10}'
+        )
+        apps = sorted(
+            timings['apps'].items(),
+            key=lambda item: sum(item[1].values()),
+            reverse=True
+        )
+        for name, phases in apps:
+            self.stdout.write(
+                f'{name:<40}'
+                + ''.join(
+                    f'{phases.get(phase, 0) * 1000:>10.1f}'
+                    for phase in PHASES
+                )
+                + f'{sum(phases.values()) * 1000:>10.1f}'
+            )
+        self.stdout.write(
+            f'django.setup(): {timings["setup"] * 1000:.1f} ms, '
+            f'URLconf: {timings["urls"] * 1000:.1f} ms'
+        )
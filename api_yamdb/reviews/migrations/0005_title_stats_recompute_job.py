@@ -0,0 +1,67 @@
+# Generated by Django 3.2 on 2026-10-19 08:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def enqueue_title_stats(apps, schema_editor):
+    """Ставит пересчет статистики всех произведений в очередь."""
+    Title = apps.get_model('reviews', 'Title')
+    RecomputeJob = apps.get_model('reviews', 'RecomputeJob')
+    RecomputeJob.objects.bulk_create(
+        [
+            RecomputeJob(kind='title_stats', object_id=pk)
+            for pk in Title.objects.values_list('pk', flat=True).iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_importstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomputeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='Тип задачи')),
+                ('object_id', models.BigIntegerField(verbose_name='Объект')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата постановки')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Выполнить после')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток')),
+            ],
+            options={
+                'verbose_name': 'Задача пересчета',
+                'verbose_name_plural': 'Задачи пересчета',
+            },
+        ),
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.title', verbose_name='Произведение')),
+                ('rating', models.FloatField(null=True, verbose_name='Рейтинг')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Количество комментариев')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата пересчета')),
+            ],
+            options={
+                'verbose_name': 'Статистика произведения',
+                'verbose_name_plural': 'Статистика произведений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recomputejob',
+            index=models.Index(fields=['run_after'], name='job_run_after_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recomputejob',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_job_kind_object'),
+        ),
+        migrations.RunPython(enqueue_title_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-19 08:53
+
+from django.db import migrations
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', reviews.models.YamdbUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-19 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_comment_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commentarchive',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='archive_author_pub_date_idx'),
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.contrib.auth.models import AbstractUser
+from contextlib import contextmanager
+
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.core.exceptions import ValidationError
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.dispatch import Signal
+from django.utils import timezone
 
 from .validators import validator_year
 
@@ -86,6 +91,88 @@ MODERATOR = 'moderator'
 ADMIN = 'admin'
 
 
+class YamdbUserManager(UserManager):
+    # Сколько раз повторить регистрацию, если конфликтующая запись
+    # исчезла между вставкой и чтением.
+    signup_attempts = 3
+
+    def signup(self, username, email):
+        """Регистрирует пользователя или находит уже зарегистрированного.
+
+        Возвращает (пользователь, создан ли), как get_or_create. Гонки
+        решаются уникальными ограничениями username и email, а не
+        предварительными проверками. Если username или email заняты
+        другим пользователем, вызывает ValidationError.
+        """
+        user = self.model(username=username, email=email)
+        for _ in range(self.signup_attempts):
+            rows = self.insert_or_select(user)
+            for row in rows:
+                if row.created:
+                    return row, True
+            for row in rows:
+                if row.username == username and row.email == email:
+                    return row, False
+            if rows:
+                raise ValidationError({
+                    name: user.unique_error_message(self.model, (name,))
+                    for name in ('username', 'email')
+                    if any(
+                        getattr(row, name) == getattr(user, name)
+                        for row in rows
+                    )
+                })
+        raise IntegrityError('Не удалось зарегистрировать пользователя.')
+
+    def insert_or_select(self, user):
+        """Вставляет пользователя или читает записи с его username и email.
+
+        На PostgreSQL это один запрос INSERT ... ON CONFLICT DO NOTHING
+        RETURNING, объединенный с чтением конфликтующих записей. У каждой
+        возвращенной записи есть атрибут created.
+        """
+        using = self._db or router.db_for_write(self.model)
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            try:
+                with transaction.atomic(using=using):
+                    user.save(using=using, force_insert=True)
+            except IntegrityError:
+                rows = list(self.using(using).filter(
+                    models.Q(username=user.username)
+                    | models.Q(email=user.email)
+                ))
+                for row in rows:
+                    row.created = False
+                return rows
+            user.created = True
+            return [user]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        fields = [
+            field for field in self.model._meta.local_concrete_fields
+            if not field.primary_key
+        ]
+        sql = (
+            f'WITH inserted AS ('
+            f'INSERT INTO {table} '
+            f'({", ".join(quote(field.column) for field in fields)}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))}) '
+            f'ON CONFLICT DO NOTHING RETURNING *) '
+            f'SELECT inserted.*, true AS created FROM inserted '
+            f'UNION ALL '
+            f'SELECT {table}.*, false FROM {table} '
+            f'WHERE {quote("username")} = %s OR {quote("email")} = %s'
+        )
+        params = [
+            field.get_db_prep_save(field.pre_save(user, True), connection)
+            for field in fields
+        ]
+        return list(self.raw(
+            sql, params + [user.username, user.email], using=using
+        ))
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         (USER, 'Пользователь'),
@@ -115,6 +202,8 @@ class User(AbstractUser):
         default=USER
     )
 
+    objects = YamdbUserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -141,13 +230,15 @@ class Review(models.Model):
         on_delete=models.CASCADE,
         related_name='reviews',
         verbose_name='Произведение',
-        help_text='Произведение, к которуму написан отзыв'
+        help_text='Произведение, к которуму написан отзыв',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='reviews',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     text = models.TextField(
         verbose_name='Отзыв'
@@ -173,24 +264,87 @@ class Review(models.Model):
                 name='unique_title_author'
             )
         ]
+        # Составные индексы заменяют одиночные индексы внешних ключей.
+        indexes = [
+            # Отзывы произведения по дате.
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            ),
+            # Рейтинг произведения считается только по индексу.
+            models.Index(
+                fields=['title'],
+                include=['score'],
+                name='review_title_score_idx'
+            ),
+            # Отзывы пользователя по дате.
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='review_author_pub_date_idx'
+            ),
+            # Все отзывы по дате (админка: сортировка и фильтр по дате).
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='review_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:20]
 
 
-class Comment(models.Model):
+# Прямое удаление комментариев (comment.delete(), queryset.delete())
+# сообщает произведения для пересчета статистики этим сигналом, а не
+# post_delete: с обработчиком post_delete каскадное удаление отзыва
+# читало бы каждый комментарий вместо одного DELETE. Аргумент —
+# title_ids.
+comments_deleted = Signal()
+
+
+@contextmanager
+def sending_comments_deleted(model, title_ids):
+    """Отправляет comments_deleted, если удаление прошло без ошибки."""
+    yield
+    comments_deleted.send(model, title_ids=title_ids)
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def delete(self):
+        title_ids = set(self.values_list('review__title_id', flat=True))
+        with sending_comments_deleted(self.model, title_ids):
+            return super().delete()
+
+
+class CommentDeleteMixin:
+    """delete() комментария с сигналом comments_deleted."""
+
+    def delete(self, using=None, keep_parents=False):
+        if type(self).review.is_cached(self):
+            title_ids = {self.review.title_id}
+        else:
+            title_ids = set(Review.objects.filter(
+                pk=self.review_id
+            ).values_list('title_id', flat=True))
+        with sending_comments_deleted(type(self), title_ids):
+            return super().delete(using, keep_parents)
+
+
+class Comment(CommentDeleteMixin, models.Model):
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Отзыв',
-        help_text='Отзыв, к которуму написан комментарий'
+        help_text='Отзыв, к которуму написан комментарий',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='comments',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     text = models.TextField(
         verbose_name='Коментарий'
@@ -200,9 +354,215 @@ class Comment(models.Model):
         verbose_name='Дата'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            # Комментарии к отзыву по дате.
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            ),
+            # Комментарии пользователя по дате.
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='comment_author_pub_date_idx'
+            ),
+            # Все комментарии по дате (админка).
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='comment_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:20]
+
+
+class ImportState(models.Model):
+    file_name = models.CharField(
+        verbose_name='Файл',
+        max_length=255,
+        unique=True
+    )
+    checksum = models.CharField(
+        verbose_name='Контрольная сумма',
+        max_length=64
+    )
+    imported_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата импорта'
+    )
+
+    class Meta:
+        verbose_name = 'Состояние импорта'
+        verbose_name_plural = 'Состояния импорта'
+
+    def __str__(self):
+        return self.file_name
+
+
+class TitleStats(models.Model):
+    """Производные данные произведения, пересчитываются в фоне."""
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Произведение'
+    )
+    rating = models.FloatField(
+        verbose_name='Рейтинг',
+        null=True
+    )
+    review_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0
+    )
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата пересчета'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика произведения'
+        verbose_name_plural = 'Статистика произведений'
+
+    def __str__(self):
+        return str(self.title_id)
+
+
+class RecomputeJob(models.Model):
+    """Задача фонового пересчета.
+
+    Повторные запросы пересчета одного объекта схлопываются в одну
+    задачу за счет уникальности пары (kind, object_id).
+    """
+    kind = models.CharField(
+        verbose_name='Тип задачи',
+        max_length=50
+    )
+    object_id = models.BigIntegerField(
+        verbose_name='Объект'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки'
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Выполнить после',
+        default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Неудачных попыток',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Задача пересчета'
+        verbose_name_plural = 'Задачи пересчета'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_job_kind_object'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['run_after'], name='job_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
+
+
+class SimilarTitle(models.Model):
+    """Похожее произведение: его оценивали те же пользователи.
+
+    Списки строятся фоновым пересчетом (reviews.similarity).
+    """
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожее произведение'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'similar'],
+                name='unique_similar_title'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.title_id} -> {self.similar_id}'
+
+
+class CommentArchive(CommentDeleteMixin, models.Model):
+    """Старые комментарии, перенесенные командой archive_comments.
+
+    Все архивные комментарии старше оставшихся в Comment, поэтому
+    список комментариев отзыва — Comment, за ним CommentArchive.
+    Индексы — для этого списка и для ленты активности пользователя.
+    """
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='ID'
+    )
+    review = models.ForeignKey(
+        Review,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Отзыв',
+        db_index=False
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+        db_index=False
+    )
+    text = models.TextField(
+        verbose_name='Коментарий'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата'
+    )
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='archive_review_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='archive_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:20]
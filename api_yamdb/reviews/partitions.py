@@ -0,0 +1,305 @@
+"""Секционирование комментариев по месяцам и перенос старых в архив.
+
+Секционирование включается командой partition_comments и работает
+только на PostgreSQL: таблица Comment превращается в секционированную
+по pub_date (секция на месяц и секция DEFAULT). Первичный ключ
+секционированной таблицы обязан включать pub_date, поэтому он
+становится (id, pub_date), а уникальность id проверяет триггер; на
+Comment не ссылается ни один внешний ключ. Схема таблицы после этого
+расходится с состоянием миграций, поэтому migrate с операциями над
+Comment останавливается (сигнал pre_migrate): сначала таблица
+возвращается к обычной командой partition_comments --revert, после
+миграции секционируется снова.
+
+Отзывы не секционируются: на Review ссылается внешний ключ комментариев
+и уникальность (title, author), а оба ограничения потребовали бы pub_date
+в ключе.
+
+archive_comments переносит комментарии старше даты в CommentArchive:
+целые секции — INSERT ... SELECT и DROP, остальное — пакетами.
+"""
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Comment, CommentArchive
+
+ARCHIVE_FIELDS = ('id', 'review_id', 'author_id', 'text', 'pub_date')
+
+
+def month_start(value, months=0):
+    month = value.year * 12 + value.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def table():
+    return Comment._meta.db_table
+
+
+def partition_name(month):
+    return f'{table()}_p{month:%Y_%m}'
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(%s)', [table()]
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions():
+    """Месячные секции: {первое число месяца: имя таблицы}."""
+    prefix = f'{table()}_p'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)', [table()]
+        )
+        names = [name for name, in cursor.fetchall()]
+    return {
+        date(int(name[-7:-3]), int(name[-2:]), 1): name
+        for name in names if name.startswith(prefix)
+    }
+
+
+def create_partition(cursor, month):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(month))} '
+        f'PARTITION OF {quote(table())} '
+        'FOR VALUES FROM (%s) TO (%s)',
+        [month, month_start(month, 1)]
+    )
+
+
+def ensure_partitions(months_ahead):
+    """Создает секции текущего и следующих months_ahead месяцев."""
+    current = month_start(date.today())
+    existing = partitions()
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = month_start(current, offset)
+            if month not in existing:
+                create_partition(cursor, month)
+                created.append(partition_name(month))
+    return created
+
+
+@transaction.atomic
+def convert(months_ahead):
+    """Превращает Comment в секционированную таблицу.
+
+    Таблица блокируется на время копирования данных. Внешние ключи и
+    индексы переносятся с исходной таблицы по их определениям в
+    каталоге PostgreSQL.
+    """
+    name = table()
+    old = f'{name}_unpartitioned'
+    with connection.cursor() as cursor:
+        oldest, sequence = lock(cursor)
+        foreign_keys, indexes = read_constraints(cursor)
+        cursor.execute(f'ALTER TABLE {quote(name)} RENAME TO {quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(name)} '
+            f'(LIKE {quote(old)} INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE (pub_date)'
+        )
+        cursor.execute(
+            f'CREATE TABLE {quote(name + "_default")} '
+            f'PARTITION OF {quote(name)} DEFAULT'
+        )
+        month = month_start(oldest or date.today())
+        last = month_start(date.today(), months_ahead)
+        while month <= last:
+            create_partition(cursor, month)
+            month = month_start(month, 1)
+        cursor.execute(f'INSERT INTO {quote(name)} SELECT * FROM {quote(old)}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(name)}.id')
+        cursor.execute(f'DROP TABLE {quote(old)}')
+        restore_constraints(cursor, '(id, pub_date)', foreign_keys, indexes)
+        create_unique_id_trigger(cursor)
+
+
+@transaction.atomic
+def revert():
+    """Возвращает Comment к обычной таблице, как в миграциях."""
+    name = table()
+    plain = f'{name}_plain'
+    with connection.cursor() as cursor:
+        _, sequence = lock(cursor)
+        foreign_keys, indexes = read_constraints(cursor)
+        cursor.execute(
+            f'CREATE TABLE {quote(plain)} '
+            f'(LIKE {quote(name)} INCLUDING DEFAULTS)'
+        )
+        cursor.execute(
+            f'INSERT INTO {quote(plain)} SELECT * FROM {quote(name)}'
+        )
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(plain)}.id')
+        # Вместе с таблицей удаляются секции, индексы и триггер.
+        cursor.execute(f'DROP TABLE {quote(name)}')
+        cursor.execute(f'DROP FUNCTION {quote(name + "_unique_id")}()')
+        cursor.execute(f'ALTER TABLE {quote(plain)} RENAME TO {quote(name)}')
+        restore_constraints(cursor, '(id)', foreign_keys, indexes)
+
+
+def lock(cursor):
+    """Блокирует Comment, возвращает самую раннюю дату и имя счетчика id."""
+    name = table()
+    # Отложенные проверки внешних ключей мешают ALTER TABLE.
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    cursor.execute(f'LOCK TABLE {quote(name)} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(
+        f'SELECT min(pub_date), pg_get_serial_sequence(%s, %s) '
+        f'FROM {quote(name)}', [name, 'id']
+    )
+    return cursor.fetchone()
+
+
+def read_constraints(cursor):
+    """Определения внешних ключей и индексов Comment, кроме первичного."""
+    name = table()
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [name]
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(
+        'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+        'WHERE indrelid = to_regclass(%s) AND NOT indisprimary', [name]
+    )
+    # Индекс секционированной таблицы описан как ON ONLY: так он не
+    # создается на секциях.
+    indexes = [
+        definition.replace(' ON ONLY ', ' ON ', 1)
+        for definition, in cursor.fetchall()
+    ]
+    return foreign_keys, indexes
+
+
+def restore_constraints(cursor, primary_key, foreign_keys, indexes):
+    name = table()
+    cursor.execute(
+        f'ALTER TABLE {quote(name)} ADD CONSTRAINT '
+        f'{quote(name + "_pkey")} PRIMARY KEY {primary_key}'
+    )
+    for constraint, definition in foreign_keys:
+        cursor.execute(
+            f'ALTER TABLE {quote(name)} ADD CONSTRAINT '
+            f'{quote(constraint)} {definition}'
+        )
+    for definition in indexes:
+        cursor.execute(definition)
+
+
+def touches_comment(plan):
+    """Меняет ли план миграций таблицу Comment.
+
+    plan — список (миграция, назад ли), как в сигнале pre_migrate.
+    Операции RunSQL и RunPython не проверяются.
+    """
+    meta = Comment._meta
+    for migration, _ in plan:
+        if migration.app_label != meta.app_label:
+            continue
+        for operation in migration.operations:
+            model = (
+                getattr(operation, 'model_name', None)
+                or getattr(operation, 'old_name', None)
+                or getattr(operation, 'name', '')
+            )
+            if model.lower() == meta.model_name:
+                return True
+    return False
+
+
+def create_unique_id_trigger(cursor):
+    """Запрещает повтор id в секционированной таблице.
+
+    Уникальный индекс секционированной таблицы обязан включать ключ
+    секционирования, поэтому уникальность id проверяет триггер:
+    повтор дает unique_violation, как нарушение первичного ключа.
+    Одинаковые id сериализуются рекомендательной блокировкой. Триггер
+    срабатывает на секции, и TG_TABLE_NAME — имя секции, поэтому ключ
+    блокировки строится от имени родительской таблицы: иначе вставки
+    одного id в разные месяцы не ждали бы друг друга.
+    """
+    name = table()
+    function = quote(f'{name}_unique_id')
+    cursor.execute(f"""
+        CREATE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.id = OLD.id THEN
+                RETURN NEW;
+            END IF;
+            PERFORM pg_advisory_xact_lock(
+                hashtextextended('{name}', NEW.id)
+            );
+            IF EXISTS (SELECT 1 FROM {quote(name)} WHERE id = NEW.id) THEN
+                RAISE unique_violation
+                    USING MESSAGE = 'duplicate comment id ' || NEW.id;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(
+        f'CREATE TRIGGER {quote(name + "_unique_id")} '
+        f'BEFORE INSERT OR UPDATE OF id ON {quote(name)} '
+        f'FOR EACH ROW EXECUTE FUNCTION {function}()'
+    )
+
+
+def archive(before, batch_size):
+    """Переносит комментарии старше before в архив, возвращает их число."""
+    moved = 0
+    if is_partitioned():
+        for month, name in sorted(partitions().items()):
+            if month_start(month, 1) <= before:
+                with transaction.atomic():
+                    moved += copy_to_archive(name)
+                    drop_partition(name)
+    queryset = Comment.objects.filter(pub_date__lt=datetime.combine(
+        before, time.min, tzinfo=timezone.utc
+    )).order_by('pk')
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return moved
+            CommentArchive.objects.bulk_create([
+                CommentArchive(**values) for values in
+                Comment.objects.filter(pk__in=ids).values(*ARCHIVE_FIELDS)
+            ])
+            # Без сигналов удаления: счетчики комментариев учитывают архив.
+            Comment.objects.filter(pk__in=ids)._raw_delete(queryset.db)
+        moved += len(ids)
+
+
+def copy_to_archive(name):
+    columns = ', '.join(ARCHIVE_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(
+            f'INSERT INTO {quote(CommentArchive._meta.db_table)} ({columns}) '
+            f'SELECT {columns} FROM {quote(name)}'
+        )
+        return cursor.rowcount
+
+
+def drop_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'ALTER TABLE {quote(table())} DETACH PARTITION {quote(name)}'
+        )
+        cursor.execute(f'DROP TABLE {quote(name)}')
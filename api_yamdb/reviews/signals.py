@@ -0,0 +1,108 @@
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_migrate)
+from django.dispatch import receiver
+
+from . import autocomplete, events, jobs, partitions
+from .cache import category_cache, genre_cache
+from .models import (Category, Comment, CommentArchive, Genre, Review, Title,
+                     User, comments_deleted)
+
+
+# Кэш сбрасывается после фиксации: иначе другой воркер успеет
+# перечитать старые строки под новой версией, а при откате версия
+# сменится зря.
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, using, **kwargs):
+    transaction.on_commit(category_cache.invalidate, using=using)
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def invalidate_genre_cache(sender, using, **kwargs):
+    transaction.on_commit(genre_cache.invalidate, using=using)
+
+
+@receiver([post_save, post_delete], sender=Title)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Category)
+def update_autocomplete(sender, instance, **kwargs):
+    kind = {
+        Title: autocomplete.TITLE,
+        Genre: autocomplete.GENRE,
+        Category: autocomplete.CATEGORY,
+    }[sender]
+    autocomplete.notify(kind, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Review)
+def recompute_title_stats_on_review(sender, instance, **kwargs):
+    jobs.enqueue(jobs.TITLE_STATS, [instance.title_id])
+    jobs.enqueue(jobs.SIMILAR_TITLES, [instance.title_id])
+
+
+# У комментариев нет обработчиков post_delete: иначе каскадное удаление
+# отзыва или произведения читает каждый комментарий и архивный
+# комментарий. Статистику после каскада пересчитывает обработчик
+# удаления отзыва, после удаления пользователя — обработчик ниже,
+# после прямого удаления комментариев — обработчик comments_deleted.
+@receiver(post_save, sender=Comment)
+def recompute_title_stats_on_comment(sender, instance, created, **kwargs):
+    if not created:
+        # Правка текста комментария не меняет статистику.
+        return
+    title_id = comment_title_id(instance)
+    if title_id is not None:
+        jobs.enqueue(jobs.TITLE_STATS, [title_id])
+
+
+@receiver(comments_deleted)
+def recompute_title_stats_on_comment_delete(sender, title_ids, **kwargs):
+    jobs.enqueue(jobs.TITLE_STATS, title_ids)
+
+
+@receiver(pre_delete, sender=User)
+def recompute_title_stats_on_user_delete(sender, instance, **kwargs):
+    jobs.enqueue(jobs.TITLE_STATS, {
+        title_id
+        for model in (Comment, CommentArchive)
+        for title_id in model.objects.filter(
+            author=instance
+        ).values_list('review__title_id', flat=True).distinct()
+    })
+
+
+@receiver(post_save, sender=Review)
+def publish_review(sender, instance, created, using, **kwargs):
+    if created:
+        events.publish(events.review_event(instance), using)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment(sender, instance, created, using, **kwargs):
+    if not created:
+        return
+    title_id = comment_title_id(instance)
+    if title_id is not None:
+        events.publish(events.comment_event(instance, title_id), using)
+
+
+def comment_title_id(comment):
+    if Comment.review.is_cached(comment):
+        return comment.review.title_id
+    return Review.objects.filter(
+        pk=comment.review_id
+    ).values_list('title_id', flat=True).first()
+
+
+@receiver(pre_migrate)
+def forbid_partitioned_comment_migrations(sender, plan=None, **kwargs):
+    """Миграции Comment не рассчитаны на секционированную таблицу."""
+    if sender.label != Comment._meta.app_label or not plan:
+        return
+    if partitions.touches_comment(plan) and partitions.is_partitioned():
+        raise CommandError(
+            'Таблица комментариев секционирована, а миграции меняют '
+            'Comment. Выполните partition_comments --revert, примените '
+            'миграции и секционируйте таблицу снова.'
+        )
@@ -0,0 +1,178 @@
+"""Похожие произведения по совместным оценкам пользователей.
+
+Оценки образуют разреженную матрицу пользователь × произведение.
+Сходство двух произведений — косинус их столбцов, умноженный на
+n / (n + SHRINKAGE), где n — число пользователей, оценивших оба:
+сходство по одному-двум общим отзывам почти случайно. Строки сходства
+считаются блоками по chunk_size произведений, для каждого сохраняются
+SIMILAR_TITLES_COUNT лучших соседей.
+"""
+from collections import defaultdict
+from functools import reduce
+from itertools import chain
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from scipy.sparse import csr_matrix
+
+from .models import Review, SimilarTitle
+
+SHRINKAGE = 5
+MIN_COMMON_USERS = 2
+CHUNK_SIZE = 1000
+
+
+class ScoreMatrix:
+    """Оценки пользователей: строки — произведения, столбцы — авторы.
+
+    reviews — values_list('author_id', 'title_id', 'score') отзывов.
+    """
+
+    def __init__(self, reviews):
+        columns = np.fromiter(
+            chain.from_iterable(reviews.iterator(chunk_size=10000)),
+            dtype=np.int64
+        ).reshape(-1, 3)
+        authors, title_ids, scores = columns.T
+        self.title_ids, title_index = np.unique(title_ids, return_inverse=True)
+        _, author_index = np.unique(authors, return_inverse=True)
+        shape = (len(self.title_ids), author_index.max(initial=-1) + 1)
+        self.scores = csr_matrix(
+            (scores.astype(np.float64), (title_index, author_index)), shape
+        )
+        self.rated = csr_matrix(
+            (np.ones(len(scores)), (title_index, author_index)), shape
+        )
+        self.scores_t = self.scores.T.tocsr()
+        self.rated_t = self.rated.T.tocsr()
+        self.norms = np.sqrt(
+            np.asarray(self.scores.multiply(self.scores).sum(axis=1))
+        ).ravel()
+
+    def rows(self, title_ids):
+        """Номера строк для id произведений, которые есть в матрице."""
+        positions = np.searchsorted(self.title_ids, title_ids)
+        positions = positions[positions < len(self.title_ids)]
+        return positions[np.isin(self.title_ids[positions], title_ids)]
+
+    def neighbours(self, rows, count):
+        """Для каждой строки — id произведения и его лучшие соседи."""
+        dots = (self.scores[rows] @ self.scores_t).tocsr()
+        common = (self.rated[rows] @ self.rated_t).tocsr()
+        dots.sort_indices()
+        common.sort_indices()
+        for position, row in enumerate(rows):
+            start, end = dots.indptr[position], dots.indptr[position + 1]
+            columns = dots.indices[start:end]
+            shared = common.data[start:end]
+            similarity = (
+                dots.data[start:end]
+                / (self.norms[row] * self.norms[columns])
+                * shared / (shared + SHRINKAGE)
+            )
+            similarity[(columns == row) | (shared < MIN_COMMON_USERS)] = 0
+            best = np.argsort(-similarity)[:count]
+            best = best[similarity[best] > 0]
+            yield int(self.title_ids[row]), [
+                (int(self.title_ids[columns[index]]), float(similarity[index]))
+                for index in best
+            ]
+
+
+def store(neighbours):
+    """Заменяет списки похожих для переданных произведений."""
+    neighbours = dict(neighbours)
+    with transaction.atomic():
+        SimilarTitle.objects.filter(title_id__in=list(neighbours)).delete()
+        SimilarTitle.objects.bulk_create([
+            SimilarTitle(title_id=title_id, similar_id=similar_id, score=score)
+            for title_id, similar in neighbours.items()
+            for similar_id, score in similar
+        ])
+
+
+def rebuild_all(chunk_size=CHUNK_SIZE):
+    """Пересчитывает похожие для всех произведений, возвращает их число."""
+    matrix = ScoreMatrix(
+        Review.objects.values_list('author_id', 'title_id', 'score')
+    )
+    count = settings.SIMILAR_TITLES_COUNT
+    for start in range(0, len(matrix.title_ids), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(matrix.title_ids)))
+        store(matrix.neighbours(rows, count))
+    SimilarTitle.objects.exclude(
+        title_id__in=Review.objects.values('title_id')
+    ).delete()
+    return len(matrix.title_ids)
+
+
+def refresh(title_ids):
+    """Пересчитывает похожие для произведений с измененными отзывами.
+
+    Пересчитываются и произведения, в списках которых они стоят:
+    сходство симметрично. Матрица строится только по авторам отзывов
+    этих произведений — в ней есть все совместные оценки, а нормы
+    столбцов считаются запросом по всем отзывам.
+    """
+    title_ids = set(title_ids) | set(SimilarTitle.objects.filter(
+        similar_id__in=title_ids
+    ).values_list('title_id', flat=True))
+    authors = Review.objects.filter(
+        title_id__in=title_ids
+    ).values('author_id')
+    reviews = Review.objects.filter(author_id__in=authors)
+    matrix = ScoreMatrix(
+        reviews.values_list('author_id', 'title_id', 'score')
+    )
+    squares = dict(
+        Review.objects.filter(title_id__in=reviews.values('title_id'))
+        .values('title_id')
+        .annotate(square=Sum(F('score') * F('score')))
+        .order_by()
+        .values_list('title_id', 'square')
+    )
+    matrix.norms = np.sqrt(np.array(
+        [squares[pk] for pk in matrix.title_ids.tolist()], dtype=np.float64
+    ))
+    ids = np.array(sorted(title_ids), dtype=np.int64)
+    neighbours = dict(matrix.neighbours(
+        matrix.rows(ids), settings.SIMILAR_TITLES_COUNT
+    ))
+    # У произведений без отзывов похожих нет.
+    store({pk: neighbours.get(pk, []) for pk in title_ids})
+    link_back(neighbours, title_ids)
+
+
+def link_back(neighbours, refreshed):
+    """Добавляет пересчитанные произведения в списки их новых соседей.
+
+    Сходство симметрично, поэтому соседа не нужно пересчитывать
+    целиком: пара добавляется в его список, а список обрезается до
+    SIMILAR_TITLES_COUNT лучших.
+    """
+    links = [
+        SimilarTitle(title_id=similar_id, similar_id=title_id, score=score)
+        for title_id, similar in neighbours.items()
+        for similar_id, score in similar
+        if similar_id not in refreshed
+    ]
+    if not links:
+        return
+    count = settings.SIMILAR_TITLES_COUNT
+    with transaction.atomic():
+        SimilarTitle.objects.filter(reduce(or_, (
+            Q(title_id=link.title_id, similar_id=link.similar_id)
+            for link in links
+        ))).delete()
+        SimilarTitle.objects.bulk_create(links)
+        ranked = defaultdict(list)
+        for pk, title_id in SimilarTitle.objects.filter(
+            title_id__in={link.title_id for link in links}
+        ).order_by('-score').values_list('pk', 'title_id'):
+            ranked[title_id].append(pk)
+        SimilarTitle.objects.filter(pk__in=[
+            pk for pks in ranked.values() for pk in pks[count:]
+        ]).delete()
@@ -0,0 +1,22 @@
+from django.db import connections
+
+
+def estimate_count(model, using='default'):
+    """Примерное число строк таблицы модели из статистики PostgreSQL.
+
+    Оценка pg_class.reltuples обновляется VACUUM/ANALYZE и не требует
+    чтения таблицы. Возвращает None на других СУБД и для таблиц,
+    по которым статистика еще не собрана.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
@@ -1,9 +1,61 @@
+import os
 import sys
 from os.path import abspath, dirname, join
 
+import psycopg2
+import pytest
+from django.conf import settings
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def run_jobs_inline(settings):
+    """Фоновые задачи в тестах выполняются без воркера.
+
+    Задачи запускаются после фиксации транзакции; в тестах без
+    transaction=True используйте django_capture_on_commit_callbacks.
+    """
+    settings.JOBS_RUN_INLINE = True
+
+
+def database_is_available():
+    database = settings.DATABASES['default']
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        return True
+    try:
+        psycopg2.connect(
+            dbname=database['NAME'],
+            user=database['USER'],
+            password=database['PASSWORD'],
+            host=database['HOST'],
+            port=database['PORT'],
+            connect_timeout=3,
+        ).close()
+    except psycopg2.OperationalError:
+        return False
+    return True
+
+
+# Отключить тесты с БД можно только явно: SKIP_DB_TESTS=1 или
+# -m "not django_db". Иначе недоступная БД — ошибка, а не зеленый
+# прогон без тестов с БД.
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    db_items = [item for item in items if item.get_closest_marker('django_db')]
+    if not db_items or database_is_available():
+        return
+    if os.getenv('SKIP_DB_TESTS') != '1':
+        pytest.exit(
+            'База данных недоступна. Запустите PostgreSQL или пропустите '
+            'тесты с БД явно: SKIP_DB_TESTS=1 или -m "not django_db".',
+            returncode=pytest.ExitCode.USAGE_ERROR
+        )
+    skip = pytest.mark.skip(reason='База данных недоступна (SKIP_DB_TESTS)')
+    for item in db_items:
+        item.add_marker(skip)
@@ -0,0 +1,137 @@
+import base64
+from datetime import date, datetime, timezone
+
+import pytest
+from rest_framework.test import APIClient
+from reviews import partitions
+from reviews.models import Comment, CommentArchive, Review, Title, User
+
+SAME = datetime(2021, 5, 1, tzinfo=timezone.utc)
+OLD = datetime(2020, 1, 15, tzinfo=timezone.utc)
+
+
+def encode(raw):
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+@pytest.mark.django_db
+class TestActivity:
+
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        other = User.objects.create(username='other', email='o@yamdb.ru')
+        for number in range(4):
+            title = Title.objects.create(name=f'Фильм {number}', year=2000)
+            review = Review.objects.create(
+                title=title, author=user, text=f'Отзыв {number}', score=5
+            )
+            other_review = Review.objects.create(
+                title=title, author=other, text='-', score=5
+            )
+            for _ in range(2):
+                Comment.objects.create(
+                    review=other_review, author=user, text='Ответ'
+                )
+        # Половина отзывов и комментариев с одной датой: страницы
+        # разрываются внутри группы с одинаковым pub_date.
+        Review.objects.filter(
+            author=user, pk__in=Review.objects.filter(author=user).order_by(
+                'pk'
+            ).values('pk')[:2]
+        ).update(pub_date=SAME)
+        Comment.objects.filter(pk__in=Comment.objects.order_by(
+            'pk'
+        ).values('pk')[:4]).update(pub_date=SAME)
+        # Два старых комментария уходят в архив, с той же датой, что у
+        # одного из отзывов.
+        Comment.objects.filter(pk__in=Comment.objects.order_by(
+            'pk'
+        ).values('pk')[4:6]).update(pub_date=OLD)
+        Review.objects.filter(pk=Review.objects.filter(
+            author=user
+        ).order_by('pk')[2].pk).update(pub_date=OLD)
+        partitions.archive(date(2021, 1, 1), batch_size=100)
+        return user
+
+    def expected(self, user):
+        items = [
+            (review.pub_date, 'review', review.pk)
+            for review in Review.objects.filter(author=user)
+        ] + [
+            (comment.pub_date, 'comment', comment.pk)
+            for comment in Comment.objects.filter(author=user)
+        ] + [
+            (comment.pub_date, 'archived_comment', comment.pk)
+            for comment in CommentArchive.objects.filter(author=user)
+        ]
+        return [
+            (kind.replace('archived_', ''), pk)
+            for _, kind, pk in sorted(items, reverse=True)
+        ]
+
+    @pytest.mark.parametrize('limit', [1, 2, 3, 5])
+    def test_pages(self, user, limit, django_assert_max_num_queries):
+        client = APIClient()
+        url = f'/api/v1/users/{user.username}/activity/?limit={limit}'
+        items = []
+        while url:
+            # Пользователь и по запросу на каждый поток.
+            with django_assert_max_num_queries(4):
+                response = client.get(url)
+            assert response.status_code == 200
+            results = response.json()['results']
+            assert len(results) <= limit
+            items.extend((item['type'], item['id']) for item in results)
+            url = response.json()['next']
+        assert items == self.expected(user), (
+            'Страницы должны покрывать ленту без пропусков и повторов, '
+            'в том числе на границе объектов с одинаковой датой'
+        )
+
+    def test_archived_comments(self, user):
+        archived = set(CommentArchive.objects.filter(
+            author=user
+        ).values_list('pk', flat=True))
+        assert len(archived) == 2
+        response = APIClient().get(
+            f'/api/v1/users/{user.username}/activity/', {'limit': 50}
+        )
+        comments = {
+            item['id']: item for item in response.json()['results']
+            if item['type'] == 'comment'
+        }
+        assert archived <= set(comments), (
+            'Архивные комментарии должны оставаться в ленте активности'
+        )
+        assert all(
+            comments[pk]['review']['title']['name'] for pk in archived
+        )
+
+    def test_me(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1/users/me/activity/', {'limit': 50})
+        assert [
+            (item['type'], item['id']) for item in response.json()['results']
+        ] == self.expected(user)
+        assert response.json()['next'] is None
+
+    @pytest.mark.parametrize('cursor', [
+        'not base64!',
+        encode(b'\xff\xfe'),
+        encode(b'2021-05-01T00:00:00+00:00|review'),
+        encode(b'yesterday|review|1'),
+        encode(b'2021-05-01T00:00:00+00:00|review|abc'),
+        encode(b'2021-05-01T00:00:00|review|1'),
+        encode(b'2021-05-01T00:00:00+00:00|review|' + b'9' * 30),
+        encode(b'2021-05-01T00:00:00+00:00|title|1'),
+        encode(b'2021-05-01T00:00:00+00:00|archived|1'),
+    ])
+    def test_tampered_cursor(self, user, cursor):
+        response = APIClient().get(
+            f'/api/v1/users/{user.username}/activity/', {'cursor': cursor}
+        )
+        assert response.status_code == 404, (
+            'Поддельный курсор должен давать 404, а не ошибку сервера'
+        )
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title, User
+
+
+def create_reviews(number):
+    users = User.objects.bulk_create(
+        User(
+            username=f'reader{number}_{index}',
+            email=f'reader{number}_{index}@yamdb.ru'
+        )
+        for index in range(number)
+    )
+    titles = Title.objects.bulk_create(
+        Title(name=f'Произведение {index}', year=2000)
+        for index in range(number)
+    )
+    reviews = Review.objects.bulk_create(
+        Review(title=title, author=user, text='Отзыв', score=5)
+        for title, user in zip(titles, users)
+    )
+    Comment.objects.bulk_create(
+        Comment(review=review, author=review.author, text='Ответ')
+        for review in reviews
+    )
+
+
+@pytest.mark.django_db
+class TestAdminChangelist:
+
+    @pytest.mark.parametrize('url', [
+        '/admin/reviews/review/', '/admin/reviews/comment/'
+    ])
+    def test_queries_do_not_grow(self, admin_client, url):
+        counts = []
+        for number in (2, 10):
+            create_reviews(number)
+            with CaptureQueriesContext(connection) as context:
+                assert admin_client.get(url).status_code == 200
+            counts.append(len(context))
+            Title.objects.all().delete()
+        assert counts[0] == counts[1], (
+            'Число запросов страницы списка не должно зависеть от числа строк'
+        )
+
+    @pytest.mark.parametrize('score, count', [
+        ('8', 1), ('abc', 2), ('11', 2), ('', 2)
+    ])
+    def test_score_filter(self, admin_client, score, count):
+        create_reviews(2)
+        Review.objects.filter(pk=Review.objects.first().pk).update(score=8)
+        response = admin_client.get(
+            '/admin/reviews/review/', {'score': score}
+        )
+        assert response.status_code == 200, (
+            'Неверное значение фильтра не должно давать ошибку'
+        )
+        assert response.context['cl'].result_count == count
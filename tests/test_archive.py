@@ -0,0 +1,275 @@
+import threading
+from datetime import date, datetime, timezone
+from io import StringIO
+
+import pytest
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, models, transaction
+from django.db.migrations import AddField, Migration
+from rest_framework.test import APIClient
+from reviews import jobs, partitions, signals
+from reviews.models import (Comment, CommentArchive, Review, Title, TitleStats,
+                            User)
+
+OLD = datetime(2020, 1, 15, tzinfo=timezone.utc)
+CUTOFF = date(2021, 1, 1)
+
+
+@pytest.mark.django_db
+class TestCommentArchive:
+
+    @pytest.fixture
+    def review(self):
+        author = User.objects.create(username='author', email='a@yamdb.ru')
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=author, text='-', score=5
+        )
+        comments = [
+            Comment.objects.create(
+                review=review, author=author, text=f'Комментарий {number}'
+            )
+            for number in range(5)
+        ]
+        # Три старых комментария и два новых.
+        Comment.objects.filter(
+            pk__in=[comment.pk for comment in comments[:3]]
+        ).update(pub_date=OLD)
+        return review
+
+    def url(self, review):
+        return f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+
+    def test_archive(self, review):
+        expected = list(Comment.objects.order_by('-pub_date', '-id').values(
+            *partitions.ARCHIVE_FIELDS
+        ))
+        assert partitions.archive(CUTOFF, batch_size=2) == 3
+        assert Comment.objects.count() == 2
+        assert list(CommentArchive.objects.order_by(
+            '-pub_date', '-id'
+        ).values(*partitions.ARCHIVE_FIELDS)) == expected[2:], (
+            'Архив должен сохранять id, автора, текст и дату комментария'
+        )
+
+    def test_pagination_falls_through(self, review):
+        expected = list(Comment.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', flat=True))
+        partitions.archive(CUTOFF, batch_size=100)
+        client = APIClient()
+        pages = []
+        url = self.url(review) + '?limit=2'
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert response.json()['count'] == 5, (
+                'count должен включать архивные комментарии'
+            )
+            pages.append([item['id'] for item in response.json()['results']])
+            url = response.json()['next']
+        assert pages == [expected[:2], expected[2:4], expected[4:]], (
+            'После оперативных комментариев список продолжается архивом'
+        )
+        response = client.get(self.url(review) + f'{expected[-1]}/')
+        assert response.status_code == 200
+        assert response.json()['text'] == 'Комментарий 0'
+
+    def test_archived_comment_of_other_title(self, review):
+        partitions.archive(CUTOFF, batch_size=100)
+        comment = CommentArchive.objects.first()
+        other = Title.objects.create(name='Другое', year=2000)
+        client = APIClient()
+        client.force_authenticate(review.author)
+        url = f'/api/v1/titles/{other.pk}/reviews/{review.pk}/comments/'
+        assert client.get(f'{url}{comment.pk}/').status_code == 404, (
+            'Архивный комментарий не должен находиться под чужим '
+            'произведением'
+        )
+        assert client.delete(f'{url}{comment.pk}/').status_code == 404
+        assert CommentArchive.objects.filter(pk=comment.pk).exists()
+        assert client.get(
+            self.url(review) + f'{comment.pk}/'
+        ).status_code == 200
+
+    def test_first_page_skips_archive(self, review, django_assert_num_queries):
+        partitions.archive(CUTOFF, batch_size=100)
+        client = APIClient()
+        # Отзыв, комментарии, их авторы; без подсчета и без архива.
+        with django_assert_num_queries(3):
+            response = client.get(self.url(review) + '?limit=1&count=none')
+        assert len(response.json()['results']) == 1
+
+    def test_review_counts_archived(self, review):
+        partitions.archive(CUTOFF, batch_size=100)
+        response = APIClient().get(
+            f'/api/v1/titles/{review.title_id}/reviews/'
+        )
+        item = response.json()['results'][0]
+        assert item['comment_count'] == 5, (
+            'Число комментариев отзыва должно учитывать архив'
+        )
+        jobs.recompute_title_stats([review.title_id])
+        assert TitleStats.objects.get(
+            title_id=review.title_id
+        ).comment_count == 5
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Секционирование доступно только в PostgreSQL'
+    )
+    def test_partitioned(self, review):
+        call_command('partition_comments', months_ahead=1)
+        assert partitions.is_partitioned()
+        assert date(2020, 1, 1) in partitions.partitions()
+        assert Comment.objects.count() == 5
+        Comment.objects.create(
+            review=review, author=review.author, text='После секционирования'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_constraint '
+                "WHERE conrelid = 'reviews_comment'::regclass "
+                "AND contype = 'f'"
+            )
+            assert cursor.fetchone()[0] == 2, 'Внешние ключи потеряны'
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE tablename = 'reviews_comment'"
+            )
+            assert {
+                index.name for index in Comment._meta.indexes
+            } <= {name for name, in cursor.fetchall()}, 'Индексы потеряны'
+        comment = Comment.objects.order_by('-pk').first()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Comment.objects.bulk_create([Comment(
+                id=comment.pk, review=review, author=review.author,
+                text='Повтор id', pub_date=OLD
+            )])
+        comment.text = 'Правка'
+        comment.save()
+        call_command('archive_comments', before=CUTOFF)
+        assert date(2020, 1, 1) not in partitions.partitions(), (
+            'Старые секции должны удаляться целиком'
+        )
+        assert CommentArchive.objects.count() == 3
+        assert Comment.objects.count() == 3
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Секционирование доступно только в PostgreSQL'
+    )
+    def test_revert(self, review):
+        call_command('partition_comments', months_ahead=1)
+        comment_migration = Migration('0100_comment_field', 'reviews')
+        comment_migration.operations = [
+            AddField('comment', 'rating', models.IntegerField(default=0))
+        ]
+        review_migration = Migration('0100_review_field', 'reviews')
+        review_migration.operations = [
+            AddField('review', 'comment', models.TextField(default=''))
+        ]
+        config = apps.get_app_config('reviews')
+        with pytest.raises(CommandError):
+            signals.forbid_partitioned_comment_migrations(
+                config, plan=[(comment_migration, False)]
+            )
+        signals.forbid_partitioned_comment_migrations(
+            config, plan=[(review_migration, False)]
+        )
+
+        call_command('partition_comments', revert=True, stdout=StringIO())
+        assert not partitions.is_partitioned()
+        assert Comment.objects.count() == 5
+        signals.forbid_partitioned_comment_migrations(
+            config, plan=[(comment_migration, False)]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_get_constraintdef(oid) FROM pg_constraint '
+                "WHERE conrelid = 'reviews_comment'::regclass "
+                "AND contype IN ('f', 'p') ORDER BY contype"
+            )
+            definitions = [definition for definition, in cursor.fetchall()]
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE tablename LIKE 'reviews_comment%%'"
+            )
+            index_names = {name for name, in cursor.fetchall()}
+        assert len(definitions) == 3 and definitions[-1] == (
+            'PRIMARY KEY (id)'
+        ), 'Первичный ключ должен снова быть id'
+        assert {
+            index.name for index in Comment._meta.indexes
+        } <= index_names, 'Индексы потеряны'
+        comment = Comment.objects.order_by('-pk').first()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Comment.objects.bulk_create([Comment(
+                id=comment.pk, review=review, author=review.author,
+                text='Повтор id', pub_date=OLD
+            )])
+        assert Comment.objects.create(
+            review=review, author=review.author, text='После возврата'
+        ).pk > comment.pk
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Секционирование доступно только в PostgreSQL'
+)
+@pytest.mark.django_db(transaction=True)
+class TestPartitionedUniqueId:
+
+    @pytest.fixture
+    def review(self):
+        author = User.objects.create(username='author', email='a@yamdb.ru')
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=author, text='-', score=5
+        )
+        call_command('partition_comments', months_ahead=1, stdout=StringIO())
+        yield review
+        # Таблица переживает тест с transaction=True.
+        call_command('partition_comments', revert=True, stdout=StringIO())
+
+    def test_concurrent_duplicate_in_other_partition(self, review):
+        """Вставки одного id в разные месяцы ждут друг друга."""
+        inserted = threading.Event()
+        errors = []
+
+        def insert(pub_date, first):
+            try:
+                # Без ORM: bulk_create заменил бы pub_date текущим
+                # временем (auto_now_add), и секция была бы одна.
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO reviews_comment '
+                        '(id, review_id, author_id, text, pub_date) '
+                        "VALUES (%s, %s, %s, '-', %s)",
+                        [10 ** 6, review.pk, review.author_id, pub_date]
+                    )
+                    if first:
+                        inserted.set()
+                        # Вторая вставка начинается до фиксации первой.
+                        threading.Event().wait(0.5)
+            except IntegrityError as error:
+                errors.append(error)
+            finally:
+                inserted.set()
+                connection.close()
+
+        first = threading.Thread(target=insert, args=(OLD, True))
+        first.start()
+        inserted.wait(5)
+        second = threading.Thread(
+            target=insert, args=(datetime.now(timezone.utc), False)
+        )
+        second.start()
+        first.join()
+        second.join()
+        assert len(errors) == 1, (
+            'Одинаковый id в разных секциях должен отклоняться и при '
+            'одновременной вставке'
+        )
+        assert Comment.objects.filter(pk=10 ** 6).count() == 1
@@ -0,0 +1,79 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from reviews.autocomplete import (AutocompleteIndex, autocomplete_index,
+                                  name_keys)
+from reviews.models import Genre, Title, TitleStats
+
+CHECK_INTERVAL = 1e-6
+
+
+def names(result, kind='title'):
+    return [item['name'] for item in result[kind]]
+
+
+class TestNameKeys:
+
+    def test_word_suffixes(self):
+        assert name_keys('Крёстный  Отец: часть 2') == {
+            'крестный отец часть 2'.encode(), 'отец часть 2'.encode(),
+            'часть 2'.encode()
+        }, 'Ключи должны начинаться с каждого слова нормализованного названия'
+
+
+@pytest.mark.django_db
+class TestAutocompleteIndex:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        cache.clear()
+        for name, reviews in (
+            ('Крёстный отец', 10), ('Отец солдата', 50), ('Отель', 0)
+        ):
+            title = Title.objects.create(name=name, year=1970)
+            TitleStats.objects.create(title=title, review_count=reviews)
+
+    def test_ranked_by_popularity(self):
+        index = AutocompleteIndex(check_interval=CHECK_INTERVAL)
+        assert names(index.search('оте', 5)) == [
+            'Отец солдата', 'Крёстный отец', 'Отель'
+        ], 'Совпадения должны идти по убыванию числа отзывов'
+        assert names(index.search('отец', 1)) == ['Отец солдата']
+        assert names(index.search('солдат', 5)) == ['Отец солдата']
+
+    def test_incremental_update(
+        self, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        index = AutocompleteIndex(check_interval=CHECK_INTERVAL)
+        assert 'Отель' in names(index.search('о', 5))
+        title = Title.objects.get(name='Отель')
+        with django_capture_on_commit_callbacks(execute=True):
+            title.name = 'Гостиница'
+            title.save()
+            Genre.objects.create(name='Детектив', slug='detective')
+        with django_assert_num_queries(2):
+            assert names(index.search('гост', 5)) == ['Гостиница'], (
+                'Индекс должен перечитать только измененные объекты'
+            )
+        assert 'Отель' not in names(index.search('оте', 5))
+        assert 'Отель' not in names(index.search('о', 5)), (
+            'Список лучших для короткого префикса должен пересчитываться'
+        )
+        assert names(index.search('дет', 5), 'genre') == ['Детектив']
+
+
+@pytest.mark.django_db
+class TestAutocompleteEndpoint:
+
+    def test_no_queries(self, django_assert_num_queries):
+        cache.clear()
+        Genre.objects.create(name='Драма', slug='drama')
+        autocomplete_index.version = None
+        client = APIClient()
+        client.get('/api/v1/autocomplete/', {'q': 'д'})
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/autocomplete/', {'q': 'Дра'})
+        assert response.status_code == 200
+        assert response.json()['genre'] == [
+            {'slug': 'drama', 'name': 'Драма'}
+        ]
@@ -0,0 +1,76 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews import partitions
+from reviews.models import Comment, Review, Title, User
+
+INCLUDE = {'include': 'reviews,reviews.comments'}
+
+
+@pytest.mark.django_db
+class TestCompoundTitle:
+
+    def make_title(self, reviews, comments):
+        title = Title.objects.create(name=f'{reviews} отзывов', year=2000)
+        for number in range(reviews):
+            author, _ = User.objects.get_or_create(
+                username=f'user{number}', email=f'user{number}@yamdb.ru'
+            )
+            review = Review.objects.create(
+                title=title, author=author, text='-', score=5
+            )
+            for position in range(comments):
+                Comment.objects.create(
+                    review=review, author=author, text=f'{position}'
+                )
+        return title
+
+    def get(self, title, params=INCLUDE):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(f'/api/v1/titles/{title.pk}/', params)
+        assert response.status_code == 200
+        return response.json(), len(queries)
+
+    def test_fixed_queries(self):
+        small, _ = self.get(self.make_title(reviews=2, comments=1))
+        large_title = self.make_title(reviews=15, comments=5)
+        large, queries = self.get(large_title)
+        _, small_queries = self.get(self.make_title(reviews=11, comments=0))
+        assert queries == small_queries, (
+            'Число запросов не должно зависеть от числа отзывов'
+        )
+        assert large['reviews']['count'] == 15
+        assert len(large['reviews']['results']) == 10
+        assert large['reviews']['next'].endswith(
+            f'/api/v1/titles/{large_title.pk}/reviews/?limit=10&offset=10'
+        )
+        review = large['reviews']['results'][0]
+        assert review['comment_count'] == review['comments']['count'] == 5
+        assert [item['text'] for item in review['comments']['results']] == [
+            '4', '3', '2'
+        ], 'У отзыва должны быть первые комментарии, от новых к старым'
+        assert small['reviews']['next'] is None
+        assert small['reviews']['results'][0]['comments']['next'] is None
+
+    def test_archived_comments(self):
+        title = self.make_title(reviews=1, comments=4)
+        Comment.objects.filter(text__in=['0', '1', '2']).update(
+            pub_date=datetime(2020, 1, 1, tzinfo=timezone.utc)
+        )
+        partitions.archive(date(2021, 1, 1), batch_size=100)
+        data, _ = self.get(title)
+        comments = data['reviews']['results'][0]['comments']
+        assert [item['text'] for item in comments['results']] == [
+            '3', '2', '1'
+        ], 'Не хватившие комментарии добираются из архива'
+        assert comments['count'] == 4
+
+    def test_without_include(self):
+        title = self.make_title(reviews=1, comments=1)
+        data, _ = self.get(title, {})
+        assert 'reviews' not in data
+        data, _ = self.get(title, {'include': 'reviews'})
+        assert 'comments' not in data['reviews']['results'][0]
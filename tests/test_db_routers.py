@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from api import db_routers
+from api.middleware import ReplicaRoutingMiddleware
+from reviews.models import Title
+
+
+class TestReplicaRouting:
+
+    def test_read_your_writes(self, settings, monkeypatch):
+        settings.DB_REPLICAS = ['replica_1']
+        monkeypatch.setattr(db_routers, 'choose_replica', lambda: 'replica_1')
+        cache.clear()
+        router = db_routers.ReplicaRouter()
+        used = []
+
+        def view(request):
+            used.append(router.db_for_read(Title))
+            return HttpResponse(status=201)
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+        for method, token in (('get', 'a'), ('post', 'a'),
+                              ('get', 'a'), ('get', 'b')):
+            middleware(getattr(factory, method)(
+                '/', HTTP_AUTHORIZATION=f'Bearer {token}'
+            ))
+
+        assert used == ['replica_1', None, None, 'replica_1'], (
+            'GET-запросы должны читать из реплики, а запись и чтение '
+            'после записи того же клиента — из основной базы'
+        )
+        assert router.db_for_read(Title) is None, (
+            'Вне запроса чтение должно идти в основную базу'
+        )
+        assert router.db_for_write(Title) == 'default'
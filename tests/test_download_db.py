@@ -0,0 +1,166 @@
+import io
+import time
+from datetime import date
+
+import pytest
+from django.core.management import call_command
+from django.db.models import QuerySet
+from reviews import jobs, partitions
+from reviews.models import (Comment, CommentArchive, ImportState, RecomputeJob,
+                            Review)
+
+FILES = {
+    'category.csv': ['id,name,slug', '1,Фильм,movie'],
+    'genre.csv': ['id,name,slug', '1,Драма,drama'],
+    'users.csv': [
+        'id,username,email,role,bio,first_name,last_name',
+        '1,reader,reader@yamdb.ru,user,,,',
+    ],
+    'titles.csv': ['id,name,year,category', '1,Фильм,2000,1'],
+    'review.csv': [
+        'id,title_id,text,author,score,pub_date',
+        '1,1,Отзыв,1,8,2019-09-24T21:08:21.567Z',
+    ],
+    # Даты без часового пояса.
+    'comments.csv': [
+        'id,review_id,text,author,pub_date',
+        '1,1,Первый,1,2019-09-25 10:00:00',
+        '2,1,Второй,1,2019-09-25 11:00:00',
+    ],
+}
+
+
+@pytest.mark.django_db
+class TestDownloadDbSync:
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        for name, lines in FILES.items():
+            (tmp_path / name).write_text('\n'.join(lines), encoding='utf-8')
+        return tmp_path
+
+    @pytest.fixture
+    def written(self, monkeypatch):
+        """Объекты, переданные в bulk_create и bulk_update."""
+        calls = {'created': [], 'updated': []}
+        bulk_create, bulk_update = QuerySet.bulk_create, QuerySet.bulk_update
+
+        def create(queryset, objs, *args, **kwargs):
+            calls['created'].extend(obj.pk for obj in objs)
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        def update(queryset, objs, *args, **kwargs):
+            calls['updated'].extend(obj.pk for obj in objs)
+            return bulk_update(queryset, objs, *args, **kwargs)
+
+        monkeypatch.setattr(QuerySet, 'bulk_create', create)
+        monkeypatch.setattr(QuerySet, 'bulk_update', update)
+        return calls
+
+    @pytest.fixture
+    def local_timezone(self, monkeypatch):
+        """Пояс системы не совпадает с TIME_ZONE."""
+        monkeypatch.setenv('TZ', 'Asia/Vladivostok')
+        time.tzset()
+        yield
+        monkeypatch.undo()
+        time.tzset()
+
+    def sync(self, data_dir):
+        output = io.StringIO()
+        call_command(
+            'download_db', sync=True, data_dir=str(data_dir), stdout=output
+        )
+        return output.getvalue()
+
+    def test_sync_twice(self, data_dir, written, local_timezone):
+        self.sync(data_dir)
+        assert Comment.objects.count() == 2
+        assert ImportState.objects.count() == len(FILES)
+        assert Review.objects.get().pub_date.isoformat() == (
+            '2019-09-24T21:08:21.567000+00:00'
+        ), 'Дата из CSV должна заменять дату auto_now_add'
+        written['created'].clear()
+        written['updated'].clear()
+
+        output = self.sync(data_dir)
+        assert output.count('без изменений') == len(FILES)
+        assert written == {'created': [], 'updated': []}, (
+            'Неизмененные файлы не должны перезаписываться'
+        )
+
+        # Файл изменился, но первая строка осталась прежней.
+        lines = FILES['comments.csv'][:2] + [
+            '2,1,Второй изменен,1,2019-09-25 11:00:00',
+            '3,1,Третий,1,2019-09-26 12:00:00',
+        ]
+        (data_dir / 'comments.csv').write_text(
+            '\n'.join(lines), encoding='utf-8'
+        )
+        output = self.sync(data_dir)
+        assert 'comments.csv: добавлено 1, обновлено 1' in output, (
+            'Строки с датой без часового пояса должны сравниваться по хэшу '
+            'с учетом того, что в БД они хранятся в UTC'
+        )
+        assert sorted(written['created']) == [3]
+        assert sorted(written['updated']) == [2, 3], (
+            'Обновляться должны только измененная строка и новая '
+            '(ради даты auto_now_add)'
+        )
+        assert Comment.objects.get(pk=2).text == 'Второй изменен'
+
+    def test_sync_skips_archived(self, data_dir):
+        self.sync(data_dir)
+        partitions.archive(date(2020, 1, 1), batch_size=100)
+        assert Comment.objects.count() == 0
+        lines = FILES['comments.csv'] + [
+            '3,1,Третий,1,2020-02-01 12:00:00',
+        ]
+        (data_dir / 'comments.csv').write_text(
+            '\n'.join(lines), encoding='utf-8'
+        )
+        output = self.sync(data_dir)
+        assert 'comments.csv: добавлено 1, обновлено 0, в архиве 2' in output
+        assert list(Comment.objects.values_list('pk', flat=True)) == [3], (
+            'Архивные комментарии не должны загружаться повторно'
+        )
+        assert CommentArchive.objects.count() == 2
+
+    def test_sync_recomputes_changed_titles(self, data_dir, settings):
+        settings.JOBS_RUN_INLINE = False
+
+        def queued():
+            title_ids = set(RecomputeJob.objects.filter(
+                kind=jobs.TITLE_STATS
+            ).values_list('object_id', flat=True))
+            RecomputeJob.objects.all().delete()
+            return title_ids
+
+        def write(name, *lines):
+            (data_dir / name).write_text(
+                '\n'.join(FILES[name] + list(lines)), encoding='utf-8'
+            )
+
+        write('titles.csv', '2,Сериал,2001,1')
+        self.sync(data_dir)
+        assert queued() == {1}, (
+            'Произведения без отзывов и комментариев не пересчитываются'
+        )
+        self.sync(data_dir)
+        assert queued() == set(), (
+            'Без изменений пересчет не должен ставиться в очередь'
+        )
+
+        write('comments.csv', '3,1,Третий,1,2019-09-26 12:00:00')
+        self.sync(data_dir)
+        assert queued() == {1}
+
+        (data_dir / 'review.csv').write_text('\n'.join([
+            FILES['review.csv'][0],
+            '1,2,Отзыв,1,8,2019-09-24T21:08:21.567Z',
+        ]), encoding='utf-8')
+        self.sync(data_dir)
+        assert queued() == {1, 2}, (
+            'Отзыв, перенесенный к другому произведению, должен '
+            'пересчитывать оба'
+        )
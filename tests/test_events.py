@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import sync_to_async
+from reviews.events import broker
+from reviews.models import Comment, Review, Title, User
+
+from api_yamdb.asgi import application
+
+
+class StreamClient:
+    """Подключение к потоку SSE через ASGI без сервера."""
+
+    def __init__(self, path):
+        self.scope = {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'headers': [], 'query_string': b'',
+        }
+        self.incoming = asyncio.Queue()
+        self.messages = []
+        self.task = asyncio.ensure_future(
+            application(self.scope, self.incoming.get, self.send)
+        )
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    @property
+    def body(self):
+        return b''.join(
+            message.get('body', b'') for message in self.messages
+        ).decode()
+
+    async def wait_for(self, text, timeout=5):
+        for _ in range(int(timeout / 0.01)):
+            if text in self.body or self.task.done():
+                break
+            await asyncio.sleep(0.01)
+        return text in self.body
+
+    async def close(self):
+        await self.incoming.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, 5)
+
+
+def events(body):
+    return [
+        json.loads(line[len('data: '):])
+        for line in body.splitlines() if line.startswith('data: ')
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEventStream:
+
+    @pytest.fixture(autouse=True)
+    def stop_listener(self):
+        yield
+        broker.stop()
+
+    @pytest.fixture
+    def title(self):
+        return Title.objects.create(name='Фильм', year=2000)
+
+    @pytest.fixture
+    def author(self):
+        return User.objects.create(username='reader', email='r@yamdb.ru')
+
+    def test_review_and_comment_events(self, title, author):
+        other = Title.objects.create(name='Другой', year=2001)
+
+        def write():
+            Review.objects.create(
+                title=other, author=author, text='Чужой', score=1
+            )
+            review = Review.objects.create(
+                title=title, author=author, text='Отлично', score=9
+            )
+            Comment.objects.create(review=review, author=author, text='Да')
+
+        async def scenario():
+            client = StreamClient(f'/api/v1/titles/{title.pk}/events/')
+            assert await client.wait_for('retry:')
+            await sync_to_async(broker.ready.wait)(5)
+            await sync_to_async(write)()
+            assert await client.wait_for('event: comment')
+            await client.close()
+            return client
+
+        client = asyncio.run(scenario())
+        assert client.messages[0]['status'] == 200
+        review, comment = events(client.body)
+        assert review['type'] == 'review' and review['text'] == 'Отлично', (
+            'Поток должен содержать только события своего произведения'
+        )
+        assert comment['review_id'] == review['id']
+        assert comment['author'] == 'reader'
+        assert not broker.subscribers, 'После отключения подписка удаляется'
+
+    def test_unknown_title(self):
+        async def scenario():
+            client = StreamClient('/api/v1/titles/0/events/')
+            await asyncio.wait_for(client.task, 5)
+            return client
+
+        assert asyncio.run(scenario()).messages[0]['status'] == 404
@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+
+from reviews.models import Comment, Review, Title, User
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='EXPLAIN проверяется только на PostgreSQL'
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestIndexes:
+
+    @pytest.fixture(autouse=True)
+    def data(self):
+        users = User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@yamdb.ru')
+            for number in range(20)
+        )
+        titles = Title.objects.bulk_create(
+            Title(name=f'Произведение {number}', year=2000)
+            for number in range(20)
+        )
+        reviews = Review.objects.bulk_create(
+            Review(title=title, author=user, text='Отзыв', score=5)
+            for title in titles for user in users
+        )
+        Comment.objects.bulk_create(
+            Comment(review=review, author=review.author, text='Комментарий')
+            for review in reviews
+        )
+        self.title, self.user, self.review = titles[0], users[0], reviews[0]
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE reviews_review')
+            cursor.execute('VACUUM ANALYZE reviews_comment')
+            cursor.execute('SET enable_seqscan = off')
+        yield
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assert_index(self, queryset, index, ordered=True):
+        plan = queryset.explain()
+        assert index in plan, (
+            f'Запрос должен использовать индекс {index}:\n{plan}'
+        )
+        if ordered:
+            assert 'Sort' not in plan, (
+                f'Индекс {index} должен задавать порядок без сортировки:\n'
+                f'{plan}'
+            )
+
+    def test_title_reviews(self):
+        self.assert_index(
+            Review.objects.filter(title=self.title)
+            .order_by('-pub_date', '-id')[:5],
+            'review_title_pub_date_idx'
+        )
+
+    def test_review_comments(self):
+        self.assert_index(
+            Comment.objects.filter(review=self.review)
+            .order_by('-pub_date', '-id')[:5],
+            'comment_review_pub_date_idx'
+        )
+
+    def test_title_rating(self):
+        self.assert_index(
+            Review.objects.filter(title=self.title).values_list('score'),
+            'Index Only Scan using review_title_score_idx',
+            ordered=False
+        )
+
+    def test_user_activity(self):
+        self.assert_index(
+            Review.objects.filter(author=self.user)
+            .order_by('-pub_date', '-id')[:5],
+            'review_author_pub_date_idx'
+        )
+        self.assert_index(
+            Comment.objects.filter(author=self.user)
+            .order_by('-pub_date', '-id')[:5],
+            'comment_author_pub_date_idx'
+        )
@@ -0,0 +1,189 @@
+from datetime import date, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews import jobs, partitions
+from reviews.models import (Comment, CommentArchive, RecomputeJob, Review,
+                            Title, TitleStats, User)
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Фильм', year=2000)
+
+
+@pytest.fixture
+def users():
+    return User.objects.bulk_create(
+        User(username=f'user{number}', email=f'user{number}@yamdb.ru')
+        for number in range(2)
+    )
+
+
+@pytest.mark.django_db
+class TestTitleStats:
+
+    def test_recomputed_inline(self, title, users,
+                               django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            first = Review.objects.create(
+                title=title, author=users[0], text='Отзыв', score=4
+            )
+            Review.objects.create(
+                title=title, author=users[1], text='Отзыв', score=8
+            )
+            Comment.objects.create(
+                review=first, author=users[1], text='Ответ'
+            )
+        stats = TitleStats.objects.get(title=title)
+        assert (stats.rating, stats.review_count, stats.comment_count) == (
+            6, 2, 1
+        ), 'Статистика должна пересчитываться при изменении отзывов'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        stats.refresh_from_db()
+        assert (stats.rating, stats.review_count, stats.comment_count) == (
+            8, 1, 0
+        )
+
+    def test_comment_deletes(self, title, users,
+                             django_capture_on_commit_callbacks):
+        review = Review.objects.create(
+            title=title, author=users[0], text='Отзыв', score=4
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            comment = Comment.objects.create(
+                review=review, author=users[0], text='Ответ'
+            )
+            Comment.objects.create(review=review, author=users[1], text='-')
+        client = APIClient()
+        client.force_authenticate(users[0])
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.delete(
+                f'/api/v1/titles/{title.pk}/reviews/{review.pk}/'
+                f'comments/{comment.pk}/'
+            )
+        assert response.status_code == 204
+        stats = TitleStats.objects.get(title=title)
+        assert stats.comment_count == 1, (
+            'Удаление комментария должно пересчитывать статистику'
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            users[1].delete()
+        stats.refresh_from_db()
+        assert stats.comment_count == 0, (
+            'Удаление автора должно пересчитывать статистику произведений '
+            'с его комментариями'
+        )
+
+    def test_direct_comment_deletes(
+        self, title, users, django_capture_on_commit_callbacks
+    ):
+        review = Review.objects.create(
+            title=title, author=users[0], text='Отзыв', score=4
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            for number in range(4):
+                Comment.objects.create(
+                    review=review, author=users[1], text=f'{number}'
+                )
+        partitions.archive(date.today() + timedelta(days=1), batch_size=1)
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(review=review, author=users[1], text='-')
+        stats = TitleStats.objects.get(title=title)
+        assert stats.comment_count == 5
+        # Удаления не через API и админку: из shell, команд, кода.
+        deletes = [
+            lambda: Comment.objects.get().delete(),
+            lambda: CommentArchive.objects.order_by('pk').first().delete(),
+            lambda: CommentArchive.objects.filter(
+                text__in=['1', '2']
+            ).delete(),
+            lambda: review.archived_comments.all().delete(),
+        ]
+        for count, delete in zip([4, 3, 1, 0], deletes):
+            with django_capture_on_commit_callbacks(execute=True):
+                delete()
+            stats.refresh_from_db()
+            assert stats.comment_count == count, (
+                'Прямое удаление комментариев должно пересчитывать '
+                'статистику'
+            )
+
+    def test_review_delete_skips_comment_rows(
+        self, title, users, django_capture_on_commit_callbacks
+    ):
+        review = Review.objects.create(
+            title=title, author=users[0], text='Отзыв', score=4
+        )
+        for number in range(5):
+            Comment.objects.create(review=review, author=users[1], text='-')
+        partitions.archive(date.today() + timedelta(days=1), batch_size=2)
+        Comment.objects.create(review=review, author=users[1], text='-')
+        with CaptureQueriesContext(connection) as queries:
+            review.delete()
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'comment' in query['sql']
+        ]
+        assert selects == [], (
+            'Каскадное удаление не должно читать комментарии по одному'
+        )
+
+
+@pytest.mark.django_db
+class TestQueue:
+
+    @pytest.fixture(autouse=True)
+    def queued(self, settings):
+        settings.JOBS_RUN_INLINE = False
+
+    def test_coalesce_and_run(self, title, users):
+        for user in users:
+            Review.objects.create(
+                title=title, author=user, text='Отзыв', score=5
+            )
+        assert RecomputeJob.objects.filter(
+            kind=jobs.TITLE_STATS
+        ).count() == 1, (
+            'Повторные запросы пересчета произведения должны '
+            'схлопываться в одну задачу'
+        )
+        assert jobs.queue_stats()[jobs.TITLE_STATS]['depth'] == 1
+        assert not TitleStats.objects.exists()
+
+        assert jobs.run_pending() == 2
+        assert TitleStats.objects.get(title=title).review_count == 2
+        assert jobs.queue_stats() == {}
+
+    def test_failed_batch_is_retried(self, title, monkeypatch):
+        def fail(title_ids):
+            raise RuntimeError
+
+        monkeypatch.setitem(jobs.HANDLERS, jobs.TITLE_STATS, fail)
+        jobs.enqueue(jobs.TITLE_STATS, [title.pk])
+        assert jobs.run_pending() == 1
+        job = RecomputeJob.objects.get()
+        assert job.attempts == 1, 'Упавшая задача должна вернуться в очередь'
+        assert jobs.run_pending() == 0, (
+            'Повтор упавшей задачи должен откладываться'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCascade:
+
+    def test_title_delete_inline(self, title, users):
+        review = Review.objects.create(
+            title=title, author=users[0], text='Отзыв', score=5
+        )
+        Comment.objects.create(review=review, author=users[0], text='Ответ')
+        assert TitleStats.objects.filter(title=title).exists()
+        title.delete()
+        assert not TitleStats.objects.exists(), (
+            'Пересчет при каскадном удалении не должен создавать '
+            'статистику удаленного произведения'
+        )
@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from reviews.management.commands.load_fixture import (iter_fixture,
+                                                      related_models,
+                                                      sort_by_foreign_keys)
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+FIXTURE = [
+    {'model': 'reviews.category', 'pk': 5,
+     'fields': {'name': 'Фильм', 'slug': 'movie'}},
+    {'model': 'reviews.genre', 'pk': 7,
+     'fields': {'name': 'Драма', 'slug': 'drama'}},
+    {'model': 'reviews.user', 'pk': 3,
+     'fields': {'username': 'reader', 'email': 'reader@yamdb.ru',
+                'password': '', 'role': 'user'}},
+    {'model': 'reviews.review', 'pk': 11,
+     'fields': {'title': 2, 'author': 3, 'text': 'Отзыв', 'score': 8,
+                'pub_date': '2023-05-02T09:47:28.270Z'}},
+    {'model': 'reviews.title', 'pk': 2,
+     'fields': {'name': 'Фильм', 'year': 2000, 'category': 5,
+                'genre': [7]}},
+    {'model': 'admin.logentry', 'pk': 1,
+     'fields': {'action_time': '2023-05-02T09:38:43.368Z', 'user': 3,
+                'content_type': 1, 'object_id': '1', 'object_repr': 'x',
+                'action_flag': 1, 'change_message': ''}},
+]
+
+
+class TestIterFixture:
+
+    def test_objects_span_chunks(self):
+        text = json.dumps(FIXTURE, ensure_ascii=False, indent=2)
+        assert list(iter_fixture(io.StringIO(text), chunk_size=7)) == (
+            FIXTURE
+        ), 'Объекты, разрезанные границей чтения, должны разбираться целиком'
+
+
+class TestSortByForeignKeys:
+
+    def test_related_models_first(self):
+        models = sort_by_foreign_keys(
+            [Comment, Review, Title, User, Genre, Category]
+        )
+        for position, model in enumerate(models):
+            assert (related_models(model) & set(models)) - {model} <= set(
+                models[:position]
+            ), f'{model.__name__} загружается раньше связанных моделей'
+
+
+@pytest.mark.django_db
+class TestLoadFixture:
+
+    def test_load(self, tmp_path):
+        path = tmp_path / 'fixture.json'
+        path.write_text(json.dumps(FIXTURE), encoding='utf-8')
+        call_command(
+            'load_fixture', str(path), exclude=['admin.logentry'],
+            stdout=io.StringIO()
+        )
+        review = Review.objects.get(pk=11)
+        assert review.pub_date.isoformat() == '2023-05-02T09:47:28.270000+00:00', (
+            'Дата отзыва должна браться из фикстуры, а не из auto_now_add'
+        )
+        assert list(Title.objects.get(pk=2).genre.all()) == [
+            Genre.objects.get(pk=7)
+        ]
+        assert User.objects.filter(pk=3).exists()
+        assert Category.objects.create(name='Книга', slug='book').pk > 5, (
+            'После загрузки счетчик id должен быть сдвинут'
+        )
+
+    def test_reload(self, tmp_path):
+        path = tmp_path / 'fixture.json'
+        path.write_text(json.dumps(FIXTURE), encoding='utf-8')
+        for _ in range(2):
+            call_command(
+                'load_fixture', str(path), exclude=['admin'],
+                stdout=io.StringIO()
+            )
+        assert Review.objects.get(pk=11).pub_date.isoformat() == (
+            '2023-05-02T09:47:28.270000+00:00'
+        ), 'Повторная загрузка должна перезаписывать объекты из фикстуры'
+        assert Title.objects.get(pk=2).genre.count() == 1
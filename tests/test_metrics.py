@@ -0,0 +1,44 @@
+import pytest
+from django.core.cache import cache
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_request_metrics(self):
+        labels = {'route': 'api:categories-list', 'method': 'GET'}
+        before = sample(
+            'yamdb_http_requests_total', status='200', **labels
+        )
+        queries = sample(
+            'yamdb_db_queries_total', route='api:categories-list'
+        )
+        assert APIClient().get('/api/v1/categories/').status_code == 200
+        assert sample(
+            'yamdb_http_requests_total', status='200', **labels
+        ) == before + 1, 'Запрос должен учитываться по маршруту DRF'
+        assert sample(
+            'yamdb_http_request_duration_seconds_count', **labels
+        ) >= 1
+        assert sample(
+            'yamdb_db_queries_total', route='api:categories-list'
+        ) > queries
+
+    def test_signup_outcome_exported(self):
+        cache.clear()
+        client = APIClient()
+        client.post(
+            '/api/v1/auth/signup/',
+            {'username': 'reader', 'email': 'reader@yamdb.ru'}
+        )
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert 'yamdb_signup_total{outcome="created"}' in (
+            response.content.decode()
+        ), 'Результат регистрации должен попадать в /metrics'
@@ -0,0 +1,55 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Review, Title, User
+
+
+@pytest.mark.django_db
+class TestMyReview:
+
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create(username='reader', email='r@yamdb.ru')
+        other = User.objects.create(username='other', email='o@yamdb.ru')
+        reviewed, _ = (
+            Title.objects.create(name=name, year=year)
+            for name, year in (('Отзыв есть', 2001), ('Отзыва нет', 2000))
+        )
+        self.review = Review.objects.create(
+            title=reviewed, author=user, text='-', score=7
+        )
+        Review.objects.create(title=reviewed, author=other, text='-', score=2)
+        return user
+
+    def get_titles(self, client, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/titles/', params)
+        assert response.status_code == 200
+        return response.json()['results'], len(queries)
+
+    def test_my_review(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        plain, plain_queries = self.get_titles(client, {})
+        titles, queries = self.get_titles(client, {'include': 'my_review'})
+        assert queries == plain_queries, (
+            'Свой отзыв должен читаться в том же запросе, что и произведения'
+        )
+        assert [
+            (title['my_review_id'], title['my_score']) for title in titles
+        ] == [(self.review.pk, 7), (None, None)]
+        assert 'my_score' not in plain[0], (
+            'Без ?include=my_review полей своего отзыва нет'
+        )
+        detail = client.get(
+            f'/api/v1/titles/{self.review.title_id}/',
+            {'include': 'my_review'}
+        ).json()
+        assert detail['my_score'] == 7
+
+    def test_anonymous(self, user):
+        titles, _ = self.get_titles(APIClient(), {'include': 'my_review'})
+        assert 'my_review_id' not in titles[0], (
+            'Для анонимного пользователя свой отзыв не считается'
+        )
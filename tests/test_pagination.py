@@ -0,0 +1,64 @@
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import pagination
+from api.pagination import LimitOffsetPagination
+from reviews.models import Category
+
+
+def paginate(query, paginator=None):
+    paginator = paginator or LimitOffsetPagination()
+    request = Request(APIRequestFactory().get('/', query))
+    page = paginator.paginate_queryset(
+        Category.objects.order_by('pk'), request
+    )
+    return paginator, page
+
+
+@pytest.mark.django_db
+class TestLimitOffsetPagination:
+
+    @pytest.fixture(autouse=True)
+    def categories(self):
+        Category.objects.bulk_create(
+            Category(name=f'Категория {number}', slug=f'slug-{number}')
+            for number in range(7)
+        )
+
+    def test_max_limit(self):
+        paginator = LimitOffsetPagination()
+        paginator.max_limit = 3
+        paginator, page = paginate({'limit': 100000}, paginator)
+        assert len(page) == 3, 'limit должен ограничиваться max_limit'
+        assert 'limit=3' in paginator.get_next_link()
+
+    def test_count_none(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            paginator, page = paginate({'count': 'none', 'limit': 5})
+        assert paginator.count is None
+        assert len(page) == 5
+        assert 'offset=5' in paginator.get_next_link()
+        paginator, page = paginate(
+            {'count': 'none', 'limit': 5, 'offset': 5}
+        )
+        assert len(page) == 2
+        assert paginator.get_next_link() is None, (
+            'Последняя страница не должна ссылаться на следующую'
+        )
+
+    def test_count_estimate(self, monkeypatch):
+        monkeypatch.setattr(
+            pagination, 'estimate_count', lambda model, using: 50000
+        )
+        paginator, _ = paginate({'count': 'estimate'})
+        assert paginator.count == 50000, (
+            'Для запроса без фильтров count должен браться из оценки'
+        )
+        monkeypatch.setattr(
+            pagination, 'estimate_count', lambda model, using: 100
+        )
+        paginator, _ = paginate({'count': 'estimate'})
+        assert paginator.count == 7, (
+            'Для небольших таблиц оценка не должна использоваться'
+        )
@@ -0,0 +1,89 @@
+import pytest
+from api import permissions
+from rest_framework.test import APIClient
+from reviews.models import ADMIN, MODERATOR, USER, Comment, Review, Title, User
+
+# Роль пользователя и может ли он менять чужие отзывы и комментарии.
+ROLES = {
+    'author': (USER, True),
+    'stranger': (USER, False),
+    'moderator': (MODERATOR, True),
+    'admin': (ADMIN, True),
+}
+# Запросы успешной правки и удаления. Проверка прав их не добавляет:
+# у всех ролей их столько же.
+QUERIES = {
+    ('review', 'patch'): 3,
+    ('review', 'delete'): 5,
+    ('comment', 'patch'): 4,
+    ('comment', 'delete'): 3,
+}
+# Отказ: только поиск произведения или отзыва и самого объекта.
+FORBIDDEN_QUERIES = 2
+
+
+@pytest.mark.django_db
+class TestObjectPermissions:
+
+    @pytest.fixture
+    def review(self):
+        author = User.objects.create(
+            username='author', email='author@yamdb.ru', role=USER
+        )
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=author, text='Отзыв', score=5
+        )
+        Comment.objects.create(review=review, author=author, text='Ответ')
+        return review
+
+    @pytest.fixture
+    def role_contexts(self, monkeypatch):
+        """Пользователи, для которых вычислялись роли."""
+
+        class CountingRoleContext(permissions.RoleContext):
+            created = []
+
+            def __init__(self, user):
+                self.created.append(user)
+                super().__init__(user)
+
+        monkeypatch.setattr(permissions, 'RoleContext', CountingRoleContext)
+        return CountingRoleContext.created
+
+    def client(self, name, review):
+        role, _ = ROLES[name]
+        user = review.author if name == 'author' else User.objects.create(
+            username=name, email=f'{name}@yamdb.ru', role=role
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def urls(self, review):
+        base = f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/'
+        comment = review.comments.get()
+        return {'review': base, 'comment': f'{base}comments/{comment.pk}/'}
+
+    @pytest.mark.parametrize('method', ['patch', 'delete'])
+    @pytest.mark.parametrize('target', ['review', 'comment'])
+    @pytest.mark.parametrize('name', list(ROLES))
+    def test_patch_delete(self, review, role_contexts,
+                          django_assert_num_queries, name, target, method):
+        client = self.client(name, review)
+        url = self.urls(review)[target]
+        _, allowed = ROLES[name]
+        expected = QUERIES[target, method] if allowed else FORBIDDEN_QUERIES
+        with django_assert_num_queries(expected):
+            response = getattr(client, method)(url, {'text': 'Правка'})
+        if allowed:
+            assert response.status_code in (200, 204), (
+                f'{name} должен иметь право на {method.upper()} ({target})'
+            )
+        else:
+            assert response.status_code == 403, (
+                f'{name} не должен иметь права на {method.upper()} ({target})'
+            )
+        assert len(role_contexts) == 1, (
+            'Роли пользователя должны вычисляться один раз за запрос'
+        )
@@ -0,0 +1,102 @@
+import pstats
+from pathlib import Path
+
+import pytest
+from api import profiling
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import Title, User
+
+from api_yamdb import settings_api
+
+
+@pytest.mark.django_db
+class TestProfiler:
+
+    @pytest.fixture(autouse=True)
+    def profiler_settings(self, settings, tmp_path):
+        settings.PROFILER_DIR = str(tmp_path)
+        settings.PROFILER_RATE_LIMIT = 2
+        cache.clear()
+        Title.objects.create(name='Произведение', year=2000)
+
+    def client(self, role):
+        user = User.objects.create(
+            username=role, email=f'{role}@yamdb.ru', role=role
+        )
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        return client
+
+    def test_profile(self):
+        client = self.client('admin')
+        response = client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200
+        profile_id = response['X-Profile-Id']
+        assert 'sql;dur=' in response['Server-Timing']
+        summary = client.get(f'/api/v1/profiles/{profile_id}/').json()
+        assert summary['path'] == '/api/v1/titles/'
+        assert summary['sql_count'] == len(summary['sql']) > 0, (
+            'В сводке должна быть хронология запросов к БД'
+        )
+        assert summary['top_cumulative'], 'В сводке нет функций'
+        assert [item['id'] for item in client.get(
+            '/api/v1/profiles/'
+        ).json()] == [profile_id]
+        download = client.get(f'/api/v1/profiles/{profile_id}/download/')
+        assert download.status_code == 200
+        path = profiling.profile_path(profile_id, 'prof')
+        assert b''.join(download.streaming_content) == Path(
+            path
+        ).read_bytes()
+        assert pstats.Stats(path).total_calls > 0
+
+    def test_rate_limit(self):
+        client = self.client('admin')
+        responses = [
+            client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+            for _ in range(3)
+        ]
+        assert ['X-Profile-Id' in response for response in responses] == [
+            True, True, False
+        ], 'Профилируется не больше PROFILER_RATE_LIMIT запросов в минуту'
+        assert responses[-1]['X-Profile-Error'] == 'rate limit exceeded'
+
+    @pytest.mark.parametrize('role', ['user', 'moderator'])
+    def test_not_admin(self, role):
+        client = self.client(role)
+        response = client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response, (
+            'Профилировать запросы может только администратор'
+        )
+        assert client.get('/api/v1/profiles/').status_code == 403
+        assert profiling.list_profiles() == []
+
+    def test_no_header(self, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError('Профилировщик запущен без заголовка')
+
+        monkeypatch.setattr(profiling, 'RequestProfile', fail)
+        monkeypatch.setattr(profiling, 'take_slot', fail)
+        response = self.client('admin').get('/api/v1/titles/')
+        assert response.status_code == 200
+
+    def test_api_settings(self, settings):
+        """Профиль settings_api без AuthenticationMiddleware."""
+        settings.MIDDLEWARE = settings_api.MIDDLEWARE
+        settings.ROOT_URLCONF = settings_api.ROOT_URLCONF
+        response = APIClient().get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        assert response.status_code == 200, (
+            'Анонимный запрос с X-Profile не должен давать ошибку'
+        )
+        assert 'X-Profile-Id' not in response
+        response = self.client('admin').get(
+            '/api/v1/titles/', HTTP_X_PROFILE='1'
+        )
+        assert 'X-Profile-Id' in response, (
+            'Без сессий администратор определяется по JWT'
+        )
@@ -0,0 +1,62 @@
+import pytest
+from django.core.cache import cache
+from reviews.cache import ReferenceCache, category_cache
+from reviews.models import Category
+
+
+@pytest.mark.django_db
+class TestReferenceCache:
+
+    def test_small_table_is_cached_whole(self, django_assert_num_queries):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        category_cache.reset()
+        with django_assert_num_queries(1):
+            assert category_cache.get_by_slug('movie') == movie
+            assert category_cache.get_by_id(movie.pk) == movie
+            assert category_cache.get_by_slug('book') is None, (
+                'Промах по полностью загруженному справочнику не должен '
+                'обращаться к БД'
+            )
+
+    def test_invalidated_on_change(self, django_capture_on_commit_callbacks):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        category_cache.reset()
+        category_cache.get_by_id(movie.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            movie.slug = 'film'
+            movie.save()
+            version = cache.get(category_cache.version_key)
+        assert version != cache.get(category_cache.version_key)
+        assert category_cache.get_by_slug('film') == movie, (
+            'Изменение категории должно сбрасывать кэш'
+        )
+        assert category_cache.get_by_slug('movie') is None
+
+    def test_not_invalidated_before_commit(
+        self, django_capture_on_commit_callbacks
+    ):
+        category_cache.check_version()
+        version = cache.get(category_cache.version_key)
+        with django_capture_on_commit_callbacks() as callbacks:
+            Category.objects.create(name='Фильм', slug='movie')
+        assert cache.get(category_cache.version_key) == version, (
+            'Кэш должен сбрасываться только после фиксации транзакции'
+        )
+        for callback in callbacks:
+            callback()
+        assert cache.get(category_cache.version_key) != version
+
+    def test_large_table_is_bounded(self, django_assert_num_queries):
+        Category.objects.bulk_create(
+            Category(name=f'Категория {number}', slug=f'slug-{number}')
+            for number in range(5)
+        )
+        reference_cache = ReferenceCache(Category, max_size=2)
+        assert reference_cache.all() is None
+        for number in range(5):
+            reference_cache.get_by_slug(f'slug-{number}')
+        assert len(reference_cache.by_id) == 2, (
+            'Кэш не должен хранить больше max_size объектов'
+        )
+        with django_assert_num_queries(0):
+            reference_cache.get_by_slug('slug-4')
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from reviews.models import Comment, CommentArchive, Review, Title, User
+
+OLD = datetime(2020, 1, 15, tzinfo=timezone.utc)
+OLDER = datetime(2019, 6, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.django_db
+class TestReviewList:
+
+    def make_title(self, reviews):
+        title = Title.objects.create(name=f'{reviews} отзывов', year=2000)
+        for number in range(reviews):
+            author, _ = User.objects.get_or_create(
+                username=f'user{number}', email=f'user{number}@yamdb.ru'
+            )
+            review = Review.objects.create(
+                title=title, author=author, text=f'{number}', score=5
+            )
+            for position in range(number % 3):
+                Comment.objects.create(
+                    review=review, author=author, text=f'{position}'
+                )
+        return title
+
+    def get(self, title):
+        return APIClient().get(f'/api/v1/titles/{title.pk}/reviews/')
+
+    def test_fixed_queries(self, django_assert_num_queries):
+        small = self.make_title(reviews=2)
+        large = self.make_title(reviews=12)
+        # Произведение, число отзывов и страница с числом комментариев.
+        with django_assert_num_queries(3):
+            assert self.get(small).status_code == 200
+        with django_assert_num_queries(3):
+            response = self.get(large)
+        assert response.json()['count'] == 12
+        assert {
+            item['text']: item['comment_count']
+            for item in response.json()['results']
+        } == {
+            review.text: int(review.text) % 3
+            for review in large.reviews.order_by('-pub_date', '-id')[:10]
+        }
+
+    def test_archived_comment_stats(self):
+        title = self.make_title(reviews=4)
+        reviews = {review.text: review for review in title.reviews.all()}
+        # У отзыва «0» только архивные комментарии, у «2» — архивный и
+        # два оперативных.
+        author = reviews['0'].author
+        CommentArchive.objects.bulk_create([
+            CommentArchive(
+                id=1000, review=reviews['0'], author=author,
+                text='-', pub_date=OLDER
+            ),
+            CommentArchive(
+                id=1001, review=reviews['0'], author=author,
+                text='-', pub_date=OLD
+            ),
+            CommentArchive(
+                id=1002, review=reviews['2'], author=author,
+                text='-', pub_date=OLD
+            ),
+        ])
+        results = {
+            item['text']: item for item in self.get(title).json()['results']
+        }
+        assert results['0']['comment_count'] == 2, (
+            'comment_count должен учитывать архивные комментарии'
+        )
+        assert parse_datetime(results['0']['last_comment_at']) == OLD, (
+            'Без оперативных комментариев last_comment_at берется из архива'
+        )
+        assert results['1']['comment_count'] == 1
+        assert results['2']['comment_count'] == 3
+        assert parse_datetime(results['2']['last_comment_at']) == max(
+            comment.pub_date for comment in reviews['2'].comments.all()
+        ), 'Оперативные комментарии новее архивных'
+        assert results['3']['comment_count'] == 0
+        assert results['3']['last_comment_at'] is None
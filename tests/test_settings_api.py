@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+from os.path import abspath, dirname, join
+
+# Запрос проходит через все middleware профиля. Запросы к БД не нужны:
+# анонимный запрос к /users/me/ отклоняется до обращения к БД.
+SCRIPT = '''
+import json
+
+import django
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+django.setup()
+setup_test_environment()
+client = Client()
+responses = {
+    'me': client.get('/api/v1/users/me/', HTTP_X_PROFILE='1'),
+    'redoc': client.get('/redoc/'),
+    'admin': client.get('/admin/'),
+}
+print(json.dumps({
+    name: response.status_code for name, response in responses.items()
+}))
+'''
+
+
+class TestApiSettings:
+
+    def test_request(self):
+        env = {
+            **os.environ, 'DJANGO_SETTINGS_MODULE': 'api_yamdb.settings_api'
+        }
+        result = subprocess.run(
+            [sys.executable, '-c', SCRIPT],
+            cwd=join(dirname(dirname(abspath(__file__))), 'api_yamdb'),
+            env=env, capture_output=True, text=True, timeout=60
+        )
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout.splitlines()[-1]) == {
+            'me': 401, 'redoc': 200, 'admin': 404
+        }, 'Профиль settings_api должен обслуживать API без админки'
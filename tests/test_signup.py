@@ -0,0 +1,70 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from rest_framework.test import APIClient
+
+from reviews.models import User
+from tests.utils import run_parallel
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+
+
+@pytest.mark.django_db
+class TestSignup:
+
+    @pytest.fixture(autouse=True)
+    def clear_throttles(self):
+        cache.clear()
+
+    def test_single_query(self, django_assert_num_queries):
+        client = APIClient()
+        data = {'username': 'reader', 'email': 'reader@yamdb.ru'}
+        with django_assert_num_queries(1):
+            assert client.post(SIGNUP_URL, data).status_code == 200
+        with django_assert_num_queries(1):
+            assert client.post(SIGNUP_URL, data).status_code == 200, (
+                'Повторная регистрация должна отправлять код повторно'
+            )
+        assert User.objects.filter(username='reader').count() == 1
+
+    def test_taken(self):
+        User.objects.create(username='reader', email='reader@yamdb.ru')
+        response = APIClient().post(
+            SIGNUP_URL, {'username': 'reader', 'email': 'other@yamdb.ru'}
+        )
+        assert response.status_code == 400
+        assert set(response.json()) == {'username'}, (
+            'Ошибка должна указывать на занятое поле'
+        )
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Параллельные транзакции проверяются на PostgreSQL'
+)
+@pytest.mark.django_db(transaction=True)
+class TestSignupConcurrency:
+
+    def test_same_user(self):
+        results = run_parallel(
+            User.objects.signup, [('reader', 'reader@yamdb.ru')] * 8
+        )
+        assert not [
+            result for result in results if isinstance(result, Exception)
+        ], 'Параллельная регистрация одного пользователя не должна падать'
+        assert len({user.pk for user, _ in results}) == 1
+        assert sum(created for _, created in results) == 1
+
+    def test_same_username(self):
+        results = run_parallel(User.objects.signup, [
+            ('reader', f'reader{number}@yamdb.ru') for number in range(8)
+        ])
+        created = [
+            result for result in results if not isinstance(result, Exception)
+        ]
+        assert len(created) == 1
+        assert all(
+            isinstance(result, ValidationError)
+            for result in results if result not in created
+        ), 'Остальные регистрации должны получить ошибку валидации'
@@ -0,0 +1,110 @@
+import math
+
+import pytest
+from rest_framework.test import APIClient
+from reviews import jobs, similarity
+from reviews.models import Review, SimilarTitle, Title, TitleStats, User
+
+# Оценки пользователей: произведения 0 и 1 оценивают одинаково,
+# произведение 2 — только один пользователь вместе с ними.
+SCORES = {
+    'first': {0: 9, 1: 8, 2: 3},
+    'second': {0: 7, 1: 7},
+    'third': {0: 2, 1: 3, 3: 10},
+}
+
+
+def expected_score(titles, left, right):
+    """Сходство по формуле модуля без NumPy."""
+    pairs = [
+        (scores[left], scores[right]) for scores in SCORES.values()
+        if left in scores and right in scores
+    ]
+    norm = math.sqrt(sum(
+        scores[left] ** 2 for scores in SCORES.values() if left in scores
+    )) * math.sqrt(sum(
+        scores[right] ** 2 for scores in SCORES.values() if right in scores
+    ))
+    common = len(pairs)
+    cosine = sum(a * b for a, b in pairs) / norm
+    return cosine * common / (common + similarity.SHRINKAGE)
+
+
+@pytest.mark.django_db
+class TestSimilarTitles:
+
+    @pytest.fixture
+    def titles(self):
+        titles = [
+            Title.objects.create(name=f'Произведение {number}', year=2000)
+            for number in range(4)
+        ]
+        for username, scores in SCORES.items():
+            author = User.objects.create(
+                username=username, email=f'{username}@yamdb.ru'
+            )
+            Review.objects.bulk_create([
+                Review(title=titles[number], author=author, text='-',
+                       score=score)
+                for number, score in scores.items()
+            ])
+        return titles
+
+    def similar(self, title):
+        return dict(SimilarTitle.objects.filter(
+            title=title
+        ).values_list('similar_id', 'score'))
+
+    def test_rebuild_all(self, titles):
+        assert similarity.rebuild_all(chunk_size=2) == 4
+        assert self.similar(titles[0]) == pytest.approx(
+            {titles[1].pk: expected_score(titles, 0, 1)}
+        ), 'Соседи с одним общим пользователем не сохраняются'
+        assert self.similar(titles[2]) == {}
+
+    def test_refresh_on_new_review(
+        self, titles, django_capture_on_commit_callbacks
+    ):
+        similarity.rebuild_all()
+        author = User.objects.get(username='second')
+        with django_capture_on_commit_callbacks(execute=True):
+            Review.objects.create(
+                title=titles[2], author=author, text='-', score=6
+            )
+        SCORES['second'][2] = 6
+        try:
+            assert self.similar(titles[2]) == pytest.approx({
+                titles[0].pk: expected_score(titles, 2, 0),
+                titles[1].pk: expected_score(titles, 2, 1),
+            }), 'Похожие должны пересчитываться после нового отзыва'
+            assert self.similar(titles[0])[titles[2].pk] == pytest.approx(
+                expected_score(titles, 0, 2)
+            )
+        finally:
+            del SCORES['second'][2]
+
+    def test_endpoint(self, titles, django_assert_num_queries):
+        similarity.rebuild_all()
+        client = APIClient()
+        with django_assert_num_queries(1):
+            response = client.get(f'/api/v1/titles/{titles[0].pk}/similar/')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == [titles[1].pk]
+        assert set(response.json()[0]) == {'id', 'name', 'rating', 'score'}
+        assert client.get(
+            f'/api/v1/titles/{titles[3].pk}/similar/'
+        ).json() == []
+        assert client.get('/api/v1/titles/0/similar/').status_code == 404
+
+    def test_endpoint_rating(self, titles):
+        similarity.rebuild_all()
+        url = f'/api/v1/titles/{titles[0].pk}/similar/'
+        response = APIClient().get(url)
+        assert response.status_code == 200
+        assert response.json()[0]['rating'] is None, (
+            'Без статистики соседа рейтинг должен быть null'
+        )
+        jobs.recompute_title_stats([titles[1].pk])
+        assert APIClient().get(url).json()[0]['rating'] == (
+            TitleStats.objects.get(title=titles[1]).rating
+        )
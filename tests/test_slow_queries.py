@@ -0,0 +1,76 @@
+from io import StringIO
+
+import pytest
+from api.slow_queries import SlowQueryLogger, fingerprint, normalize, read_log
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from rest_framework.test import APIClient
+
+
+class TestNormalize:
+
+    def test_values_removed(self):
+        assert normalize(
+            "SELECT * FROM t WHERE name = 'O''Brien' AND id IN (1, 2,  3)"
+        ) == 'SELECT * FROM t WHERE name = ? AND id IN (...)'
+        assert normalize('SELECT * FROM t WHERE id = %s LIMIT 21') == (
+            'SELECT * FROM t WHERE id = ? LIMIT ?'
+        ), 'Параметры и числа должны заменяться на ?'
+
+    def test_same_fingerprint(self):
+        assert fingerprint(normalize('SELECT 1 FROM t WHERE id IN (1)')) == (
+            fingerprint(normalize('SELECT 2 FROM t WHERE id IN (5, 6)'))
+        ), 'Запросы с разными значениями должны иметь один отпечаток'
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+
+    @pytest.fixture(autouse=True)
+    def slow_log(self, settings):
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        settings.SLOW_QUERY_LOG_SIZE = 5
+        cache.clear()
+
+    def test_buffer_bounded(self):
+        client = APIClient()
+        for _ in range(3):
+            client.get('/api/v1/categories/')
+        entries = read_log()
+        assert len(entries) == 5, 'Журнал не должен превышать размер буфера'
+        assert entries[0]['seq'] > entries[-1]['seq']
+
+    def test_view_and_plan(self):
+        APIClient().get('/api/v1/genres/')
+        entry = read_log()[0]
+        assert entry['view'] == 'api.views.GenreViewSet.list'
+        assert entry['plan'], 'Для нового отпечатка должен сохраняться план'
+        assert 'genre' in entry['sql']
+
+    def test_command(self):
+        APIClient().get('/api/v1/genres/')
+        out = StringIO()
+        call_command('slow_queries', '--summary', '--plans', stdout=out)
+        assert 'GenreViewSet' in out.getvalue()
+        call_command('slow_queries', '--clear', stdout=StringIO())
+        assert read_log() == []
+
+    def test_failed(self):
+        logger = SlowQueryLogger(connection, view='test')
+        with connection.execute_wrapper(logger):
+            try:
+                raise KeyError('обрабатываемое исключение')
+            except KeyError:
+                # Успешный запрос в блоке except не считается ошибкой.
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            with pytest.raises(DatabaseError), transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT * FROM no_such_table')
+        entries = {entry['sql']: entry for entry in read_log()}
+        succeeded = entries['SELECT ?']
+        failed = entries['SELECT * FROM no_such_table']
+        assert not succeeded['failed']
+        assert failed['failed'], 'Ошибка запроса должна отмечаться в журнале'
+        assert failed['plan'] == '', 'Для ошибки EXPLAIN не выполняется'
@@ -0,0 +1,105 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.throttling import IPThrottle
+from tests.utils import run_parallel
+
+# Начало окна: timer() кратен длительности окна.
+START = 6000.0
+
+
+class LimitedThrottle(IPThrottle):
+    scope = 'test'
+    rate = '3/min'
+
+
+def make_request(remote_addr='10.0.0.1', forwarded_for=None):
+    meta = {'REMOTE_ADDR': remote_addr}
+    if forwarded_for is not None:
+        meta['HTTP_X_FORWARDED_FOR'] = forwarded_for
+    return Request(APIRequestFactory().get('/', **meta))
+
+
+def allow(now, request=None):
+    throttle = LimitedThrottle()
+    throttle.timer = lambda: now
+    allowed = throttle.allow_request(request or make_request(), None)
+    return allowed, throttle
+
+
+class TestSlidingWindowThrottle:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_limit(self):
+        assert [allow(START + second)[0] for second in range(5)] == [
+            True, True, True, False, False
+        ], 'Сверх лимита окна запросы должны отклоняться'
+        allowed, throttle = allow(START + 30)
+        assert not allowed
+        assert throttle.wait() == pytest.approx(30), (
+            'Ждать нужно до конца окна'
+        )
+
+    def test_window_rollover(self):
+        for _ in range(3):
+            assert allow(START)[0]
+        assert not allow(START + 59)[0]
+        # В середине следующего окна от предыдущего учитывается 1.5
+        # запроса, поэтому проходят только два.
+        assert allow(START + 90)[0]
+        assert allow(START + 90)[0]
+        allowed, throttle = allow(START + 90)
+        assert not allowed, (
+            'Предыдущее окно должно учитываться пропорционально'
+        )
+        assert throttle.wait() == pytest.approx(10)
+        assert allow(START + 101)[0], (
+            'Отклоненные запросы не должны занимать лимит'
+        )
+        assert [allow(START + 240)[0] for _ in range(4)] == [
+            True, True, True, False
+        ]
+
+    def test_concurrent(self):
+        results = run_parallel(
+            lambda: allow(START)[0], [()] * 10
+        )
+        assert results.count(True) == 3, (
+            'Одновременные запросы не должны превышать лимит'
+        )
+
+    @pytest.mark.parametrize('num_proxies, ident', [
+        (None, '1.1.1.1,2.2.2.2,3.3.3.3'),
+        (0, '10.0.0.1'),
+        (1, '3.3.3.3'),
+        (2, '2.2.2.2'),
+    ])
+    def test_num_proxies(self, settings, num_proxies, ident):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'NUM_PROXIES': num_proxies
+        }
+        request = make_request(forwarded_for='1.1.1.1, 2.2.2.2, 3.3.3.3')
+        assert LimitedThrottle().get_ident(request) == ident
+
+    def test_spoofed_forwarded_for(self, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'NUM_PROXIES': 1
+        }
+        for number in range(3):
+            assert allow(START, make_request(
+                forwarded_for=f'192.168.0.{number}, 3.3.3.3'
+            ))[0]
+        assert not allow(START, make_request(
+            forwarded_for='192.168.0.100, 3.3.3.3'
+        ))[0], (
+            'Адреса, добавленные клиентом в X-Forwarded-For, не должны '
+            'обходить лимит'
+        )
+        assert allow(START, make_request(forwarded_for='4.4.4.4'))[0]
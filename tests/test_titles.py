@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+
+URL = '/api/v1/titles/batch/'
+
+
+@pytest.mark.django_db
+class TestTitleBatch:
+
+    @pytest.fixture
+    def titles(self):
+        category = Category.objects.create(name='Фильмы', slug='films')
+        genres = [
+            Genre.objects.create(name=f'Жанр {number}', slug=f'g{number}')
+            for number in range(2)
+        ]
+        titles = []
+        for number in range(10):
+            title = Title.objects.create(
+                name=f'Фильм {number}', year=2000, category=category
+            )
+            title.genre.set(genres)
+            titles.append(title)
+        return titles
+
+    def get(self, ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(URL, {'ids': ids})
+        return response, len(queries)
+
+    def test_order(self, titles):
+        ids = [titles[3].pk, titles[0].pk, titles[7].pk]
+        response, _ = self.get(','.join(map(str, ids)))
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == ids, (
+            'Произведения должны возвращаться в порядке запроса'
+        )
+        assert response.json()[0]['genre'], 'Должны выводиться жанры'
+
+    def test_duplicates_and_unknown(self, titles):
+        first, second = titles[0].pk, titles[1].pk
+        unknown = max(title.pk for title in titles) + 100
+        response, _ = self.get(f'{second},{unknown},{first},{second}')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()] == [
+            second, first
+        ], 'Повторы и неизвестные id должны пропускаться'
+
+    @pytest.mark.parametrize('ids', ['', '1,a', '1,,2', '1.5'])
+    def test_invalid_ids(self, ids):
+        response, _ = self.get(ids)
+        assert response.status_code == 400, (
+            'id должны быть целыми числами через запятую'
+        )
+        assert 'ids' in response.json()
+
+    def test_max_size(self, titles, settings):
+        settings.TITLES_BATCH_MAX_SIZE = 3
+        ids = [title.pk for title in titles]
+        response, _ = self.get(','.join(map(str, ids[:4])))
+        assert response.status_code == 400, (
+            'Запрос больше TITLES_BATCH_MAX_SIZE должен отклоняться'
+        )
+        response, _ = self.get(','.join(map(str, ids[:3] + ids[:3])))
+        assert response.status_code == 200, (
+            'Повторы не должны учитываться в лимите'
+        )
+
+    def test_fixed_queries(self, titles):
+        ids = [title.pk for title in titles]
+        _, one = self.get(str(ids[0]))
+        response, many = self.get(','.join(map(str, ids)))
+        assert len(response.json()) == 10
+        assert one == many, (
+            'Число запросов не должно зависеть от числа произведений'
+        )
@@ -0,0 +1,29 @@
+"""Вспомогательные функции тестов."""
+import threading
+
+from django.db import connection
+
+
+def run_parallel(function, arguments):
+    """Запускает function одновременно в нескольких потоках."""
+    barrier = threading.Barrier(len(arguments))
+    results = [None] * len(arguments)
+
+    def worker(index, args):
+        barrier.wait()
+        try:
+            results[index] = function(*args)
+        except Exception as error:
+            results[index] = error
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(index, args))
+        for index, args in enumerate(arguments)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results